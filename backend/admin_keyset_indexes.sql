@@ -0,0 +1,19 @@
+-- Index cho phân trang keyset của các danh sách admin (routers/admin.py)
+-- Thứ tự (cột thời gian desc, id desc) khớp ORDER BY nên trang nào cũng chỉ đọc
+-- đúng limit + 1 dòng từ index, không phụ thuộc trang sâu tới đâu
+-- Chạy script này trong Supabase SQL Editor
+
+create index if not exists idx_consultations_created_at_id on public.consultations(created_at desc, id desc);
+create index if not exists idx_consultations_status_created_at_id on public.consultations(status, created_at desc, id desc);
+
+create index if not exists idx_bookings_booking_date_id on public.bookings(booking_date desc, id desc);
+create index if not exists idx_bookings_status_booking_date_id on public.bookings(status, booking_date desc, id desc);
+
+create index if not exists idx_visitors_visited_at_id on public.visitors(visited_at desc, id desc);
+
+create index if not exists idx_tour_views_viewed_at_id on public.tour_views(viewed_at desc, id desc);
+create index if not exists idx_tour_views_tour_id_viewed_at_id on public.tour_views(tour_id, viewed_at desc, id desc);
+
+-- Index cũ chỉ có một cột thời gian đã được thay bằng index ghép ở trên
+drop index if exists public.idx_visitors_visited_at;
+drop index if exists public.idx_tour_views_viewed_at;
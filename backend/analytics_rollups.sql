@@ -0,0 +1,183 @@
+-- Bảng tổng hợp sẵn (rollup) lượt truy cập / lượt xem tour theo giờ và theo ngày
+-- Dùng bởi: POST /api/tracking/* (ghi), GET /api/admin/analytics/timeseries (đọc),
+-- backfill_analytics.py (tính lại dữ liệu cũ)
+-- Chạy script này trong Supabase SQL Editor (sau admin_tables.sql)
+
+create table if not exists public.analytics_rollups (
+  metric text not null check (metric in ('visitors', 'tour_views')),
+  bucket text not null check (bucket in ('hour', 'day')),
+  bucket_start timestamp with time zone not null,
+  tour_id text not null default '',  -- '' = tổng của mọi tour (visitors luôn là '')
+  count bigint not null default 0,
+  -- Thứ tự khóa khớp truy vấn biểu đồ: một metric/bucket/tour, quét theo khoảng thời gian
+  constraint analytics_rollups_pkey primary key (metric, bucket, tour_id, bucket_start)
+) TABLESPACE pg_default;
+
+-- Chỉ backend (service role) đọc/ghi
+alter table public.analytics_rollups enable row level security;
+
+-- Mốc đầu bucket theo giờ Việt Nam (đổi múi giờ ở đúng một chỗ này, rồi backfill lại)
+create or replace function public.analytics_bucket_start(p_bucket text, p_ts timestamptz)
+returns timestamptz
+language sql
+stable
+as $$
+  select date_trunc(p_bucket, p_ts, 'Asia/Ho_Chi_Minh');
+$$;
+
+-- Ghi sự kiện tracking (một hoặc nhiều dòng) và cộng dồn rollup trong CÙNG transaction
+-- p_events: mảng JSON theo cột của bảng visitors / tour_views. Backend gửi kèm id
+-- (core/ingest.py ghi theo lô, có thể thử lại): id đã có thì bỏ qua, không đếm
+-- trùng. Lượt xem của tour/user không tồn tại được bỏ qua (tour) hoặc để user_id
+-- null, để một dòng lỗi không làm hỏng cả lô.
+create or replace function public.record_tracking_events(p_metric text, p_events jsonb)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  v_ids jsonb;
+begin
+  -- Khóa chia sẻ: nhiều request ghi song song được, chỉ chờ khi đang backfill
+  perform pg_advisory_xact_lock_shared(hashtext('analytics_rollups'));
+
+  if p_metric = 'visitors' then
+    with inserted as (
+      insert into public.visitors (id, ip_address, user_agent, page_path, visited_at)
+      select coalesce(r.id, gen_random_uuid()), r.ip_address, r.user_agent, r.page_path, coalesce(r.visited_at, now())
+      from jsonb_populate_recordset(null::public.visitors, p_events) r
+      on conflict (id) do nothing
+      returning id, visited_at
+    ), rolled as (
+      insert into public.analytics_rollups as a (metric, bucket, bucket_start, tour_id, count)
+      select 'visitors', b.bucket, public.analytics_bucket_start(b.bucket, i.visited_at), '', count(*)
+      from inserted i cross join (values ('hour'), ('day')) b(bucket)
+      group by 1, 2, 3, 4
+      on conflict (metric, bucket, tour_id, bucket_start)
+      do update set count = a.count + excluded.count
+    )
+    select coalesce(jsonb_agg(id), '[]'::jsonb) into v_ids from inserted;
+
+  elsif p_metric = 'tour_views' then
+    with inserted as (
+      insert into public.tour_views (id, tour_id, user_id, ip_address, viewed_at)
+      select
+        coalesce(r.id, gen_random_uuid()),
+        r.tour_id,
+        case when exists (select 1 from auth.users u where u.id = r.user_id) then r.user_id end,
+        r.ip_address,
+        coalesce(r.viewed_at, now())
+      from jsonb_populate_recordset(null::public.tour_views, p_events) r
+      where exists (select 1 from public.tours t where t.id = r.tour_id)
+      on conflict (id) do nothing
+      returning id, tour_id, viewed_at
+    ), rolled as (
+      -- Mỗi lượt xem cộng vào dòng của tour đó và dòng tổng ('')
+      insert into public.analytics_rollups as a (metric, bucket, bucket_start, tour_id, count)
+      select 'tour_views', b.bucket, public.analytics_bucket_start(b.bucket, i.viewed_at), t.tour_id, count(*)
+      from inserted i
+      cross join (values ('hour'), ('day')) b(bucket)
+      cross join lateral (values (i.tour_id), ('')) t(tour_id)
+      group by 1, 2, 3, 4
+      on conflict (metric, bucket, tour_id, bucket_start)
+      do update set count = a.count + excluded.count
+    )
+    select coalesce(jsonb_agg(id), '[]'::jsonb) into v_ids from inserted;
+
+  else
+    raise exception 'metric không hợp lệ: %', p_metric;
+  end if;
+
+  return v_ids;
+end;
+$$;
+
+-- Tính lại rollup của một metric từ dữ liệu thô trong [p_from, p_to), làm tròn ra cả ngày
+-- Trả về số sự kiện đã đếm. Gọi nhiều lần với cùng khoảng vẫn cho cùng kết quả.
+create or replace function public.backfill_analytics_rollups(p_metric text, p_from timestamptz, p_to timestamptz)
+returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  v_from timestamptz := public.analytics_bucket_start('day', p_from);
+  v_to timestamptz := public.analytics_bucket_start('day', p_to);
+  v_events bigint;
+begin
+  if v_to < p_to then
+    v_to := v_to + interval '1 day';
+  end if;
+
+  -- Khóa độc quyền: không có lượt ghi nào xen vào giữa lúc xóa và đếm lại
+  perform pg_advisory_xact_lock(hashtext('analytics_rollups'));
+
+  delete from public.analytics_rollups
+  where metric = p_metric and bucket_start >= v_from and bucket_start < v_to;
+
+  if p_metric = 'visitors' then
+    insert into public.analytics_rollups (metric, bucket, bucket_start, tour_id, count)
+    select 'visitors', b.bucket, public.analytics_bucket_start(b.bucket, v.visited_at), '', count(*)
+    from public.visitors v cross join (values ('hour'), ('day')) b(bucket)
+    where v.visited_at >= v_from and v.visited_at < v_to
+    group by 1, 2, 3, 4;
+
+    select count(*) into v_events from public.visitors
+    where visited_at >= v_from and visited_at < v_to;
+
+  elsif p_metric = 'tour_views' then
+    insert into public.analytics_rollups (metric, bucket, bucket_start, tour_id, count)
+    select 'tour_views', b.bucket, public.analytics_bucket_start(b.bucket, v.viewed_at), t.tour_id, count(*)
+    from public.tour_views v
+    cross join (values ('hour'), ('day')) b(bucket)
+    cross join lateral (values (v.tour_id), ('')) t(tour_id)
+    where v.viewed_at >= v_from and v.viewed_at < v_to
+    group by 1, 2, 3, 4;
+
+    select count(*) into v_events from public.tour_views
+    where viewed_at >= v_from and viewed_at < v_to;
+
+  else
+    raise exception 'metric không hợp lệ: %', p_metric;
+  end if;
+
+  return v_events;
+end;
+$$;
+
+-- Chuỗi thời gian liên tục trong [p_from, p_to): bucket không có sự kiện trả về 0
+-- Giờ Việt Nam không có DST nên bước '1 day' / '1 hour' luôn trùng mốc bucket
+create or replace function public.analytics_timeseries(
+  p_metric text,
+  p_bucket text,
+  p_from timestamptz,
+  p_to timestamptz,
+  p_tour_id text default ''
+) returns table (bucket_start timestamptz, count bigint)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  select s.bucket_start, coalesce(r.count, 0)
+  from generate_series(
+    public.analytics_bucket_start(p_bucket, p_from),
+    p_to - interval '1 microsecond',
+    ('1 ' || p_bucket)::interval
+  ) as s(bucket_start)
+  left join public.analytics_rollups r
+    on r.metric = p_metric
+   and r.bucket = p_bucket
+   and r.tour_id = coalesce(p_tour_id, '')
+   and r.bucket_start = s.bucket_start
+  order by s.bucket_start;
+$$;
+
+-- Chỉ backend (service role) được gọi
+revoke execute on function public.record_tracking_events(text, jsonb) from public, anon, authenticated;
+grant execute on function public.record_tracking_events(text, jsonb) to service_role;
+revoke execute on function public.backfill_analytics_rollups(text, timestamptz, timestamptz) from public, anon, authenticated;
+grant execute on function public.backfill_analytics_rollups(text, timestamptz, timestamptz) to service_role;
+revoke execute on function public.analytics_timeseries(text, text, timestamptz, timestamptz, text) from public, anon, authenticated;
+grant execute on function public.analytics_timeseries(text, text, timestamptz, timestamptz, text) to service_role;
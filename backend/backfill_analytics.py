@@ -0,0 +1,47 @@
+"""
+Tính lại bảng rollup analytics (analytics_rollups.sql) từ dữ liệu thô trong
+visitors / tour_views, VD: lần đầu bật rollup, hoặc sau khi rollup bị lệch.
+
+Chạy từ thư mục backend:
+    python backfill_analytics.py                       # toàn bộ lịch sử, cả hai metric
+    python backfill_analytics.py --metric tour_views --from 2025-01-01 --to 2025-04-01
+
+Chạy lại nhiều lần cùng khoảng vẫn cho cùng kết quả (mỗi ngày được xóa rồi đếm lại).
+Dùng SUPABASE_SERVICE_KEY (bypass RLS).
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from core.analytics import METRICS, backfill
+from core.db import service_client
+
+def _earliest(client, metric: str):
+    column = METRICS[metric]
+    response = client.table(metric).select(column).order(column).limit(1).execute()
+    return datetime.fromisoformat(response.data[0][column]) if response.data else None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--metric", choices=tuple(METRICS), action="append", help="Mặc định: tất cả")
+    parser.add_argument("--from", dest="start", type=datetime.fromisoformat, help="Mặc định: sự kiện cũ nhất")
+    parser.add_argument("--to", dest="end", type=datetime.fromisoformat, help="Mặc định: hiện tại")
+    parser.add_argument("--step-days", type=int, default=7, help="Số ngày mỗi transaction")
+    args = parser.parse_args()
+
+    client = service_client()
+    end = (args.end or datetime.now()).astimezone()
+    for metric in args.metric or list(METRICS):
+        start = args.start or _earliest(client, metric)
+        if start is None:
+            print(f"⏭️  {metric}: chưa có dữ liệu")
+            continue
+        started = time.perf_counter()
+        total = 0
+        for chunk_start, chunk_end, events in backfill(client, metric, start.astimezone(), end, timedelta(days=args.step_days)):
+            total += events
+            print(f"   {metric} {chunk_start:%Y-%m-%d} → {chunk_end:%Y-%m-%d}: {events} sự kiện")
+        print(f"✅ {metric}: {total} sự kiện trong {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
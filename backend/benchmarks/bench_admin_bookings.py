@@ -0,0 +1,94 @@
+"""
+Benchmark: thời gian xử lý GET /api/admin/bookings theo kích thước trang, trước
+(một query profiles.single() cho mỗi booking) và sau (một query in_ cho cả trang,
+có cache LRU giữa các request).
+
+Chạy từ thư mục backend:
+    python -m benchmarks.bench_admin_bookings --latency 0.02 --users 40
+
+PostgREST được giả lập bằng httpx.MockTransport với độ trễ cố định mỗi round trip.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench-anon-key")
+
+import httpx
+
+from core.db import async_supabase_admin
+from core.profiles import _profile_cache
+from routers.admin import attach_profiles
+
+PAGE_SIZES = (10, 50, 100, 200)
+
+def install_transport(latency: float, users: int) -> list:
+    round_trips = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        round_trips.append(request.url.path)
+        params = dict(request.url.params)
+        if request.url.path.endswith("/bookings"):
+            limit = int(params.get("limit", 50))
+            rows = [
+                {"id": f"b{i}", "user_id": f"user-{i % users}", "status": "pending",
+                 "tours": {"title": "Tour", "departure": "hanoi", "destination": None}}
+                for i in range(limit)
+            ]
+            return httpx.Response(200, json=rows)
+        # profiles: id=eq.x (single) hoặc id=in.(x,y,...)
+        ids = params["id"].split(".", 1)[1].strip("()").split(",")
+        rows = [{"id": i, "email": f"{i}@example.com", "full_name": i} for i in ids]
+        if request.headers.get("accept") == "application/vnd.pgrst.object+json":
+            return httpx.Response(200, json=rows[0])
+        return httpx.Response(200, json=rows)
+
+    # Request builder của postgrest-py dùng client.session -> thay bằng transport giả
+    async_supabase_admin.session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return round_trips
+
+async def fetch_page(limit: int) -> list:
+    response = await async_supabase_admin.table("bookings")\
+        .select("*, tours(title, departure, destination)")\
+        .order("booking_date", desc=True).limit(limit).execute()
+    return response.data
+
+async def before(limit: int) -> None:
+    # Cách cũ: một query single() cho mỗi booking
+    bookings = await fetch_page(limit)
+    for booking in bookings:
+        profile = await async_supabase_admin.table("profiles")\
+            .select("email, full_name").eq("id", booking["user_id"]).single().execute()
+        booking["profiles"] = {"email": profile.data.get("email"), "name": profile.data.get("full_name")}
+
+async def after(limit: int) -> None:
+    bookings = await fetch_page(limit)
+    await attach_profiles(bookings)
+
+async def timed(fn, limit: int, round_trips: list):
+    round_trips.clear()
+    started = time.perf_counter()
+    await fn(limit)
+    return (time.perf_counter() - started) * 1000, len(round_trips)
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02, help="Độ trễ giả lập mỗi round trip (giây)")
+    parser.add_argument("--users", type=int, default=40, help="Số user khác nhau trong danh sách booking")
+    args = parser.parse_args()
+    round_trips = install_transport(args.latency, args.users)
+
+    print(f"latency {args.latency * 1000:.0f}ms/round trip, {args.users} user khác nhau\n")
+    print(f"{'limit':>5} {'before ms':>10} {'trips':>6} {'after cold ms':>14} {'trips':>6} {'after warm ms':>14} {'trips':>6}")
+    for limit in PAGE_SIZES:
+        before_ms, before_trips = await timed(before, limit, round_trips)
+        _profile_cache.clear()
+        cold_ms, cold_trips = await timed(after, limit, round_trips)
+        warm_ms, warm_trips = await timed(after, limit, round_trips)
+        print(f"{limit:>5} {before_ms:10.1f} {before_trips:6} {cold_ms:14.1f} {cold_trips:6} {warm_ms:14.1f} {warm_trips:6}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Benchmark: throughput của handler async khi gọi Supabase bằng client sync (cũ)
+so với data-access layer async (core.db).
+
+Chạy từ thư mục backend:
+    python -m benchmarks.bench_async_db --requests 200 --concurrency 50 --latency 0.05
+
+Không cần Supabase thật: PostgREST được giả lập bằng httpx.MockTransport với độ
+trễ cố định. Với client sync, mỗi query chặn cả event loop nên các request bị
+xếp hàng; với client async các query chạy chồng lên nhau.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench-anon-key")
+
+import httpx
+from fastapi import FastAPI
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+
+from core.db import REST_URL
+
+def build_clients(latency: float):
+    def blocking_handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(latency)
+        return httpx.Response(200, json=[{"id": "1", "status": "pending"}])
+
+    async def async_handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json=[{"id": "1", "status": "pending"}])
+
+    sync_http = httpx.Client(transport=httpx.MockTransport(blocking_handler))
+    async_http = httpx.AsyncClient(transport=httpx.MockTransport(async_handler))
+
+    headers = {"apikey": "bench", "Authorization": "Bearer bench"}
+    return (
+        SyncPostgrestClient(REST_URL, headers=headers, http_client=sync_http),
+        AsyncPostgrestClient(REST_URL, headers=headers, http_client=async_http),
+        async_http,
+    )
+
+def build_app(sync_db: SyncPostgrestClient, async_db: AsyncPostgrestClient) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/before")
+    async def before():
+        # Cách cũ: async def nhưng gọi client sync -> block event loop
+        response = sync_db.table("bookings").select("*").eq("user_id", "u1").execute()
+        return response.data
+
+    @app.get("/after")
+    async def after():
+        response = await async_db.table("bookings").select("*").eq("user_id", "u1").execute()
+        return response.data
+
+    return app
+
+async def run(app: FastAPI, path: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return time.perf_counter() - started
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="Độ trễ giả lập mỗi query (giây)")
+    args = parser.parse_args()
+
+    sync_db, async_db, async_http = build_clients(args.latency)
+    app = build_app(sync_db, async_db)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, latency {args.latency * 1000:.0f}ms/query")
+    for label, path in [("before (sync client)", "/before"), ("after (async client)", "/after")]:
+        elapsed = await run(app, path, args.requests, args.concurrency)
+        print(f"{label:<22} {elapsed:7.2f}s  {args.requests / elapsed:8.1f} req/s")
+
+    await async_http.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""
+Benchmark: thời gian phản hồi của POST /api/consultations khi form có tour_id +
+user_id, trước (2 insert tuần tự: consultations rồi bookings) và sau (1 lần gọi
+RPC submit_consultation).
+
+Chạy từ thư mục backend:
+    python -m benchmarks.bench_consultation_submit --requests 200 --latency 0.04
+
+PostgREST được giả lập bằng httpx.MockTransport với độ trễ cố định mỗi round
+trip, nên chênh lệch chính là số round trip tới Supabase.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench-anon-key")
+
+import httpx
+from fastapi import Response
+from postgrest import AsyncPostgrestClient
+
+from core.db import REST_URL
+from core.leads import InMemoryLeadWriter, RpcLeadWriter, set_lead_writer
+from routers.consultations import ConsultationCreate, create_consultation
+
+FORM = {
+    "full_name": "Nguyễn Văn A",
+    "email": "khach@example.com",
+    "phone": "0912345678",
+    "message": "Tôi muốn đặt tour cuối tuần",
+    "user_id": "9b1deb4d-3b7d-4bad-9bdd-2b0d7b3dcb6d",
+    "tour_id": "1",
+}
+
+def build_client(latency: float) -> AsyncPostgrestClient:
+    store = InMemoryLeadWriter()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        if request.url.path.endswith("/rpc/submit_consultation"):
+            return httpx.Response(200, json=await store.submit(json.loads(request.content)))
+        return httpx.Response(201, json=[{"id": "row-1", "status": "pending"}])
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncPostgrestClient(REST_URL, headers={"apikey": "bench", "Authorization": "Bearer bench"}, http_client=http)
+
+async def before(db: AsyncPostgrestClient):
+    # Cách cũ: insert consultation, chờ xong mới insert booking
+    data = {**FORM, "status": "pending"}
+    consultation = await db.table("consultations").insert(data).execute()
+    booking = await db.table("bookings").insert(data).execute()
+    return consultation.data[0], booking.data[0]
+
+async def after(db: AsyncPostgrestClient):
+    return await create_consultation(ConsultationCreate(**FORM), Response(), None)
+
+async def measure(fn, db: AsyncPostgrestClient, total: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await fn(db)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.04, help="Độ trễ giả lập mỗi round trip (giây)")
+    args = parser.parse_args()
+
+    db = build_client(args.latency)
+    set_lead_writer(RpcLeadWriter(db))
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, latency {args.latency * 1000:.0f}ms/round trip")
+    for label, fn in [("before (2 inserts)", before), ("after (1 rpc)", after)]:
+        latencies = sorted(await measure(fn, db, args.requests, args.concurrency))
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"{label:<20} p50 {statistics.median(latencies):7.1f}ms  p95 {p95:7.1f}ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+Benchmark: kích thước trên đường truyền và thời gian serialize của các endpoint
+trả list lớn, trước (JSONResponse, không nén) và sau (ORJSONResponse + brotli/gzip).
+
+Chạy từ thư mục backend:
+    python -m benchmarks.bench_json_compression --rows 200 --repeat 50
+
+Dữ liệu tour lấy từ data/tours_rows.csv (nhân lên đủ số dòng), các route còn lại
+dùng payload giả lập cùng cấu trúc với response thật. Vì 7 tour mẫu bị lặp lại
+nên tỉ lệ nén cao hơn dữ liệu thật; cột thời gian serialize thì sát thực tế.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench-anon-key")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from core.catalog import LEAN_TOUR_FIELDS, VECTOR_COLUMNS
+from core.compression import brotli, compress_body
+from core.tour_import import normalize_row
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "tours_rows.csv")
+
+def load_tours(rows: int) -> list:
+    with open(CSV_PATH, encoding="utf-8", newline="") as f:
+        base = [normalize_row(row) for row in csv.DictReader(f)]
+    for tour in base:
+        for column in VECTOR_COLUMNS:
+            tour.pop(column, None)
+        for key in ("price", "rating"):
+            tour[key] = float(tour[key]) if tour.get(key) else None
+        tour["reviews"] = int(tour["reviews"]) if tour.get("reviews") else None
+    return [dict(base[i % len(base)], id=f"{base[i % len(base)]['id']}-{i}") for i in range(rows)]
+
+def build_payloads(rows: int) -> dict:
+    tours = load_tours(rows)
+    now = datetime.now(timezone.utc)
+    bookings = [
+        {
+            "id": f"booking-{i}",
+            "user_id": f"user-{i % 40}",
+            "tour_id": tours[i % len(tours)]["id"],
+            "status": ("pending", "confirmed", "cancelled")[i % 3],
+            "booking_date": (now - timedelta(hours=i)).isoformat(),
+            "number_of_people": 1 + i % 5,
+            "total_price": 1500000 + i * 1000,
+            "tours": {
+                "title": tours[i % len(tours)]["title"],
+                "title_en": tours[i % len(tours)].get("title_en"),
+                "image": tours[i % len(tours)].get("image"),
+                "price": tours[i % len(tours)].get("price"),
+                "price_vnd": None,
+                "departure": tours[i % len(tours)].get("departure"),
+                "destination": tours[i % len(tours)].get("destination"),
+                "location": tours[i % len(tours)].get("departure"),
+            },
+            "profiles": {"email": f"khach{i % 40}@example.com", "name": f"Nguyễn Văn {i % 40}"},
+        }
+        for i in range(rows)
+    ]
+    tour_views = [
+        {
+            "id": f"view-{i}",
+            "tour_id": tours[i % len(tours)]["id"],
+            "user_id": None,
+            "ip_address": f"14.161.{i % 256}.{i * 7 % 256}",
+            "viewed_at": (now - timedelta(minutes=i)).isoformat(),
+            "tours": {"title": tours[i % len(tours)]["title"], "title_en": None, "image": tours[i % len(tours)].get("image")},
+        }
+        for i in range(rows)
+    ]
+    messages = [
+        {
+            "id": f"msg-{i}",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": (tours[i % len(tours)].get("description") or "Xin chào, tôi muốn đặt tour.")[:800],
+            "created_at": (now + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(rows)
+    ]
+    return {
+        "GET /api/tours": [{k: t.get(k) for k in LEAN_TOUR_FIELDS} for t in tours],
+        "GET /api/tours?fields=full": tours,
+        "GET /api/admin/bookings": {"data": bookings, "total": len(bookings)},
+        "GET /api/admin/tour-views": {"data": tour_views, "total": len(tour_views)},
+        "GET /api/chat/sessions/{id}/messages": {"session_id": "session-1", "messages": messages},
+    }
+
+def timed(fn, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200, help="Số phần tử mỗi list")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    print(f"{args.rows} rows/route, trung bình {args.repeat} lần (ms)\n")
+    header = f"{'route':<38} {'json ms':>8} {'orjson ms':>9} {'raw KB':>8}"
+    for encoding in encodings:
+        header += f" {encoding + ' KB':>8} {encoding + ' ms':>8}"
+    print(header)
+
+    for route, payload in build_payloads(args.rows).items():
+        # FastAPI chạy jsonable_encoder trước khi render, như nhau cho cả hai class
+        content = jsonable_encoder(payload)
+        json_ms, body = timed(lambda: JSONResponse(content).body, args.repeat)
+        orjson_ms, fast_body = timed(lambda: ORJSONResponse(content).body, args.repeat)
+        assert json.loads(body) == json.loads(fast_body)
+
+        line = f"{route:<38} {json_ms:8.2f} {orjson_ms:9.2f} {len(fast_body) / 1024:8.1f}"
+        for encoding in encodings:
+            ms, compressed = timed(lambda: compress_body(fast_body, encoding), args.repeat)
+            line += f" {len(compressed) / 1024:8.1f} {ms:8.2f}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+-- Gửi form tư vấn + booking trong MỘT transaction (gọi qua RPC)
+-- Dùng bởi POST /api/consultations (core/leads.py)
+-- Chạy script này trong Supabase SQL Editor
+
+-- Idempotency key: client gửi lại cùng key thì nhận lại kết quả cũ, không tạo lead trùng
+alter table public.consultations add column if not exists idempotency_key text;
+alter table public.bookings add column if not exists idempotency_key text;
+
+create unique index if not exists consultations_idempotency_key_key
+  on public.consultations(idempotency_key) where idempotency_key is not null;
+create unique index if not exists bookings_idempotency_key_key
+  on public.bookings(idempotency_key) where idempotency_key is not null;
+
+-- p_consultation / p_booking là object JSON theo cột của bảng; jsonb_populate_record
+-- ép đúng kiểu cột (uuid, text, ...), các cột không truyền (id, created_at) dùng default
+create or replace function public.submit_consultation(
+  p_consultation jsonb,
+  p_booking jsonb default null,
+  p_idempotency_key text default null
+) returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  v_consultation public.consultations;
+  v_booking public.bookings;
+begin
+  if p_idempotency_key is not null then
+    -- Hai request cùng key chạy đồng thời: request sau chờ request đầu commit
+    perform pg_advisory_xact_lock(hashtext('submit_consultation:' || p_idempotency_key));
+
+    select * into v_consultation from public.consultations where idempotency_key = p_idempotency_key;
+    if found then
+      select * into v_booking from public.bookings where idempotency_key = p_idempotency_key;
+      return jsonb_build_object(
+        'consultation', to_jsonb(v_consultation),
+        'booking', case when v_booking.id is null then null else to_jsonb(v_booking) end,
+        'replayed', true
+      );
+    end if;
+  end if;
+
+  insert into public.consultations (full_name, email, phone, message, status, user_id, tour_id, idempotency_key)
+  select r.full_name, r.email, r.phone, r.message, coalesce(r.status, 'pending'), r.user_id, r.tour_id, p_idempotency_key
+  from jsonb_populate_record(null::public.consultations, p_consultation) r
+  returning * into v_consultation;
+
+  -- Lỗi ở đây rollback luôn consultation ở trên -> không còn dữ liệu ghi dở
+  if p_booking is not null then
+    insert into public.bookings (user_id, tour_id, full_name, email, phone, message, status, idempotency_key)
+    select r.user_id, r.tour_id, r.full_name, r.email, r.phone, r.message, coalesce(r.status, 'pending'), p_idempotency_key
+    from jsonb_populate_record(null::public.bookings, p_booking) r
+    returning * into v_booking;
+  end if;
+
+  return jsonb_build_object(
+    'consultation', to_jsonb(v_consultation),
+    'booking', case when v_booking.id is null then null else to_jsonb(v_booking) end,
+    'replayed', false
+  );
+end;
+$$;
+
+-- Chỉ backend (service role) được gọi
+revoke execute on function public.submit_consultation(jsonb, jsonb, text) from public, anon, authenticated;
+grant execute on function public.submit_consultation(jsonb, jsonb, text) to service_role;
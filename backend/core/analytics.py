@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from core.db import async_supabase_admin
+
+# ==================================================================
+# ANALYTICS: GHI SỰ KIỆN TRACKING + ĐỌC CHUỖI THỜI GIAN TỪ ROLLUP
+# ==================================================================
+# analytics_rollups.sql: mỗi lần ghi sự kiện, hàm record_tracking_events cộng
+# dồn luôn vào bảng rollup theo giờ/ngày trong cùng transaction. Biểu đồ 90
+# ngày chỉ đọc ~90 dòng rollup thay vì quét toàn bộ visitors/tour_views.
+
+METRICS = {"visitors": "visited_at", "tour_views": "viewed_at"}  # metric -> cột thời gian
+RECORD_RPC = "record_tracking_events"
+# Mã lỗi khi hàm chưa tồn tại: PostgREST không thấy trong schema cache / Postgres undefined_function
+MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+
+# Khoảng thời gian tối đa mỗi lần xem, giữ số điểm trên biểu đồ ở mức vừa phải
+MAX_RANGE = {"hour": timedelta(days=31), "day": timedelta(days=3 * 366)}
+DEFAULT_RANGE = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+
+async def record_events(metric: str, events: List[dict]) -> list:
+    """Ghi sự kiện + cập nhật rollup; trả về danh sách id đã tạo"""
+    try:
+        response = await async_supabase_admin.rpc(RECORD_RPC, {"p_metric": metric, "p_events": events}).execute()
+        return response.data or []
+    except Exception as e:
+        # Chỉ khi chưa chạy analytics_rollups.sql mới ghi thẳng dữ liệu thô (rollup
+        # bù lại bằng backfill_analytics.py). Lỗi khác (timeout, DB quá tải, ...) thì
+        # báo lên để hàng đợi thử lại: ghi thô lúc đó làm rollup lệch so với dữ liệu
+        if getattr(e, "code", None) not in MISSING_FUNCTION_CODES:
+            raise
+        print(f"⚠️ Không ghi được rollup {metric} (đã chạy analytics_rollups.sql chưa?): {e}")
+        response = await async_supabase_admin.table(metric)\
+            .upsert(events, on_conflict="id", ignore_duplicates=True)\
+            .execute()
+        return [row.get("id") for row in response.data or []]
+
+def resolve_range(bucket: str, start: Optional[datetime], end: Optional[datetime]):
+    """Điền khoảng mặc định và kiểm tra giới hạn; ValueError nếu không hợp lệ"""
+    # Thời điểm không kèm múi giờ được hiểu theo giờ server (như datetime.now() khi tracking)
+    end = (end or datetime.now()).astimezone()
+    start = start.astimezone() if start else end - DEFAULT_RANGE[bucket]
+    if start >= end:
+        raise ValueError("from phải nhỏ hơn to")
+    if end - start > MAX_RANGE[bucket]:
+        raise ValueError(f"Khoảng thời gian tối đa cho bucket={bucket} là {MAX_RANGE[bucket].days} ngày")
+    return start, end
+
+async def fetch_timeseries(metric: str, bucket: str, start: datetime, end: datetime, tour_id: Optional[str] = None) -> dict:
+    response = await async_supabase_admin.rpc("analytics_timeseries", {
+        "p_metric": metric,
+        "p_bucket": bucket,
+        "p_from": start.isoformat(),
+        "p_to": end.isoformat(),
+        "p_tour_id": tour_id or "",
+    }).execute()
+    points = [{"bucket_start": row["bucket_start"], "count": row["count"]} for row in response.data or []]
+    return {
+        "metric": metric,
+        "bucket": bucket,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "tour_id": tour_id,
+        "points": points,
+        "total": sum(point["count"] for point in points)
+    }
+
+def backfill(client, metric: str, start: datetime, end: datetime, step: timedelta = timedelta(days=7)):
+    """Tính lại rollup theo từng đoạn (mỗi đoạn một transaction ngắn); yield (đầu đoạn, cuối đoạn, số sự kiện)"""
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + step, end)
+        response = client.rpc("backfill_analytics_rollups", {
+            "p_metric": metric,
+            "p_from": chunk_start.isoformat(),
+            "p_to": chunk_end.isoformat(),
+        }).execute()
+        yield chunk_start, chunk_end, response.data or 0
+        chunk_start = chunk_end
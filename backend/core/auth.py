@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Optional
+
+import httpx
+import jwt
+
+from core.cache import TTLCache
+from core.config import (
+    supabase,
+    SUPABASE_KEY,
+    SUPABASE_JWT_SECRET,
+    SUPABASE_JWKS_URL,
+    JWKS_REFRESH_INTERVAL,
+    AUTH_CLAIMS_CACHE_TTL,
+    AUTH_CLAIMS_CACHE_SIZE,
+)
+
+# ==================================================================
+# XÁC THỰC JWT TẠI CHỖ (không gọi Supabase Auth cho mỗi request)
+# ==================================================================
+
+class AuthError(Exception):
+    """Token thiếu, sai chữ ký hoặc đã hết hạn"""
+
+# Supabase ký access token bằng ES256/RS256 (khóa bất đối xứng, công khai qua JWKS)
+# hoặc HS256 với JWT secret của project (kiểu cũ)
+ASYMMETRIC_ALGORITHMS = ["ES256", "RS256"]
+JWT_AUDIENCE = "authenticated"
+# Không làm mới JWKS dồn dập khi gặp kid lạ
+JWKS_MIN_REFRESH_INTERVAL = 30.0
+
+_claims_cache = TTLCache(maxsize=AUTH_CLAIMS_CACHE_SIZE, ttl=AUTH_CLAIMS_CACHE_TTL)
+
+class _JWKSCache:
+    """Giữ bộ khóa công khai của Supabase Auth, làm mới định kỳ"""
+
+    def __init__(self, url: str, refresh_interval: float):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self._keys = {}
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _age(self) -> float:
+        if self._fetched_at is None:
+            return float("inf")
+        return time.monotonic() - self._fetched_at
+
+    def _fetch(self) -> None:
+        response = httpx.get(self.url, headers={"apikey": SUPABASE_KEY or ""}, timeout=5.0)
+        response.raise_for_status()
+        keys = {}
+        for jwk in response.json().get("keys", []):
+            kid = jwk.get("kid")
+            if not kid:
+                continue
+            try:
+                keys[kid] = jwt.PyJWK(jwk)
+            except Exception as e:
+                print(f"⚠️ Bỏ qua JWK không hỗ trợ ({kid}): {e}")
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    def _refresh(self, min_age: float) -> None:
+        with self._lock:
+            if self._age() < min_age:
+                return  # Thread khác vừa làm mới xong
+            try:
+                self._fetch()
+            except Exception as e:
+                # Giữ bộ khóa cũ nếu không tải được, thử lại ở lần sau
+                print(f"⚠️ Không tải được JWKS: {e}")
+                self._fetched_at = time.monotonic() - self.refresh_interval + JWKS_MIN_REFRESH_INTERVAL
+
+    def has_fresh(self, kid: Optional[str]) -> bool:
+        """Có sẵn khóa còn hạn cho kid -> get() không phải gọi mạng"""
+        return self._age() < self.refresh_interval and kid in self._keys
+
+    def get(self, kid: str) -> Optional[jwt.PyJWK]:
+        if self._age() >= self.refresh_interval:
+            self._refresh(self.refresh_interval)
+        key = self._keys.get(kid)
+        if key is None:
+            # Kid lạ: có thể Supabase vừa xoay khóa -> tải lại một lần
+            self._refresh(JWKS_MIN_REFRESH_INTERVAL)
+            key = self._keys.get(kid)
+        return key
+
+_jwks = _JWKSCache(SUPABASE_JWKS_URL, JWKS_REFRESH_INTERVAL)
+
+def extract_bearer(authorization: Optional[str]) -> str:
+    """Tách token từ header Authorization"""
+    if not authorization:
+        raise AuthError("Missing authorization header")
+    token = authorization.replace("Bearer ", "").strip()
+    if not token:
+        raise AuthError("Missing bearer token")
+    return token
+
+def _decode_local(token: str, header: dict) -> Optional[dict]:
+    """Kiểm tra chữ ký và hạn dùng tại chỗ; None nếu kid không có trong JWKS"""
+    alg = header.get("alg")
+    kid = header.get("kid")
+
+    if alg in ASYMMETRIC_ALGORITHMS and kid:
+        signing_key = _jwks.get(kid)
+        if signing_key is None:
+            return None
+        key = signing_key.key
+    elif alg == "HS256" and SUPABASE_JWT_SECRET:
+        key = SUPABASE_JWT_SECRET
+    else:
+        # "none", thuật toán lạ, HS256 khi chưa cấu hình secret: từ chối luôn,
+        # không chuyển sang Supabase Auth (tránh để token tùy ý gây ra request ra ngoài)
+        raise AuthError(f"Unsupported token algorithm: {alg}")
+
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[alg],
+            audience=JWT_AUDIENCE,
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.PyJWTError as e:
+        raise AuthError(str(e))
+
+def _verify_remote(token: str) -> dict:
+    """Fallback: hỏi Supabase Auth (chỉ khi kid chưa có trong JWKS, VD khóa vừa xoay)"""
+    try:
+        response = supabase.auth.get_user(token)
+    except Exception as e:
+        raise AuthError(str(e))
+    if not response or not response.user:
+        raise AuthError("Invalid token")
+    user = response.user
+    # Vẫn lấy exp từ payload (không verify) để không cache quá hạn token
+    unverified = jwt.decode(token, options={"verify_signature": False})
+    return {
+        "sub": user.id,
+        "email": user.email,
+        "role": user.role,
+        "exp": unverified.get("exp", time.time() + AUTH_CLAIMS_CACHE_TTL),
+    }
+
+def verify_token(token: str) -> dict:
+    """Trả về claims của access token hợp lệ, raise AuthError nếu không hợp lệ"""
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    claims = _claims_cache.get(cache_key)
+    if claims is not None:
+        return claims
+
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError as e:
+        raise AuthError(str(e))
+
+    claims = _decode_local(token, header)
+    if claims is None:
+        claims = _verify_remote(token)
+
+    # Không giữ claims lâu hơn hạn của chính token
+    ttl = min(AUTH_CLAIMS_CACHE_TTL, claims["exp"] - time.time())
+    _claims_cache.set(cache_key, claims, ttl=ttl)
+    return claims
+
+def _needs_network(token: str) -> bool:
+    """Token có phải tải lại JWKS hoặc hỏi Supabase Auth mới kiểm tra được không"""
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError:
+        return False  # verify_token báo lỗi ngay, không gọi mạng
+    return header.get("alg") in ASYMMETRIC_ALGORITHMS and not _jwks.has_fresh(header.get("kid"))
+
+async def verify_token_async(token: str) -> dict:
+    """Bản async của verify_token: phần gọi mạng (JWKS, Supabase Auth) chạy trong thread"""
+    claims = _claims_cache.get(hashlib.sha256(token.encode()).hexdigest())
+    if claims is not None:
+        return claims
+    if _needs_network(token):
+        # Nhiều request cùng chờ một lần tải JWKS (khóa trong _JWKSCache._refresh)
+        return await asyncio.to_thread(verify_token, token)
+    return verify_token(token)
+
+def get_user_id(authorization: Optional[str]) -> str:
+    """Lấy user_id (claim sub) từ header Authorization"""
+    return verify_token(extract_bearer(authorization))["sub"]
+
+async def get_user_id_async(authorization: Optional[str]) -> str:
+    """Như get_user_id, dùng trong handler/dependency async def (không chặn event loop)"""
+    return (await verify_token_async(extract_bearer(authorization)))["sub"]
+
+def claims_cache_stats() -> dict:
+    return _claims_cache.stats()
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+_MISSING = object()
+
+class TTLCache:
+    """Cache trong bộ nhớ có TTL và giới hạn kích thước (loại bỏ theo LRU)"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Handler sync của FastAPI chạy trong threadpool nên cần khóa
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at <= now:
+                # Hết hạn: xóa luôn để không chiếm chỗ
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Xóa và trả về giá trị; default nếu không có hoặc đã hết hạn"""
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        if item is _MISSING or item[1] <= time.monotonic():
+            return default
+        return item[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Số liệu hit/miss để tinh chỉnh TTL"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+class AsyncSnapshot:
+    """
+    Giữ kết quả của một phép tính async tốn kém (VD: thống kê dashboard).
+    Còn trong TTL -> trả ngay; quá TTL nhưng chưa quá max_stale -> vẫn trả bản cũ
+    và tính lại ở nền (stale-while-revalidate); chỉ lần đầu hoặc quá cũ mới phải chờ.
+    Nhiều request cùng lúc dùng chung một lần tính. Sau invalidate() (dữ liệu vừa
+    đổi), request kế tiếp chờ kết quả mới thay vì nhận bản cũ.
+    """
+
+    def __init__(self, compute: Callable[[], Awaitable[Any]], ttl: float, max_stale: float):
+        self._compute = compute
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._value: Any = _MISSING
+        self._computed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        # Mỗi lần invalidate tăng thế hệ; kết quả của lần tính bắt đầu trước đó bị coi là cũ
+        self._generation = 0
+        self._value_generation = 0
+        self._task_generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def _run(self, generation: int) -> Any:
+        value = await self._compute()
+        # Không ghi đè kết quả của một lần tính mới hơn
+        if generation >= self._value_generation:
+            self._value, self._computed_at = value, time.monotonic()
+            self._value_generation = generation
+        return value
+
+    def _refresh_task(self) -> asyncio.Task:
+        if self._task is None or self._task.done() or self._task_generation < self._generation:
+            self._task_generation = self._generation
+            self._task = asyncio.ensure_future(self._run(self._generation))
+            self._task.add_done_callback(self._log_failure)
+        return self._task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️ Không tính lại được snapshot: {task.exception()}")
+
+    @property
+    def age(self) -> Optional[float]:
+        if self._value is _MISSING:
+            return None
+        return time.monotonic() - self._computed_at
+
+    def invalidate(self) -> None:
+        """Dữ liệu nguồn vừa thay đổi: lần get() sau phải tính lại"""
+        self._generation += 1
+
+    async def get(self) -> Any:
+        age = self.age
+        if age is not None and self._value_generation < self._generation:
+            self.misses += 1
+            try:
+                return await asyncio.shield(self._refresh_task())
+            except Exception as e:
+                # Tính lại lỗi: vẫn còn bản cũ để trả (như khi đang stale)
+                print(f"⚠️ Không tính lại được snapshot sau invalidate, dùng bản cũ: {e}")
+                return self._value
+        if age is not None and age < self.ttl:
+            self.hits += 1
+            return self._value
+        if age is not None and age < self.max_stale:
+            self.stale_hits += 1
+            self._refresh_task()
+            return self._value
+        self.misses += 1
+        # shield: client hủy request cũng không hủy phép tính dùng chung
+        return await asyncio.shield(self._refresh_task())
+
+    def warm(self) -> None:
+        """Bắt đầu tính ở nền (gọi lúc khởi động để request đầu tiên không phải chờ)"""
+        self._refresh_task()
+
+    def stats(self) -> dict:
+        age = self.age
+        return {
+            "ttl": self.ttl,
+            "max_stale": self.max_stale,
+            "age": round(age, 1) if age is not None else None,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+
+from core.config import supabase, TOUR_CATALOG_REFRESH_INTERVAL
+from core.images import image_manifest
+
+# ==================================================================
+# CATALOG TOUR TRONG BỘ NHỚ (snapshot có version)
+# ==================================================================
+# Tour rất ít thay đổi nên cả process giữ một snapshot bất biến của bảng tours.
+# Mỗi lần thay đổi tạo snapshot mới rồi gán lại tham chiếu (atomic), handler đang
+# đọc snapshot cũ không bị ảnh hưởng.
+
+# Các cột vector rất nặng, không bao giờ trả về client
+VECTOR_COLUMNS = ("embedding", "embedding_1024", "embedding_768")
+
+# Bộ cột gọn mặc định cho danh sách/thẻ tour: bỏ vector và các cột văn bản dài
+# (description, additional_info, itinerary, ...)
+LEAN_TOUR_FIELDS = (
+    "id", "title", "title_en", "image", "images", "price", "price_vnd",
+    "rating", "reviews", "departure", "destination", "transportation", "type",
+    "created_at",
+)
+
+# Chưa nạp được catalog thì thử lại dày hơn chu kỳ làm mới bình thường
+CATALOG_RETRY_INTERVAL = 5.0
+
+class CatalogUnavailable(HTTPException):
+    """Catalog chưa nạp xong (VD: Supabase lỗi lúc startup) -> 503, client thử lại sau"""
+
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Danh sách tour đang được tải, vui lòng thử lại sau",
+            headers={"Retry-After": str(int(CATALOG_RETRY_INTERVAL))},
+        )
+
+class TourSnapshot:
+    def __init__(self, version: int, tours: Dict[str, dict], vectors: Dict[str, dict], fingerprint: str):
+        self.version = version
+        self.tours = tours              # id -> row (đã bỏ cột vector)
+        self.vectors = vectors          # id -> {tên cột: giá trị thô}
+        self.fingerprint = fingerprint
+        # Mới nhất lên đầu, giống order("created_at", desc=True) cũ; id để phân định
+        # các tour cùng created_at (cần cho phân trang keyset)
+        self.ordered_ids: List[str] = sorted(
+            tours, key=lambda tid: sort_key(tours[tid]), reverse=True
+        )
+        self.created_at = time.time()
+
+    @property
+    def etag(self) -> str:
+        return f'W/"tours-{self.version}"'
+
+def sort_key(tour: dict) -> tuple:
+    return (tour.get("created_at") or "", str(tour.get("id")))
+
+def _split_row(row: dict):
+    tour = {k: v for k, v in row.items() if k not in VECTOR_COLUMNS}
+    # DB chỉ lưu tên file ảnh -> điền URL theo manifest của upload_images.py
+    tour = image_manifest.fill_tour(tour)
+    vectors = {k: row[k] for k in VECTOR_COLUMNS if row.get(k) is not None}
+    return str(row["id"]), tour, vectors
+
+def _fingerprint(tours: Dict[str, dict], vectors: Dict[str, dict]) -> str:
+    payload = json.dumps([tours, vectors], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class TourCatalog:
+    def __init__(self):
+        self._snapshot: Optional[TourSnapshot] = None
+        self._lock = threading.RLock()
+        # Hàm được gọi sau mỗi lần snapshot đổi: fn(snapshot, changed_ids)
+        # changed_ids = None nghĩa là nạp lại toàn bộ
+        self._listeners: List[Callable] = []
+
+    # --- Đọc ---
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def snapshot(self) -> TourSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Không nạp đồng bộ ở đây (sẽ chặn event loop/threadpool trong lúc
+            # Supabase đang lỗi); run_refresher đang thử lại ở nền
+            raise CatalogUnavailable()
+        return snapshot
+
+    def loaded_tours(self) -> Dict[str, dict]:
+        """id -> tour của snapshot hiện tại, {} nếu chưa nạp (nơi gọi tự query phần thiếu)"""
+        snapshot = self._snapshot
+        return snapshot.tours if snapshot is not None else {}
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    def get(self, tour_id: str) -> Optional[dict]:
+        return self.snapshot.tours.get(str(tour_id))
+
+    def exists(self, tour_id: str) -> bool:
+        return str(tour_id) in self.snapshot.tours
+
+    def list(self) -> List[dict]:
+        snap = self.snapshot
+        return [snap.tours[tid] for tid in snap.ordered_ids]
+
+    def subscribe(self, listener: Callable) -> None:
+        self._listeners.append(listener)
+        if self._snapshot is not None:
+            listener(self._snapshot, None)
+
+    # --- Ghi ---
+    def _publish(self, snapshot: TourSnapshot, changed_ids: Optional[Iterable[str]]) -> None:
+        self._snapshot = snapshot
+        changed = set(changed_ids) if changed_ids is not None else None
+        for listener in self._listeners:
+            try:
+                listener(snapshot, changed)
+            except Exception as e:
+                print(f"⚠️ Lỗi cập nhật index theo catalog: {e}")
+
+    def refresh(self) -> bool:
+        """Nạp lại toàn bộ bảng tours, chỉ tăng version nếu dữ liệu thật sự đổi"""
+        response = supabase.table("tours").select("*").execute()
+        tours, vectors = {}, {}
+        for row in response.data or []:
+            tour_id, tour, vec = _split_row(row)
+            tours[tour_id] = tour
+            vectors[tour_id] = vec
+        fingerprint = _fingerprint(tours, vectors)
+
+        with self._lock:
+            current = self._snapshot
+            if current is not None and current.fingerprint == fingerprint:
+                return False
+            version = current.version + 1 if current else 1
+            self._publish(TourSnapshot(version, tours, vectors, fingerprint), None)
+        print(f"✅ Tour catalog v{version}: {len(tours)} tour.")
+        return True
+
+    def apply_upsert(self, row: dict) -> None:
+        """Write-through sau khi create/update tour thành công"""
+        tour_id, tour, vec = _split_row(row)
+        with self._lock:
+            current = self._snapshot
+            if current is None:
+                return  # Lần nạp đầu tiên (run_refresher) sẽ lấy cả tour này
+            tours = dict(current.tours)
+            vectors = dict(current.vectors)
+            # Update chỉ trả về các cột đã sửa nếu dùng return=minimal -> gộp với bản cũ
+            tours[tour_id] = {**tours.get(tour_id, {}), **tour}
+            vectors[tour_id] = {**vectors.get(tour_id, {}), **vec}
+            self._publish(
+                TourSnapshot(current.version + 1, tours, vectors, _fingerprint(tours, vectors)),
+                [tour_id],
+            )
+
+    def apply_delete(self, tour_id: str) -> None:
+        tour_id = str(tour_id)
+        with self._lock:
+            current = self._snapshot
+            if current is None or tour_id not in current.tours:
+                return
+            tours = {k: v for k, v in current.tours.items() if k != tour_id}
+            vectors = {k: v for k, v in current.vectors.items() if k != tour_id}
+            self._publish(
+                TourSnapshot(current.version + 1, tours, vectors, _fingerprint(tours, vectors)),
+                [tour_id],
+            )
+
+    async def run_refresher(self, interval: float = TOUR_CATALOG_REFRESH_INTERVAL) -> None:
+        """Làm mới định kỳ để bắt các thay đổi sửa trực tiếp trên Supabase"""
+        while True:
+            await asyncio.sleep(interval if self.loaded else CATALOG_RETRY_INTERVAL)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"⚠️ Không làm mới được tour catalog: {e}")
+
+# Catalog dùng chung toàn process
+catalog = TourCatalog()
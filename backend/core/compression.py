@@ -0,0 +1,150 @@
+import gzip
+import zlib
+from typing import Callable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli là tùy chọn, thiếu thì chỉ dùng gzip
+    brotli = None
+
+from core.config import COMPRESSION_MIN_SIZE, GZIP_LEVEL, BROTLI_QUALITY
+
+# ==================================================================
+# NÉN RESPONSE THEO ACCEPT-ENCODING (brotli / gzip)
+# ==================================================================
+# Nén sau khi handler render xong: body nhỏ hơn ngưỡng giữ nguyên (nén không
+# lợi mà tốn CPU), route có thể tự tắt nén bằng decorator @no_compression.
+
+# SSE phải tới client ngay từng event; file đã nén (export .gz, ảnh) không nén lại
+EXCLUDED_MEDIA_TYPES = ("text/event-stream", "application/gzip", "image/", "video/")
+
+def no_compression(endpoint: Callable) -> Callable:
+    """Đánh dấu route không cần nén (payload luôn rất nhỏ, hoặc tự xử lý)"""
+    endpoint.skip_compression = True
+    return endpoint
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Chọn 'br' hoặc 'gzip' theo header Accept-Encoding (có hỗ trợ q=0)"""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        # Cùng trọng số thì ưu tiên thứ tự trong candidates (br trước)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+class _StreamCompressor:
+    """Nén tăng dần cho StreamingResponse, flush sau mỗi chunk để client nhận ngay"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits | 16 -> có header/trailer gzip
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, chunk: bytes) -> bytes:
+        # Không flush thì bộ nén giữ chunk nhỏ lại tới cuối stream (như buffer cả body)
+        if self.encoding == "br":
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                # Giữ lại header cho tới khi thấy body đầu tiên
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if passthrough:
+                await send(message)
+                return
+
+            if compressor is not None:
+                data = compressor.compress(message.get("body", b""))
+                if not message.get("more_body", False):
+                    data += compressor.finish()
+                if data or not message.get("more_body", False):
+                    await send({"type": "http.response.body", "body": data, "more_body": message.get("more_body", False)})
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            media_type = headers.get("content-type", "")
+
+            if (
+                getattr(scope.get("endpoint"), "skip_compression", False)
+                or "content-encoding" in headers
+                or media_type.startswith(EXCLUDED_MEDIA_TYPES)
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            headers["Content-Encoding"] = encoding
+            if more_body:
+                compressor = _StreamCompressor(encoding)
+                del headers["Content-Length"]
+                await send(start_message)
+                await send({"type": "http.response.body", "body": compressor.compress(body), "more_body": True})
+                return
+
+            compressed = compress_body(body, encoding)
+            headers["Content-Length"] = str(len(compressed))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
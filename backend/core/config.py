@@ -8,8 +8,67 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY")  # Service key để bypass RLS
 
+# --- Xác thực JWT tại chỗ ---
+# Secret của project, BẮT BUỘC nếu project còn ký token HS256 (kiểu cũ): để trống thì token HS256 bị từ chối
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL") or f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+JWKS_REFRESH_INTERVAL = float(os.getenv("JWKS_REFRESH_INTERVAL", "600"))  # Giây
+AUTH_CLAIMS_CACHE_TTL = float(os.getenv("AUTH_CLAIMS_CACHE_TTL", "60"))  # Giây
+AUTH_CLAIMS_CACHE_SIZE = int(os.getenv("AUTH_CLAIMS_CACHE_SIZE", "4096"))
+
+# --- Connection pool tới PostgREST (dùng chung cho mọi request) ---
+SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "100"))
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "20"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))  # Giây
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "10"))  # Giây
+
+# --- Cache role (admin/user) theo user_id ---
+ROLE_CACHE_TTL = float(os.getenv("ROLE_CACHE_TTL", "60"))  # Giây
+ROLE_CACHE_SIZE = int(os.getenv("ROLE_CACHE_SIZE", "1024"))
+
+# --- Cache profile (email, tên) cho các trang admin ---
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))  # Giây
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "2048"))
+
+# --- Cache tập id tour yêu thích theo user ---
+FAVORITE_CACHE_TTL = float(os.getenv("FAVORITE_CACHE_TTL", "300"))  # Giây
+FAVORITE_CACHE_SIZE = int(os.getenv("FAVORITE_CACHE_SIZE", "4096"))
+
+# --- Snapshot thống kê dashboard admin (stale-while-revalidate) ---
+DASHBOARD_STATS_TTL = float(os.getenv("DASHBOARD_STATS_TTL", "30"))  # Giây, trong khoảng này trả ngay
+DASHBOARD_STATS_MAX_STALE = float(os.getenv("DASHBOARD_STATS_MAX_STALE", "600"))  # Giây, quá mức này mới phải chờ tính lại
+
+# --- Export dữ liệu admin (CSV/NDJSON) ---
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))  # Số dòng mỗi lô keyset
+
+# --- Hàng đợi ghi sau cho tracking (visitor, tour view) ---
+TRACKING_QUEUE_SIZE = int(os.getenv("TRACKING_QUEUE_SIZE", "10000"))  # Số sự kiện tối đa chờ ghi
+TRACKING_BATCH_SIZE = int(os.getenv("TRACKING_BATCH_SIZE", "200"))  # Đủ số này thì ghi ngay
+TRACKING_FLUSH_INTERVAL = float(os.getenv("TRACKING_FLUSH_INTERVAL", "1"))  # Giây, ghi phần còn lại định kỳ
+TRACKING_OVERFLOW = os.getenv("TRACKING_OVERFLOW", "drop_newest")  # drop_newest | drop_oldest
+TRACKING_MAX_ATTEMPTS = int(os.getenv("TRACKING_MAX_ATTEMPTS", "5"))  # Lô lỗi quá số lần này thì ghi từng dòng
+
+# --- Luồng sự kiện admin (SSE) ---
+EVENT_REPLAY_SIZE = int(os.getenv("EVENT_REPLAY_SIZE", "1000"))  # Số sự kiện gần nhất giữ lại để phát bù
+EVENT_CLIENT_QUEUE_SIZE = int(os.getenv("EVENT_CLIENT_QUEUE_SIZE", "100"))  # Đầy thì ngắt client chậm
+EVENT_HEARTBEAT_INTERVAL = float(os.getenv("EVENT_HEARTBEAT_INTERVAL", "15"))  # Giây, giữ kết nối qua proxy
+STREAM_TICKET_TTL = float(os.getenv("STREAM_TICKET_TTL", "30"))  # Giây, ticket mở /api/admin/stream (dùng 1 lần)
+
+# --- Catalog tour trong bộ nhớ ---
+TOUR_CATALOG_REFRESH_INTERVAL = float(os.getenv("TOUR_CATALOG_REFRESH_INTERVAL", "300"))  # Giây
+
+# --- Manifest ảnh do upload_images.py sinh ra (tên file -> URL trên CDN) ---
+IMAGE_MANIFEST_PATH = os.getenv("IMAGE_MANIFEST_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "image_manifest.json"
+)
+
+# --- Nén response (brotli/gzip) ---
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # Byte, nhỏ hơn thì không nén
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))  # 0-11; >6 quá chậm cho response động
+
 # Tạo client admin dùng chung (dùng anon key cho các API endpoints public)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 # Tạo client admin với service key để bypass RLS (cho admin operations)
-supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
\ No newline at end of file
+supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
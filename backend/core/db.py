@@ -0,0 +1,93 @@
+from typing import Any, Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient, DEFAULT_POSTGREST_CLIENT_HEADERS
+
+from core.config import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    SUPABASE_SERVICE_KEY,
+    SUPABASE_POOL_MAX_CONNECTIONS,
+    SUPABASE_POOL_MAX_KEEPALIVE,
+    SUPABASE_KEEPALIVE_EXPIRY,
+    SUPABASE_HTTP_TIMEOUT,
+)
+
+# ==================================================================
+# CLIENT POSTGREST DÙNG CHUNG CONNECTION POOL
+# ==================================================================
+# create_client() của supabase tạo một httpx pool mới mỗi lần gọi, còn
+# postgrest.auth() lại sửa header của cả client -> không dùng chung được giữa
+# các user. Ở đây mọi client postgrest-py (Sync/AsyncPostgrestClient) được gắn
+# vào MỘT pool keep-alive (http_client=...), token của từng user nằm trong
+# header của client riêng của user đó (tạo rất rẻ, không tạo pool mới):
+#   await async_user_client(token).table("favorites").select("*").eq("user_id", uid).execute()
+# Lỗi PostgREST là postgrest.APIError (có .code, .message, .details).
+
+REST_URL = f"{SUPABASE_URL}/rest/v1"
+
+def _quote(value: Any) -> str:
+    """Giá trị trong bộ lọc or=(...) cần đặt trong ngoặc kép nếu có ký tự đặc biệt"""
+    text = str(value)
+    if any(ch in text for ch in ',()"\\ '):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+def keyset(query, column: str, value: Any, tie_column: str, tie_value: Any, desc: bool = True):
+    """Lấy các dòng nằm sau (column, tie_column) = (value, tie_value) theo thứ tự sắp xếp"""
+    op = "lt" if desc else "gt"
+    value, tie_value = _quote(value), _quote(tie_value)
+    return query.or_(f"{column}.{op}.{value},and({column}.eq.{value},{tie_column}.{op}.{tie_value})")
+
+# ==================================================================
+# CONNECTION POOL (dùng chung toàn process)
+# Handler "def" (chạy trong threadpool) dùng pool sync, handler "async def"
+# dùng pool async để không chặn event loop.
+# ==================================================================
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=SUPABASE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+    )
+
+# Tạo httpx client không mở kết nối nào; kết nối chỉ được mở ở request đầu tiên
+_sync_http = httpx.Client(limits=_pool_limits(), timeout=SUPABASE_HTTP_TIMEOUT)
+_async_http = httpx.AsyncClient(limits=_pool_limits(), timeout=SUPABASE_HTTP_TIMEOUT)
+
+def _auth_headers(api_key: str, token: Optional[str] = None) -> dict:
+    return {
+        **DEFAULT_POSTGREST_CLIENT_HEADERS,
+        "apikey": api_key,
+        "Authorization": f"Bearer {token or api_key}",
+    }
+
+def user_client(token: str) -> SyncPostgrestClient:
+    """Client chạy với quyền của user (RLS áp dụng theo token)"""
+    return SyncPostgrestClient(REST_URL, headers=_auth_headers(SUPABASE_KEY, token), http_client=_sync_http)
+
+def anon_client() -> SyncPostgrestClient:
+    return _anon
+
+def service_client() -> SyncPostgrestClient:
+    """Client dùng service key (bypass RLS)"""
+    return _service
+
+_anon = SyncPostgrestClient(REST_URL, headers=_auth_headers(SUPABASE_KEY), http_client=_sync_http)
+_service = SyncPostgrestClient(REST_URL, headers=_auth_headers(SUPABASE_SERVICE_KEY), http_client=_sync_http)
+
+# --- Client async cho các handler async def (không block event loop) ---
+
+def async_user_client(token: str) -> AsyncPostgrestClient:
+    """Như user_client nhưng execute() trả về coroutine: await ....execute()"""
+    return AsyncPostgrestClient(REST_URL, headers=_auth_headers(SUPABASE_KEY, token), http_client=_async_http)
+
+# Client async dùng chung, tương ứng supabase / supabase_admin trong core.config
+async_supabase = AsyncPostgrestClient(REST_URL, headers=_auth_headers(SUPABASE_KEY), http_client=_async_http)
+async_supabase_admin = AsyncPostgrestClient(REST_URL, headers=_auth_headers(SUPABASE_SERVICE_KEY), http_client=_async_http)
+
+async def close_pools() -> None:
+    """Đóng các connection pool khi tắt server"""
+    _sync_http.close()
+    await _async_http.aclose()
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import secrets
+import time
+from collections import deque
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from core.cache import TTLCache
+from core.config import EVENT_REPLAY_SIZE, EVENT_CLIENT_QUEUE_SIZE, STREAM_TICKET_TTL
+
+# ==================================================================
+# PUB/SUB SỰ KIỆN CHO ADMIN (booking/consultation mới, đổi trạng thái)
+# ==================================================================
+# Các handler ghi dữ liệu gọi publish_event(); GET /api/admin/stream (SSE) đăng
+# ký nhận. InProcessBroker chỉ phục vụ client nối vào CÙNG process; chạy nhiều
+# worker thì thay bằng broker dùng chung (Redis pub/sub, Postgres LISTEN/NOTIFY)
+# có cùng các hàm publish / subscribe / unsubscribe / close / stats.
+
+class Event(NamedTuple):
+    id: str
+    type: str   # VD: "booking.created", "consultation.status_changed", "reset"
+    data: Any
+
+_CLOSED = object()
+
+class Subscription:
+    """
+    Hàng đợi có giới hạn cho một client. Client chậm làm đầy hàng đợi thì bị
+    ngắt (overflowed) thay vì giữ sự kiện vô hạn hoặc làm chậm bên publish;
+    EventSource tự nối lại với Last-Event-ID và được phát bù từ lịch sử.
+    """
+
+    def __init__(self, backlog: List[Event], maxsize: int = EVENT_CLIENT_QUEUE_SIZE):
+        self.backlog = backlog  # Sự kiện phát bù (replay), gửi trước tiên
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+        self.closed = False
+
+    def push(self, event: Event) -> bool:
+        if self.overflowed or self.closed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self.queue.put_nowait(_CLOSED)  # Đánh thức consumer đang chờ
+        except asyncio.QueueFull:
+            pass  # Consumer đang bận, sẽ thấy closed khi đọc hết hàng đợi
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Sự kiện kế tiếp; None nếu hết timeout (gửi heartbeat); _CLOSED nếu phải dừng"""
+        if self.queue.empty() and (self.overflowed or self.closed):
+            return _CLOSED
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class InProcessBroker:
+    def __init__(self, replay_size: int = EVENT_REPLAY_SIZE, queue_size: int = EVENT_CLIENT_QUEUE_SIZE):
+        # Id dạng "<epoch>-<seq>": server khởi động lại thì epoch đổi, client
+        # gửi Last-Event-ID cũ sẽ nhận "reset" thay vì phát bù sai
+        self._epoch = format(int(time.time() * 1000), "x")
+        self._seq = 0
+        self._history: deque = deque(maxlen=replay_size)  # (seq, Event)
+        self._subscribers: set = set()
+        self._queue_size = queue_size
+        self._overflows = 0
+
+    def _current_id(self) -> str:
+        return f"{self._epoch}-{self._seq}"
+
+    def _replay(self, last_event_id: Optional[str]) -> List[Event]:
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch == self._epoch and seq.isdigit():
+            seq = int(seq)
+            oldest = self._history[0][0] if self._history else self._seq + 1
+            if seq <= self._seq and seq >= oldest - 1:
+                return [event for s, event in self._history if s > seq]
+        # Không phát bù được (quá cũ, hoặc từ process khác): client tải lại danh sách
+        return [Event(self._current_id(), "reset", {"reason": "replay_unavailable"})]
+
+    async def publish(self, type: str, data: Any) -> Event:
+        self._seq += 1
+        event = Event(self._current_id(), type, data)
+        self._history.append((self._seq, event))
+        for subscription in list(self._subscribers):
+            if not subscription.push(event) and subscription.overflowed:
+                self._overflows += 1
+                self._subscribers.discard(subscription)
+        return event
+
+    async def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        # Lấy lịch sử và đăng ký trong cùng một bước (không await xen giữa) -> không sót sự kiện
+        subscription = Subscription(self._replay(last_event_id), self._queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    async def close(self) -> None:
+        """Kết thúc mọi stream đang mở (khi tắt server)"""
+        for subscription in list(self._subscribers):
+            subscription.close()
+        self._subscribers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "broker": "in_process",
+            "subscribers": len(self._subscribers),
+            "published": self._seq,
+            "history": len(self._history),
+            "overflows": self._overflows
+        }
+
+_broker = None
+
+def get_event_broker():
+    """EVENT_BROKER=memory (mặc định); broker khác gắn vào bằng set_event_broker"""
+    global _broker
+    if _broker is None:
+        if os.getenv("EVENT_BROKER", "memory") != "memory":
+            print(f"⚠️ EVENT_BROKER={os.getenv('EVENT_BROKER')} chưa được hỗ trợ, dùng broker trong process")
+        _broker = InProcessBroker()
+    return _broker
+
+def set_event_broker(broker) -> None:
+    """Thay broker (VD: broker dùng chung giữa các worker, hoặc bản giả trong test)"""
+    global _broker
+    _broker = broker
+
+# Listener trong process (VD: xóa cache thống kê), chạy ngay khi có sự kiện,
+# không phụ thuộc broker nào đang dùng
+_listeners: List[Callable[[str, Any], None]] = []
+
+def add_listener(listener: Callable[[str, Any], None]) -> None:
+    _listeners.append(listener)
+
+async def publish_event(type: str, data: Any) -> None:
+    """Gọi từ các handler ghi dữ liệu; lỗi của broker/listener không làm hỏng request"""
+    for listener in _listeners:
+        try:
+            listener(type, data)
+        except Exception as e:
+            print(f"⚠️ Listener lỗi với sự kiện {type}: {e}")
+    try:
+        await get_event_broker().publish(type, data)
+    except Exception as e:
+        print(f"⚠️ Không publish được sự kiện {type}: {e}")
+
+# ==================================================================
+# TICKET MỞ STREAM (thay cho access token trên query string)
+# ==================================================================
+# EventSource không gửi được header Authorization. Đưa JWT lên URL thì token lọt
+# vào access log, log proxy, lịch sử trình duyệt. Thay vào đó client đổi JWT lấy
+# một ticket ngẫu nhiên (POST /api/admin/stream/ticket), sống STREAM_TICKET_TTL
+# giây và chỉ mở được MỘT stream. Ticket nằm trong bộ nhớ process giống
+# InProcessBroker: chạy nhiều worker thì phải chuyển sang store dùng chung.
+
+_stream_tickets = TTLCache(maxsize=1024, ttl=STREAM_TICKET_TTL)
+
+def issue_stream_ticket(user_id: str) -> str:
+    ticket = secrets.token_urlsafe(32)
+    _stream_tickets.set(ticket, user_id)
+    return ticket
+
+def redeem_stream_ticket(ticket: str) -> Optional[str]:
+    """user_id của ticket; None nếu ticket sai, hết hạn hoặc đã dùng"""
+    return _stream_tickets.pop(ticket)
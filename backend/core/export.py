@@ -0,0 +1,83 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+import orjson
+
+from core.config import GZIP_LEVEL
+
+# ==================================================================
+# EXPORT DỮ LIỆU THEO LUỒNG (CSV / NDJSON, tùy chọn gzip)
+# ==================================================================
+# Đọc bảng theo từng lô keyset và ghi ra ngay từng lô: bộ nhớ server chỉ giữ
+# một lô dù bảng lớn tới đâu. Khi bật gzip, mỗi lô được flush (Z_SYNC_FLUSH)
+# nên file tải dở vẫn giải nén được tới dòng cuối cùng đã nhận -> client lấy
+# id của dòng đó để tải tiếp (after_id).
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+# fetch(cursor) -> (các dòng của lô, cursor lô kế tiếp hoặc None)
+FetchBatch = Callable[[Optional[str]], Awaitable[Tuple[List[dict], Optional[str]]]]
+
+def _cell(value):
+    if value is None:
+        return ""
+    # Cột mảng/JSON (images, tours embed, ...) ghi dạng JSON như CSV export của Supabase
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value).decode("utf-8")
+    return value
+
+class CsvEncoder:
+    """Cột lấy theo dòng đầu tiên; header bỏ qua khi tải tiếp để nối thẳng vào file cũ"""
+
+    def __init__(self, header: bool = True):
+        self.header = header
+        self.columns: Optional[List[str]] = None
+
+    def encode(self, rows: List[dict]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self.columns is None:
+            self.columns = list(rows[0].keys())
+            if self.header:
+                writer.writerow(self.columns)
+        for row in rows:
+            writer.writerow([_cell(row.get(column)) for column in self.columns])
+        return buffer.getvalue().encode("utf-8")
+
+class NdjsonEncoder:
+    def encode(self, rows: List[dict]) -> bytes:
+        return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+def make_encoder(fmt: str, header: bool = True):
+    return CsvEncoder(header) if fmt == "csv" else NdjsonEncoder()
+
+async def stream_export(
+    first_batch: Tuple[List[dict], Optional[str]],
+    fetch: FetchBatch,
+    encoder,
+    compress: bool = False
+) -> AsyncIterator[bytes]:
+    """Phát từng lô đã encode; lô đầu được lấy trước (để lỗi trả về đúng status code)"""
+    gz = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16) if compress else None
+    rows, cursor = first_batch
+    exported = 0
+    try:
+        while True:
+            if rows:
+                chunk = encoder.encode(rows)
+                exported += len(rows)
+                yield gz.compress(chunk) + gz.flush(zlib.Z_SYNC_FLUSH) if gz else chunk
+            if not cursor:
+                break
+            rows, cursor = await fetch(cursor)
+        if gz:
+            yield gz.flush()
+    except Exception as e:
+        # Header đã gửi, không đổi được status -> ngắt kết nối để client biết file bị cắt
+        print(f"❌ Export bị ngắt sau {exported} dòng: {e}")
+        raise
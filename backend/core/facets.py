@@ -0,0 +1,132 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# ==================================================================
+# BITMAP INDEX CHO BỘ LỌC NHIỀU GIÁ TRỊ VÀ ĐẾM FACET
+# ==================================================================
+# Mỗi tour có một vị trí cố định (theo thứ tự mới nhất lên đầu của snapshot),
+# mỗi giá trị facet giữ một bitmap (int Python) các vị trí có giá trị đó. Lọc là
+# AND/OR bitmap, đếm facet là popcount -> không phải quét lại từng tour.
+
+FACET_FIELDS = ("type", "transportation", "departure", "destination")
+RANGE_FIELDS = ("price", "price_vnd", "rating")
+
+def _values(value) -> List[str]:
+    if value is None or value == "":
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value if v not in (None, "")]
+    return [str(value)]
+
+def _positions(bits: int, size: int) -> np.ndarray:
+    """Vị trí các bit đang bật (numpy, không lặp Python qua từng vị trí)"""
+    raw = np.frombuffer(bits.to_bytes(max((size + 7) // 8, 1), "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+class _FacetState:
+    def __init__(self, snapshot):
+        self.ids: List[str] = list(snapshot.ordered_ids)
+        self.position: Dict[str, int] = {tour_id: pos for pos, tour_id in enumerate(self.ids)}
+        self.all_bits = (1 << len(self.ids)) - 1
+        self.postings: Dict[str, Dict[str, int]] = {field: {} for field in FACET_FIELDS}
+        # Cột số: danh sách (giá trị, vị trí) đã sắp xếp để tìm khoảng bằng bisect
+        self.sorted_values: Dict[str, List[Tuple[float, int]]] = {field: [] for field in RANGE_FIELDS}
+
+        for pos, tour_id in enumerate(self.ids):
+            tour = snapshot.tours[tour_id]
+            bit = 1 << pos
+            for field in FACET_FIELDS:
+                postings = self.postings[field]
+                for value in _values(tour.get(field)):
+                    postings[value] = postings.get(value, 0) | bit
+            for field in RANGE_FIELDS:
+                value = tour.get(field)
+                if value is not None:
+                    self.sorted_values[field].append((float(value), pos))
+        for field in RANGE_FIELDS:
+            self.sorted_values[field].sort()
+        self.keys = {field: [v for v, _ in self.sorted_values[field]] for field in RANGE_FIELDS}
+
+class FacetIndex:
+    def __init__(self):
+        self._state: Optional[_FacetState] = None
+
+    def on_catalog_change(self, snapshot, changed_ids: Optional[Set[str]]) -> None:
+        # Vị trí bit phụ thuộc thứ tự snapshot nên dựng lại toàn bộ (rất rẻ với catalog tour)
+        self._state = _FacetState(snapshot)
+
+    @property
+    def state(self) -> _FacetState:
+        return self._state
+
+    def _range_bits(self, state: _FacetState, field: str, low: Optional[float], high: Optional[float]) -> int:
+        keys = state.keys[field]
+        start = bisect_left(keys, low) if low is not None else 0
+        end = bisect_right(keys, high) if high is not None else len(keys)
+        bits = 0
+        for _, pos in state.sorted_values[field][start:end]:
+            bits |= 1 << pos
+        return bits
+
+    def _id_bits(self, state: _FacetState, ids: Iterable[str]) -> int:
+        bits = 0
+        for tour_id in ids:
+            pos = state.position.get(str(tour_id))
+            if pos is not None:
+                bits |= 1 << pos
+        return bits
+
+    def _selection_bits(self, state: _FacetState, field: str, values: List[str]) -> int:
+        # Nhiều giá trị trong cùng một facet là OR
+        bits = 0
+        for value in values:
+            bits |= state.postings[field].get(value, 0)
+        return bits
+
+    def query(
+        self,
+        selections: Dict[str, List[str]],
+        ranges: Dict[str, Tuple[Optional[float], Optional[float]]],
+        with_counts: bool = False,
+        search_ids: Optional[Iterable[str]] = None,
+    ):
+        """
+        Trả về (tập id khớp mọi bộ lọc, số đếm facet hoặc None). search_ids: các
+        tour khớp từ khóa tìm kiếm (None = không tìm), áp cho cả kết quả lẫn số đếm.
+        """
+        state = self._state
+        facet_bits = {
+            field: self._selection_bits(state, field, values)
+            for field, values in selections.items()
+            if values
+        }
+        # Tìm kiếm và khoảng giá/rating luôn áp cho mọi facet -> gộp vào bitmap nền
+        range_bits = state.all_bits if search_ids is None else self._id_bits(state, search_ids)
+        for field, (low, high) in ranges.items():
+            if low is not None or high is not None:
+                range_bits &= self._range_bits(state, field, low, high)
+
+        matched = range_bits
+        for bits in facet_bits.values():
+            matched &= bits
+        ids = {state.ids[pos] for pos in _positions(matched, len(state.ids)).tolist()}
+
+        counts = None
+        if with_counts:
+            # Đếm kiểu "disjunctive": facet đang xét không tự lọc chính nó, để
+            # client biết chọn thêm giá trị khác trong cùng nhóm sẽ ra bao nhiêu tour
+            counts = {}
+            for field in FACET_FIELDS:
+                base = range_bits
+                for other, bits in facet_bits.items():
+                    if other != field:
+                        base &= bits
+                counts[field] = {
+                    value: (bits & base).bit_count()
+                    for value, bits in sorted(state.postings[field].items())
+                }
+        return ids, counts
+
+facet_index = FacetIndex()
@@ -0,0 +1,67 @@
+import hashlib
+from typing import FrozenSet, Iterable, NamedTuple
+
+from core.cache import TTLCache
+from core.config import FAVORITE_CACHE_TTL, FAVORITE_CACHE_SIZE
+
+# ==================================================================
+# CACHE TẬP ID TOUR YÊU THÍCH THEO USER
+# ==================================================================
+# Trang danh sách tour cần biết tour nào đã được thả tim; thay vì mỗi thẻ tour
+# một query favorites, cả tập id của user được cache và cập nhật ngay khi
+# add/remove favorite.
+
+class FavoriteIds(NamedTuple):
+    ids: FrozenSet[str]
+    etag: str
+
+def _make_entry(ids: Iterable[str]) -> FavoriteIds:
+    ids = frozenset(str(i) for i in ids)
+    digest = hashlib.sha1(",".join(sorted(ids)).encode("utf-8")).hexdigest()[:16]
+    return FavoriteIds(ids, f'W/"fav-{digest}"')
+
+class FavoriteIdCache:
+    def __init__(self, maxsize: int = FAVORITE_CACHE_SIZE, ttl: float = FAVORITE_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Đếm số lần ghi theo user: kết quả đọc DB chỉ được cache nếu không có lần
+        # ghi nào xen vào trong lúc query (tránh ghi đè cache bằng dữ liệu cũ)
+        self._writes = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def write_count(self, user_id: str) -> int:
+        return self._writes.get(user_id, 0)
+
+    def store(self, user_id: str, ids: Iterable[str], write_count: int) -> FavoriteIds:
+        """Lưu tập id vừa đọc từ DB (write_count lấy trước khi query)"""
+        entry = _make_entry(ids)
+        if self.write_count(user_id) == write_count:
+            self._cache.set(user_id, entry)
+        return entry
+
+    async def load(self, user_id: str, client) -> FavoriteIds:
+        """Lấy từ cache, hoặc một query chỉ cột tour_id nếu chưa có"""
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            return entry
+        write_count = self.write_count(user_id)
+        response = await client.table("favorites")\
+            .select("tour_id")\
+            .eq("user_id", user_id)\
+            .execute()
+        return self.store(user_id, (row["tour_id"] for row in response.data or []), write_count)
+
+    def _apply(self, user_id: str, change) -> None:
+        self._writes.set(user_id, self.write_count(user_id) + 1)
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            self._cache.set(user_id, _make_entry(change(entry.ids)))
+
+    def add(self, user_id: str, tour_id: str) -> None:
+        self._apply(user_id, lambda ids: ids | {str(tour_id)})
+
+    def remove(self, user_id: str, tour_id: str) -> None:
+        self._apply(user_id, lambda ids: ids - {str(tour_id)})
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+favorite_ids = FavoriteIdCache()
@@ -0,0 +1,64 @@
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+from core.config import IMAGE_MANIFEST_PATH
+
+# ==================================================================
+# MANIFEST ẢNH (do upload_images.py sinh ra)
+# ==================================================================
+# Tour trong DB có thể chỉ lưu tên file ảnh (VD: "van-mieu.jpg"); manifest ánh
+# xạ tên file -> URL trên CDN và các biến thể responsive. URL đầy đủ giữ nguyên.
+
+class ImageManifest:
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            entries: Dict[str, dict] = {}
+            if mtime is not None:
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        images = json.load(f).get("images", {})
+                    for filename, entry in images.items():
+                        entries[filename] = entry
+                        # Cho phép tham chiếu không kèm đuôi file ("van-mieu")
+                        entries.setdefault(os.path.splitext(filename)[0], entry)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Không đọc được image manifest {self.path}: {e}")
+                    return
+            self._entries, self._mtime = entries, mtime
+
+    def get(self, ref: Optional[str]) -> Optional[dict]:
+        if not ref or "://" in ref:
+            return None
+        self._reload_if_changed()
+        return self._entries.get(os.path.basename(ref))
+
+    def resolve(self, ref: Optional[str]) -> Optional[str]:
+        """Tên file -> URL trên CDN; URL hoặc tên không có trong manifest giữ nguyên"""
+        entry = self.get(ref)
+        return entry["url"] if entry else ref
+
+    def fill_tour(self, tour: dict) -> dict:
+        """Điền image/images của một tour theo manifest (trả về dict mới nếu có đổi)"""
+        image = tour.get("image")
+        images = tour.get("images")
+        resolved_image = self.resolve(image) if isinstance(image, str) else image
+        resolved_images = [self.resolve(i) if isinstance(i, str) else i for i in images] if isinstance(images, list) else images
+        if resolved_image == image and resolved_images == images:
+            return tour
+        return {**tour, "image": resolved_image, "images": resolved_images}
+
+image_manifest = ImageManifest(IMAGE_MANIFEST_PATH)
@@ -0,0 +1,201 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from core.analytics import record_events
+from core.config import (
+    TRACKING_QUEUE_SIZE,
+    TRACKING_BATCH_SIZE,
+    TRACKING_FLUSH_INTERVAL,
+    TRACKING_OVERFLOW,
+    TRACKING_MAX_ATTEMPTS,
+)
+
+# ==================================================================
+# HÀNG ĐỢI GHI SAU (WRITE-BEHIND) CHO CÁC ENDPOINT TRACKING
+# ==================================================================
+# Endpoint tracking chỉ đẩy sự kiện vào hàng đợi trong bộ nhớ rồi trả lời ngay;
+# task nền gom thành lô và ghi một lần (record_tracking_events, kèm rollup)
+# khi đủ TRACKING_BATCH_SIZE sự kiện hoặc sau TRACKING_FLUSH_INTERVAL giây.
+# Hàng đợi đầy (DB chậm/chết): "drop_newest" từ chối sự kiện mới (sự kiện đã
+# nhận thì không bị bỏ), "drop_oldest" bỏ sự kiện cũ nhất để nhận sự kiện mới.
+# Lô ghi lỗi được thử lại trước ở chu kỳ sau; lỗi quá max_attempts lần thì tách
+# ra ghi từng dòng, dòng vẫn lỗi (VD: tour_id không tồn tại) bị bỏ và đếm vào
+# "poisoned" -> một dòng hỏng không chặn tracking mãi mãi.
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest")
+# Số lần đo gần nhất dùng để tính p50/p95 thời gian flush
+LATENCY_WINDOW = 200
+
+FlushFn = Callable[[str, List[dict]], Awaitable[list]]
+
+class IngestBuffer:
+    def __init__(
+        self,
+        flush_fn: FlushFn = record_events,
+        max_size: int = TRACKING_QUEUE_SIZE,
+        batch_size: int = TRACKING_BATCH_SIZE,
+        flush_interval: float = TRACKING_FLUSH_INTERVAL,
+        overflow: str = TRACKING_OVERFLOW,
+        max_attempts: int = TRACKING_MAX_ATTEMPTS,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow phải là một trong: {OVERFLOW_POLICIES}")
+        self.flush_fn = flush_fn
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.max_attempts = max_attempts
+        self._queue: deque = deque()  # (metric, event)
+        # Các lô ghi lỗi chờ thử lại: [danh sách (metric, event), số lần đã lỗi]
+        self._retry: deque = deque()
+        self._retry_size = 0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._counters = {"accepted": 0, "dropped": 0, "flushed": 0, "batches": 0, "flush_errors": 0, "poisoned": 0}
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue) + self._retry_size
+
+    # --- Phía request ---
+    def submit(self, metric: str, event: dict) -> bool:
+        """Đưa sự kiện vào hàng đợi, không chờ DB; False nếu bị từ chối vì đầy"""
+        if self.depth >= self.max_size:
+            self._counters["dropped"] += 1
+            if self.overflow == "drop_newest" or not self._queue:
+                return False
+            self._queue.popleft()
+        self._queue.append((metric, event))
+        self._counters["accepted"] += 1
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    # --- Phía ghi DB ---
+    def _requeue(self, items: list, attempts: int) -> int:
+        """Đưa phần chưa ghi lên đầu hàng thử lại (trong giới hạn chỗ trống), trả về số giữ lại"""
+        keep = items[:max(self.max_size - self.depth, 0)]
+        if keep:
+            self._retry.appendleft([keep, attempts])
+            self._retry_size += len(keep)
+        self._counters["dropped"] += len(items) - len(keep)
+        return len(keep)
+
+    async def _write_batch(self, batch: list, attempts: int = 0) -> None:
+        by_metric: Dict[str, List[dict]] = {}
+        for metric, event in batch:
+            by_metric.setdefault(metric, []).append(event)
+        started = time.perf_counter()
+        for metric, events in list(by_metric.items()):
+            try:
+                await self.flush_fn(metric, events)
+            except BaseException as e:
+                # Lỗi DB hoặc bị hủy giữa chừng (CancelledError): metric đã ghi xong thì
+                # thôi, phần còn lại vào hàng thử lại (bị hủy thì không tính là một lần
+                # lỗi). Ghi lại lô đã commit cũng không trùng (id tạo sẵn).
+                failed = [item for item in batch if item[0] in by_metric]
+                if isinstance(e, Exception):
+                    kept = self._requeue(failed, attempts + 1)
+                    self._counters["flush_errors"] += 1
+                    print(f"⚠️ Flush tracking lỗi (lần {attempts + 1}), giữ lại {kept} sự kiện để thử lại: {e}")
+                else:
+                    self._requeue(failed, attempts)
+                raise
+            del by_metric[metric]
+            self._counters["flushed"] += len(events)
+        self._latencies.append((time.perf_counter() - started) * 1000)
+        self._counters["batches"] += 1
+
+    async def _write_rows(self, batch: list, attempts: int) -> None:
+        """Lô đã lỗi quá max_attempts lần: ghi từng dòng, bỏ (và đếm) các dòng vẫn lỗi"""
+        for index, (metric, event) in enumerate(batch):
+            try:
+                await self.flush_fn(metric, [event])
+            except Exception as e:
+                self._counters["dropped"] += 1
+                self._counters["poisoned"] += 1
+                print(f"⚠️ Bỏ sự kiện tracking {metric} lỗi sau {attempts} lần thử: {e}")
+                continue
+            except BaseException:
+                self._requeue(batch[index:], attempts)
+                raise
+            self._counters["flushed"] += 1
+
+    async def _retry_failed(self) -> None:
+        """Thử lại các lô lỗi trước; dừng ở lô đầu tiên vẫn lỗi"""
+        while self._retry:
+            batch, attempts = self._retry.popleft()
+            self._retry_size -= len(batch)
+            if attempts >= self.max_attempts:
+                await self._write_rows(batch, attempts)
+            else:
+                await self._write_batch(batch, attempts)
+
+    async def flush(self, drain: bool = True) -> None:
+        """Ghi các lô đang chờ; drain=False thì chỉ ghi các lô đã đủ kích thước"""
+        async with self._flush_lock:
+            try:
+                await self._retry_failed()
+            except Exception:
+                return  # DB lỗi: đợi chu kỳ sau, không lặp liên tục
+            while self._queue and (drain or len(self._queue) >= self.batch_size):
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                try:
+                    await self._write_batch(batch)
+                except Exception:
+                    return  # DB lỗi: đợi chu kỳ sau, không lặp liên tục
+
+    async def run(self) -> None:
+        """Task nền: flush khi đủ lô hoặc mỗi flush_interval giây"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                timed_out = False
+            except asyncio.TimeoutError:
+                timed_out = True
+            self._wakeup.clear()
+            await self.flush(drain=timed_out or self._closing)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Dừng task nền và ghi nốt mọi sự kiện còn trong hàng đợi (khi tắt server)"""
+        # Không cancel task: báo dừng rồi chờ lượt flush đang chạy ghi xong
+        self._closing = True
+        self._wakeup.set()
+        try:
+            if self._task is not None:
+                await asyncio.wait_for(self._task, timeout)
+            # Sự kiện nhận thêm trong lúc chờ, hoặc lô đang chờ thử lại: thử một lần nữa
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            # wait_for hủy lượt ghi đang dở; lô đó đã được trả về hàng đợi
+            print("⚠️ Hết thời gian flush tracking khi tắt server")
+        self._task = None
+        if self.depth:
+            print(f"⚠️ Còn {self.depth} sự kiện tracking chưa ghi được khi tắt server")
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        def percentile(p: float) -> Optional[float]:
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 2) if latencies else None
+        return {
+            **self._counters,
+            "depth": self.depth,
+            "max_size": self.max_size,
+            "overflow": self.overflow,
+            "flush_ms_p50": percentile(0.5),
+            "flush_ms_p95": percentile(0.95),
+            "flush_ms_max": round(latencies[-1], 2) if latencies else None
+        }
+
+tracking_buffer = IngestBuffer()
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from core.db import async_supabase_admin
+
+# ==================================================================
+# GHI LEAD (consultation + booking) TRONG MỘT LẦN GỌI
+# ==================================================================
+# Bản thật gọi hàm Postgres submit_consultation (consultation_booking.sql) qua
+# RPC: cả hai insert nằm trong một transaction, kèm idempotency key. Bản
+# InMemoryLeadWriter có cùng ngữ nghĩa, dùng cho test/dev không cần Supabase.
+
+LEAD_RPC = "submit_consultation"
+
+def build_lead_params(consultation: dict, booking: Optional[dict], idempotency_key: Optional[str]) -> dict:
+    return {
+        "p_consultation": consultation,
+        "p_booking": booking,
+        "p_idempotency_key": idempotency_key,
+    }
+
+class RpcLeadWriter:
+    def __init__(self, client=None):
+        self.client = client or async_supabase_admin
+
+    async def submit(self, params: dict) -> dict:
+        """Trả về {"consultation": ..., "booking": ... | None, "replayed": bool}"""
+        response = await self.client.rpc(LEAD_RPC, params).execute()
+        return response.data
+
+class InMemoryLeadWriter:
+    """Bản giả lập cục bộ của submit_consultation (tất cả hoặc không, có idempotency)"""
+
+    def __init__(self):
+        self.consultations = []
+        self.bookings = []
+        self._lock = asyncio.Lock()
+
+    def _row(self, data: dict, key: Optional[str]) -> dict:
+        return {
+            **data,
+            "id": str(uuid.uuid4()),
+            "status": data.get("status") or "pending",
+            "idempotency_key": key,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    async def submit(self, params: dict) -> dict:
+        key = params.get("p_idempotency_key")
+        async with self._lock:
+            if key:
+                existing = next((c for c in self.consultations if c["idempotency_key"] == key), None)
+                if existing:
+                    booking = next((b for b in self.bookings if b["idempotency_key"] == key), None)
+                    return {"consultation": existing, "booking": booking, "replayed": True}
+
+            # Dựng đủ cả hai dòng rồi mới ghi -> không bao giờ ghi dở
+            consultation = self._row(params["p_consultation"], key)
+            booking = self._row(params["p_booking"], key) if params.get("p_booking") else None
+            self.consultations.append(consultation)
+            if booking:
+                self.bookings.append(booking)
+            return {"consultation": consultation, "booking": booking, "replayed": False}
+
+_writer = None
+
+def get_lead_writer():
+    """LEAD_WRITER=rpc|memory; mặc định gọi RPC trên Supabase"""
+    global _writer
+    if _writer is None:
+        _writer = InMemoryLeadWriter() if os.getenv("LEAD_WRITER") == "memory" else RpcLeadWriter()
+    return _writer
+
+def set_lead_writer(writer) -> None:
+    """Thay writer (VD: InMemoryLeadWriter trong test)"""
+    global _writer
+    _writer = writer
@@ -0,0 +1,45 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.db import keyset
+
+# ==================================================================
+# CURSOR PHÂN TRANG KEYSET (dùng chung cho mọi endpoint danh sách)
+# ==================================================================
+# Cursor là base64url của JSON các giá trị khóa sắp xếp của dòng cuối trang,
+# VD: {"created_at": "2026-01-10T15:14:35+00:00", "id": "7"}. Client coi nó là
+# chuỗi mờ (opaque), chỉ việc gửi lại ở trang sau.
+
+class InvalidCursor(ValueError):
+    """Cursor bị sửa hoặc không đúng định dạng"""
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str, ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, *keys: str) -> Dict[str, Any]:
+    """Giải mã cursor và kiểm tra có đủ các khóa cần thiết"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise InvalidCursor("Cursor không hợp lệ")
+    if not isinstance(values, dict) or any(key not in values for key in keys):
+        raise InvalidCursor("Cursor không hợp lệ")
+    return values
+
+def apply_cursor(query, cursor: Optional[str], column: str, tie_column: str = "id", desc: bool = True):
+    """Thêm điều kiện keyset (nếu có cursor) và thứ tự (column, tie_column) cho query"""
+    if cursor:
+        after = decode_cursor(cursor, column, tie_column)
+        query = keyset(query, column, after[column], tie_column, after[tie_column], desc=desc)
+    return query.order(column, desc=desc).order(tie_column, desc=desc)
+
+def split_page(rows: List[dict], limit: int, column: str, tie_column: str = "id") -> Tuple[List[dict], Optional[str]]:
+    """Query lấy limit + 1 dòng; dòng dư chỉ để biết còn trang sau -> (dòng của trang, cursor kế tiếp)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor({column: last.get(column), tie_column: last.get(tie_column)})
@@ -0,0 +1,48 @@
+from typing import Dict, Iterable, Optional
+
+from core.cache import TTLCache
+from core.config import PROFILE_CACHE_TTL, PROFILE_CACHE_SIZE
+from core.db import async_supabase_admin
+
+# ==================================================================
+# TRA PROFILE THEO LÔ (email, tên) CHO CÁC TRANG ADMIN
+# ==================================================================
+# Mỗi trang booking chỉ tốn tối đa MỘT query in_ cho các user chưa có trong
+# cache LRU, thay vì một query single() cho từng dòng.
+
+_profile_cache = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+_MISSING = object()
+
+def _shape(row: dict) -> dict:
+    return {"email": row.get("email"), "name": row.get("full_name")}
+
+async def get_profiles(user_ids: Iterable[str]) -> Dict[str, Optional[dict]]:
+    """user_id -> {"email", "name"} hoặc None nếu user không có profile"""
+    result: Dict[str, Optional[dict]] = {}
+    missing = []
+    for user_id in dict.fromkeys(str(u) for u in user_ids if u):
+        cached = _profile_cache.get(user_id, _MISSING)
+        if cached is _MISSING:
+            missing.append(user_id)
+        else:
+            result[user_id] = cached
+
+    if missing:
+        response = await async_supabase_admin.table("profiles")\
+            .select("id, email, full_name")\
+            .in_("id", missing)\
+            .execute()
+        found = {str(row["id"]): _shape(row) for row in response.data or []}
+        for user_id in missing:
+            # Cache cả user không có profile (None) để không query lại liên tục
+            profile = found.get(user_id)
+            _profile_cache.set(user_id, profile)
+            result[user_id] = profile
+    return result
+
+def invalidate_profile(user_id: str) -> None:
+    """Xóa khỏi cache ngay khi profile được cập nhật"""
+    _profile_cache.pop(str(user_id))
+
+def profile_cache_stats() -> dict:
+    return _profile_cache.stats()
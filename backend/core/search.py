@@ -0,0 +1,157 @@
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# ==================================================================
+# INDEX TÌM KIẾM TOUR (inverted index, không phân biệt dấu tiếng Việt)
+# ==================================================================
+
+# Trọng số theo cột: khớp ở tiêu đề quan trọng hơn khớp ở mô tả
+SEARCH_FIELDS: Dict[str, float] = {
+    "title": 3.0,
+    "title_en": 2.5,
+    "destination": 2.0,
+    "departure": 1.5,
+    "type": 1.5,
+    "description": 1.0,
+}
+# Khớp tiền tố ("mie" -> "mieu") được tính điểm thấp hơn khớp trọn từ
+PREFIX_MATCH_WEIGHT = 0.6
+# Thưởng thêm khi cả cụm từ khóa xuất hiện liền nhau trong tiêu đề
+TITLE_PHRASE_BONUS = 2.0
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def fold(text: str) -> str:
+    """Bỏ dấu tiếng Việt và chữ hoa: 'Văn Miếu' -> 'van mieu'"""
+    text = text.lower().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(fold(text))
+
+def _field_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value)
+
+class TourSearchIndex:
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)  # term -> {tour_id: tf có trọng số}
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._doc_len: Dict[str, float] = {}
+        self._titles: Dict[str, str] = {}
+        self._sorted_terms: List[str] = []
+        self._terms_dirty = False
+        self._lock = threading.Lock()
+
+    # --- Cập nhật index ---
+    def _remove(self, tour_id: str) -> None:
+        for term in self._doc_terms.pop(tour_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(tour_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._terms_dirty = True
+        self._doc_len.pop(tour_id, None)
+        self._titles.pop(tour_id, None)
+
+    def _add(self, tour_id: str, tour: dict) -> None:
+        weights: Dict[str, float] = defaultdict(float)
+        for field, weight in SEARCH_FIELDS.items():
+            for token in tokenize(_field_text(tour.get(field))):
+                weights[token] += weight
+        for term, tf in weights.items():
+            if term not in self._postings:
+                self._terms_dirty = True
+            self._postings[term][tour_id] = tf
+        self._doc_terms[tour_id] = set(weights)
+        self._doc_len[tour_id] = sum(weights.values())
+        self._titles[tour_id] = " ".join(tokenize(_field_text(tour.get("title"))))
+
+    def rebuild(self, tours: Dict[str, dict]) -> None:
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._doc_terms, self._doc_len, self._titles = {}, {}, {}
+            for tour_id, tour in tours.items():
+                self._add(tour_id, tour)
+            self._terms_dirty = True
+
+    def update(self, tours: Dict[str, dict], changed_ids: Iterable[str]) -> None:
+        """Chỉ index lại các tour vừa thay đổi"""
+        with self._lock:
+            for tour_id in changed_ids:
+                self._remove(tour_id)
+                if tour_id in tours:
+                    self._add(tour_id, tours[tour_id])
+
+    def on_catalog_change(self, snapshot, changed_ids: Optional[Set[str]]) -> None:
+        if changed_ids is None:
+            self.rebuild(snapshot.tours)
+        else:
+            self.update(snapshot.tours, changed_ids)
+
+    # --- Tìm kiếm ---
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Các term trong index khớp token: trọn từ hoặc theo tiền tố"""
+        if self._terms_dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+        matches = []
+        i = bisect_left(self._sorted_terms, token)
+        while i < len(self._sorted_terms) and self._sorted_terms[i].startswith(token):
+            term = self._sorted_terms[i]
+            matches.append((term, 1.0 if term == token else PREFIX_MATCH_WEIGHT))
+            i += 1
+        return matches
+
+    def search(self, query: str) -> List[Tuple[str, float]]:
+        """Trả về [(tour_id, điểm)] giảm dần theo điểm"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            n_docs = len(self._doc_len) or 1
+            avg_len = sum(self._doc_len.values()) / n_docs if self._doc_len else 1.0
+            per_token: List[Dict[str, float]] = []
+            for token in tokens:
+                scores: Dict[str, float] = {}
+                for term, match_weight in self._expand(token):
+                    postings = self._postings[term]
+                    df = len(postings)
+                    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                    for tour_id, tf in postings.items():
+                        # BM25 (k1=1.2, b=0.75)
+                        norm = tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * self._doc_len[tour_id] / avg_len))
+                        score = match_weight * idf * norm
+                        if score > scores.get(tour_id, 0.0):
+                            scores[tour_id] = score
+                per_token.append(scores)
+
+            # Ưu tiên tour khớp đủ mọi từ khóa, không có thì lấy tour khớp một phần
+            matched = set.intersection(*(set(s) for s in per_token))
+            if not matched:
+                matched = set.union(*(set(s) for s in per_token))
+
+            phrase = " ".join(tokens)
+            results = []
+            for tour_id in matched:
+                score = sum(s.get(tour_id, 0.0) for s in per_token)
+                if phrase in self._titles.get(tour_id, ""):
+                    score += TITLE_PHRASE_BONUS
+                results.append((tour_id, round(score, 4)))
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results
+
+# Index dùng chung, tự cập nhật theo catalog
+search_index = TourSearchIndex()
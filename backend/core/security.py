@@ -1,27 +1,69 @@
 from fastapi import HTTPException, Header
 from typing import Optional
-from core.config import supabase, SUPABASE_URL, SUPABASE_KEY
-from supabase import create_client
+from core.auth import get_user_id_async, extract_bearer
+from core.cache import TTLCache
+from core.config import supabase, ROLE_CACHE_TTL, ROLE_CACHE_SIZE
+from core.db import async_user_client, async_supabase
 
-async def get_user_supabase_client(authorization: Optional[str] = Header(None)):
+async def get_user_scoped_client(authorization: Optional[str] = Header(None)):
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing authorization header")
     
     try:
-        token = authorization.replace("Bearer ", "")
+        token = extract_bearer(authorization)
         
-        # 1. Verify token
-        response = supabase.auth.get_user(token)
+        # 1. Verify token (kiểm tra chữ ký JWT tại chỗ)
+        user_id = await get_user_id_async(authorization)
         
-        if not response.user:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        # 2. Tạo client mới và gán Auth
-        user_client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        user_client.postgrest.auth(token)
-        
-        return response.user.id, user_client
+        # 2. Gắn token của user vào client dùng chung connection pool
+        # (không tạo client/pool mới cho mỗi request, execute() là async)
+        return user_id, async_user_client(token)
         
     except Exception as e:
         print(f"Token verification error: {e}")
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+# ==================================================================
+# CACHE ROLE (tránh query bảng profiles ở mỗi request admin)
+# ==================================================================
+
+_role_cache = TTLCache(maxsize=ROLE_CACHE_SIZE, ttl=ROLE_CACHE_TTL)
+
+def get_user_role(user_id: str) -> Optional[str]:
+    """Lấy role của user, ưu tiên cache; None nếu không có profile"""
+    role = _role_cache.get(user_id)
+    if role is not None:
+        return role or None
+
+    response = supabase.table("profiles")\
+        .select("role")\
+        .eq("id", user_id)\
+        .maybe_single()\
+        .execute()
+    role = response.data.get("role") if response and response.data else None
+    # Cache cả trường hợp không có profile ("") để không query lại liên tục
+    _role_cache.set(user_id, role or "")
+    return role
+
+async def get_user_role_async(user_id: str) -> Optional[str]:
+    """Bản async của get_user_role cho các handler async def"""
+    role = _role_cache.get(user_id)
+    if role is not None:
+        return role or None
+
+    response = await async_supabase.table("profiles")\
+        .select("role")\
+        .eq("id", user_id)\
+        .maybe_single()\
+        .execute()
+    # maybe_single() trả về None (không phải response rỗng) khi không có profile
+    role = response.data.get("role") if response and response.data else None
+    _role_cache.set(user_id, role or "")
+    return role
+
+def invalidate_role(user_id: str) -> None:
+    """Xóa role khỏi cache ngay khi role bị thay đổi"""
+    _role_cache.pop(user_id)
+
+def role_cache_stats() -> dict:
+    return _role_cache.stats()
@@ -0,0 +1,139 @@
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from core.vectors import parse_vector, normalize_rows
+
+# ==================================================================
+# BẢNG "TOUR TƯƠNG TỰ" TÍNH SẴN
+# ==================================================================
+# Điểm = trộn cosine similarity của embedding với độ trùng loại hình (type) và
+# cùng điểm đến. Cả bảng được tính bằng một phép nhân ma trận; khi một vài tour
+# thay đổi chỉ tính lại các hàng bị ảnh hưởng. Endpoint chỉ còn tra dict.
+
+SIMILAR_TOURS_N = 6
+VECTOR_WEIGHT = 0.7
+TYPE_WEIGHT = 0.2
+DESTINATION_WEIGHT = 0.1
+
+class SimilarTours:
+    def __init__(self, column: str = "embedding_768", dim: int = 768, top_n: int = SIMILAR_TOURS_N):
+        self.column = column
+        self.dim = dim
+        self.top_n = top_n
+        self._neighbours: Dict[str, List[Tuple[str, float]]] = {}
+        # id -> embedding đã chuẩn hóa: mỗi lần ghi chỉ parse lại tour vừa đổi
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tour_id: str) -> Optional[List[Tuple[str, float]]]:
+        return self._neighbours.get(str(tour_id))
+
+    # --- Dựng các ma trận đặc trưng theo snapshot ---
+    def _parse(self, snapshot, tour_id: str) -> Optional[np.ndarray]:
+        try:
+            vec = parse_vector(snapshot.vectors.get(tour_id, {}).get(self.column))
+        except (ValueError, TypeError):
+            return None
+        if vec is None or vec.shape != (self.dim,):
+            return None
+        return normalize_rows(vec)
+
+    def _features(self, snapshot, changed_ids: Optional[Set[str]]):
+        if changed_ids is None:
+            self._vectors = {}
+            changed_ids = snapshot.tours
+        for tour_id in changed_ids:
+            vec = self._parse(snapshot, tour_id) if tour_id in snapshot.tours else None
+            if vec is None:
+                self._vectors.pop(tour_id, None)
+            else:
+                self._vectors[tour_id] = vec
+
+        ids = sorted(snapshot.tours)
+        # Tour thiếu embedding giữ hàng 0 -> chỉ còn điểm type/destination
+        vectors = np.zeros((len(ids), self.dim), dtype=np.float32)
+        for row, tour_id in enumerate(ids):
+            vec = self._vectors.get(tour_id)
+            if vec is not None:
+                vectors[row] = vec
+
+        tags = sorted({tag for t in snapshot.tours.values() for tag in (t.get("type") or [])})
+        tag_pos = {tag: i for i, tag in enumerate(tags)}
+        multi_hot = np.zeros((len(ids), len(tags)), dtype=np.float32)
+        for row, tour_id in enumerate(ids):
+            for tag in snapshot.tours[tour_id].get("type") or []:
+                multi_hot[row, tag_pos[tag]] = 1.0
+
+        destinations = [snapshot.tours[tid].get("destination") for tid in ids]
+        dest_codes = {d: i for i, d in enumerate(dict.fromkeys(destinations))}
+        dest = np.array([dest_codes[d] if d else -1 for d in destinations])
+        return ids, vectors, multi_hot, dest
+
+    def _scores(self, rows: np.ndarray, vectors, multi_hot, dest) -> np.ndarray:
+        """Điểm trộn của các hàng `rows` với toàn bộ tour (một phép nhân ma trận)"""
+        cosine = vectors[rows] @ vectors.T
+        overlap = multi_hot[rows] @ multi_hot.T
+        sizes = multi_hot.sum(axis=1)
+        union = sizes[rows][:, None] + sizes[None, :] - overlap
+        jaccard = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+        same_dest = (dest[rows][:, None] == dest[None, :]) & (dest[rows][:, None] >= 0)
+        scores = VECTOR_WEIGHT * cosine + TYPE_WEIGHT * jaccard + DESTINATION_WEIGHT * same_dest
+        # Không tự gợi ý chính nó
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return scores
+
+    def _top(self, ids: List[str], row_scores: np.ndarray) -> List[Tuple[str, float]]:
+        k = min(self.top_n, len(ids) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-row_scores, k - 1)[:k]
+        top = top[np.argsort(-row_scores[top])]
+        return [(ids[i], round(float(row_scores[i]), 4)) for i in top]
+
+    # --- Cập nhật theo catalog ---
+    def on_catalog_change(self, snapshot, changed_ids: Optional[Set[str]]) -> None:
+        with self._lock:
+            full = changed_ids is None or not self._neighbours
+            ids, vectors, multi_hot, dest = self._features(snapshot, None if full else changed_ids)
+            position = {tid: i for i, tid in enumerate(ids)}
+
+            if full:
+                # Nạp lại toàn bộ: một phép nhân N x N
+                scores = self._scores(np.arange(len(ids)), vectors, multi_hot, dest)
+                self._neighbours = {tid: self._top(ids, scores[i]) for i, tid in enumerate(ids)}
+                return
+
+            neighbours = {tid: lst for tid, lst in self._neighbours.items() if tid in position}
+            # Hàng phải tính lại: tour vừa đổi, và tour có hàng xóm vừa đổi/bị xóa
+            # (hàng xóm thứ N+1 cũ có thể phải lấp chỗ)
+            stale = {tid for tid in changed_ids if tid in position}
+            stale |= {tid for tid, lst in neighbours.items() if any(n in changed_ids for n, _ in lst)}
+            stale |= {tid for tid in ids if tid not in neighbours}
+
+            if stale:
+                rows = np.array([position[tid] for tid in sorted(stale)])
+                scores = self._scores(rows, vectors, multi_hot, dest)
+                for i, row in enumerate(rows):
+                    neighbours[ids[row]] = self._top(ids, scores[i])
+
+            # Các hàng còn lại: chỉ cần xét tour vừa đổi có lọt vào top N không
+            added = [tid for tid in changed_ids if tid in position]
+            fresh = [tid for tid in ids if tid not in stale]
+            if added and fresh:
+                cols = np.array([position[tid] for tid in added])
+                col_scores = self._scores(cols, vectors, multi_hot, dest).T
+                for tid in fresh:
+                    row = position[tid]
+                    merged = neighbours[tid] + [
+                        (added[j], round(float(col_scores[row, j]), 4))
+                        for j in range(len(added))
+                        if added[j] != tid
+                    ]
+                    merged.sort(key=lambda item: -item[1])
+                    neighbours[tid] = merged[:self.top_n]
+
+            self._neighbours = neighbours
+
+similar_tours = SimilarTours()
@@ -0,0 +1,152 @@
+import csv
+import json
+import time
+import uuid
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from core.catalog import VECTOR_COLUMNS
+
+# ==================================================================
+# IMPORT TOUR HÀNG LOẠT (CSV export của Supabase hoặc NDJSON)
+# ==================================================================
+# Đọc từng dòng một (không nạp cả file vào bộ nhớ), validate theo TourCreate,
+# rồi upsert theo lô. Dùng chung cho endpoint admin và CLI import_tours.py.
+
+# Các cột mảng trong CSV export được ghi dưới dạng JSON: ["a","b"]
+JSON_ARRAY_COLUMNS = ("images", "type")
+# Cột có trong bảng tours nhưng không có trong TourCreate, vẫn giữ khi import
+PASSTHROUGH_COLUMNS = (
+    "title_key", "detailed_description", "introduction", "itinerary",
+    "regulations", "created_at",
+)
+DEFAULT_BATCH_SIZE = 100
+MAX_REPORTED_ERRORS = 200
+
+# Cột embedding dạng '[0.1,...]' dài hơn giới hạn mặc định 128KB của module csv
+csv.field_size_limit(16 * 1024 * 1024)
+
+def iter_csv_rows(stream: IO[str]) -> Iterator[dict]:
+    # csv tự xử lý các ô nhiều dòng nằm trong ngoặc kép (description, ...)
+    yield from csv.DictReader(stream)
+
+def iter_ndjson_rows(stream: IO[str]) -> Iterator[str]:
+    # Trả về chuỗi thô, để một dòng JSON hỏng chỉ là lỗi của dòng đó
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+def compact_vector(raw) -> Optional[str]:
+    """Chuẩn hóa embedding về literal pgvector gọn (độ chính xác float32)"""
+    if raw is None or raw == "":
+        return None
+    values = json.loads(raw) if isinstance(raw, str) else raw
+    return "[" + ",".join(format(float(v), ".7g") for v in values) + "]"
+
+def normalize_row(raw: dict) -> dict:
+    """Chuyển một dòng CSV/NDJSON (toàn chuỗi) về đúng kiểu của bảng tours"""
+    row = {}
+    for key, value in raw.items():
+        if key is None:
+            continue
+        if isinstance(value, str) and value == "":
+            value = None
+        if key in JSON_ARRAY_COLUMNS and isinstance(value, str):
+            value = json.loads(value)
+        row[key] = value
+    return row
+
+def prepare_tour(raw: dict, model: Type[BaseModel]) -> dict:
+    """Validate theo model và dựng payload upsert; raise ValueError nếu sai"""
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    if not isinstance(raw, dict):
+        raise ValueError("Mỗi dòng phải là một object tour")
+    row = normalize_row(raw)
+    try:
+        tour = model.model_validate(row)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+
+    data = tour.model_dump(exclude_unset=True)
+    if not data.get("id"):
+        data["id"] = str(uuid.uuid4())
+    data["id"] = str(data["id"])
+    for column in PASSTHROUGH_COLUMNS:
+        if row.get(column) is not None:
+            data[column] = row[column]
+    for column in VECTOR_COLUMNS:
+        if row.get(column) is not None:
+            data[column] = compact_vector(row[column])
+    return data
+
+def _upsert_batch(client, batch: List[Tuple[int, dict]], report: dict) -> None:
+    # PostgREST yêu cầu mọi object trong một lần insert có cùng bộ khóa
+    groups: Dict[tuple, List[Tuple[int, dict]]] = {}
+    for line_no, data in batch:
+        groups.setdefault(tuple(sorted(data)), []).append((line_no, data))
+
+    for items in groups.values():
+        report["batches"] += 1
+        try:
+            client.table("tours").upsert([data for _, data in items], on_conflict="id").execute()
+            report["succeeded"] += len(items)
+        except Exception:
+            # Lô lỗi: thử lại từng dòng để biết chính xác dòng nào hỏng
+            for line_no, data in items:
+                try:
+                    client.table("tours").upsert(data, on_conflict="id").execute()
+                    report["succeeded"] += 1
+                except Exception as e:
+                    _record_error(report, line_no, data.get("id"), str(e))
+
+def _record_error(report: dict, line_no: int, tour_id, message: str) -> None:
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": line_no, "id": tour_id, "error": message})
+
+def import_tours(
+    stream: IO[str],
+    client,
+    model: Type[BaseModel],
+    fmt: str = "csv",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> dict:
+    """Import tour từ stream văn bản, trả về báo cáo từng dòng và throughput"""
+    rows = iter_csv_rows(stream) if fmt == "csv" else iter_ndjson_rows(stream)
+    report = {
+        "format": fmt,
+        "dry_run": dry_run,
+        "total": 0,
+        "succeeded": 0,
+        "failed": 0,
+        "batches": 0,
+        "errors": [],
+    }
+    started = time.perf_counter()
+    batch: List[Tuple[int, dict]] = []
+
+    for line_no, raw in enumerate(rows, start=1):
+        report["total"] += 1
+        try:
+            data = prepare_tour(raw, model)
+        except (ValueError, TypeError) as e:
+            _record_error(report, line_no, raw.get("id") if isinstance(raw, dict) else None, str(e))
+            continue
+        if dry_run:
+            report["succeeded"] += 1
+            continue
+        batch.append((line_no, data))
+        if len(batch) >= batch_size:
+            _upsert_batch(client, batch, report)
+            batch = []
+    if batch:
+        _upsert_batch(client, batch, report)
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["total"] / elapsed, 1) if elapsed > 0 else None
+    return report
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from core.search import tokenize
+
+# ==================================================================
+# TÌM KIẾM NGỮ NGHĨA TRÊN CÁC CỘT EMBEDDING CỦA BẢNG TOURS
+# ==================================================================
+
+# Số chiều -> cột embedding tương ứng trong bảng tours
+DIM_COLUMNS: Dict[int, str] = {
+    768: "embedding_768",
+    1024: "embedding_1024",
+}
+
+def parse_vector(raw) -> Optional[np.ndarray]:
+    """pgvector trả về dạng chuỗi '[0.1,0.2,...]', CSV export cũng vậy"""
+    if raw is None or raw == "":
+        return None
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    return np.asarray(raw, dtype=np.float32)
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class VectorIndex:
+    """Toàn bộ vector của một cột trong MỘT ma trận float32 liền mạch, đã chuẩn hóa"""
+
+    def __init__(self, column: str, dim: int):
+        self.column = column
+        self.dim = dim
+        self.ids: List[str] = []
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self._parsed: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _parse(self, tour_vectors: dict) -> Optional[np.ndarray]:
+        try:
+            vec = parse_vector(tour_vectors.get(self.column))
+        except (ValueError, TypeError):
+            return None
+        if vec is None or vec.shape != (self.dim,):
+            return None
+        return vec
+
+    def _stack(self) -> None:
+        ids = sorted(self._parsed)
+        if ids:
+            matrix = normalize_rows(np.stack([self._parsed[i] for i in ids]))
+        else:
+            matrix = np.zeros((0, self.dim), dtype=np.float32)
+        # Gán cả hai cùng lúc để reader không thấy ids và matrix lệch nhau
+        self.ids, self.matrix = ids, np.ascontiguousarray(matrix, dtype=np.float32)
+
+    def on_catalog_change(self, snapshot, changed_ids: Optional[Set[str]]) -> None:
+        with self._lock:
+            if changed_ids is None:
+                self._parsed = {}
+                changed_ids = set(snapshot.vectors)
+            for tour_id in changed_ids:
+                vec = self._parse(snapshot.vectors.get(tour_id, {})) if tour_id in snapshot.tours else None
+                if vec is None:
+                    self._parsed.pop(tour_id, None)
+                else:
+                    self._parsed[tour_id] = vec
+            self._stack()
+
+    def search(self, query: np.ndarray, k: int, allowed_ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Top-k theo cosine similarity (tích vô hướng của vector đã chuẩn hóa)"""
+        ids, matrix = self.ids, self.matrix
+        if not ids:
+            return []
+        query = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        scores = matrix @ query
+        if allowed_ids is not None:
+            mask = np.fromiter((i in allowed_ids for i in ids), dtype=bool, count=len(ids))
+            scores = np.where(mask, scores, -np.inf)
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+# ==================================================================
+# EMBEDDER (có thể thay thế)
+# ==================================================================
+
+class HashingEmbedder:
+    """Embedder cục bộ, tất định (dùng cho test/dev, không gọi API)"""
+
+    def embed(self, text: str, dim: int) -> np.ndarray:
+        vec = np.zeros(dim, dtype=np.float32)
+        for token in tokenize(text):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vec[value % dim] += 1.0 if (value >> 63) & 1 else -1.0
+        return vec
+
+class GeminiEmbedder:
+    """Embedding qua Google GenAI, cắt về đúng số chiều của cột"""
+
+    def __init__(self, model: str, api_key: Optional[str] = None):
+        from google import genai
+        self.model = model
+        self.client = genai.Client(api_key=api_key)
+
+    def embed(self, text: str, dim: int) -> np.ndarray:
+        from google.genai import types
+        result = self.client.models.embed_content(
+            model=self.model,
+            contents=text,
+            config=types.EmbedContentConfig(output_dimensionality=dim, task_type="RETRIEVAL_QUERY"),
+        )
+        return np.asarray(result.embeddings[0].values, dtype=np.float32)
+
+_embedder = None
+
+def get_embedder():
+    """EMBEDDER=gemini|hashing; mặc định dùng Gemini nếu có GOOGLE_API_KEY"""
+    global _embedder
+    if _embedder is None:
+        kind = os.getenv("EMBEDDER") or ("gemini" if os.getenv("GOOGLE_API_KEY") else "hashing")
+        if kind == "gemini":
+            _embedder = GeminiEmbedder(os.getenv("EMBEDDING_MODEL", "gemini-embedding-001"), os.getenv("GOOGLE_API_KEY"))
+        else:
+            _embedder = HashingEmbedder()
+    return _embedder
+
+def set_embedder(embedder) -> None:
+    """Thay embedder (VD: HashingEmbedder trong test)"""
+    global _embedder
+    _embedder = embedder
+
+# Index dùng chung cho từng số chiều
+vector_indexes: Dict[int, VectorIndex] = {dim: VectorIndex(column, dim) for dim, column in DIM_COLUMNS.items()}
@@ -0,0 +1,21 @@
+-- Đếm lượt xem theo tour ngay trong Postgres (thay cho tải toàn bộ tour_views về backend)
+-- Dùng bởi GET /api/admin/dashboard/stats
+-- Chạy script này trong Supabase SQL Editor (sau admin_tables.sql)
+
+create or replace function public.top_viewed_tours(p_limit int default 5)
+returns table (tour_id text, views bigint)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  select tv.tour_id, count(*) as views
+  from public.tour_views tv
+  group by tv.tour_id
+  order by views desc, tv.tour_id
+  limit p_limit;
+$$;
+
+-- Chỉ backend (service role) được gọi
+revoke execute on function public.top_viewed_tours(int) from public, anon, authenticated;
+grant execute on function public.top_viewed_tours(int) to service_role;
@@ -0,0 +1,16 @@
+-- Unique (user_id, tour_id) cho bảng favorites
+-- Cần cho add_favorite: upsert on_conflict=user_id,tour_id (ON CONFLICT DO NOTHING)
+-- Chạy script này trong Supabase SQL Editor
+
+-- Xóa các bản ghi trùng do check-then-insert cũ (mỗi cặp giữ lại một bản)
+delete from public.favorites f
+using public.favorites dup
+where f.user_id = dup.user_id
+  and f.tour_id = dup.tour_id
+  and f.ctid > dup.ctid;
+
+-- Tạo unique constraint (đồng thời là index cho query theo user_id)
+alter table public.favorites
+  drop constraint if exists favorites_user_id_tour_id_key;
+alter table public.favorites
+  add constraint favorites_user_id_tour_id_key unique (user_id, tour_id);
@@ -0,0 +1,44 @@
+"""
+Import tour hàng loạt từ file CSV (định dạng export của Supabase, như
+data/tours_rows.csv) hoặc NDJSON (mỗi dòng một object tour).
+
+Chạy từ thư mục backend:
+    python import_tours.py ../data/tours_rows.csv
+    python import_tours.py tours.ndjson --format ndjson --batch-size 200
+    python import_tours.py ../data/tours_rows.csv --dry-run
+
+Dùng SUPABASE_SERVICE_KEY (bypass RLS) để upsert theo id.
+"""
+import argparse
+import json
+import sys
+
+from core.db import service_client
+from core.tour_import import import_tours, DEFAULT_BATCH_SIZE
+from routers.tours import TourCreate
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="File CSV hoặc NDJSON ('-' để đọc từ stdin)")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default=None, help="Mặc định đoán theo đuôi file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ validate, không ghi DB")
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    if args.path == "-":
+        stream = sys.stdin
+    else:
+        stream = open(args.path, encoding="utf-8-sig", newline="")
+
+    with stream:
+        report = import_tours(stream, service_client(), TourCreate, fmt, args.batch_size, args.dry_run)
+
+    print(f"✅ {report['succeeded']}/{report['total']} dòng OK, ❌ {report['failed']} lỗi, "
+          f"{report['batches']} lô, {report['elapsed_seconds']}s ({report['rows_per_second']} rows/s)")
+    for error in report["errors"]:
+        print(json.dumps(error, ensure_ascii=False))
+    sys.exit(1 if report["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from routers import tours, favourites, chat, profile, consultations, bookings, admin, tracking
+from core.db import close_pools
+from core.catalog import catalog
+from core.compression import CompressionMiddleware, no_compression
+from core.events import get_event_broker
+from core.ingest import tracking_buffer
 
-# Khởi tạo ứng dụng
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nạp catalog tour một lần lúc khởi động, sau đó làm mới định kỳ
+    try:
+        await asyncio.to_thread(catalog.refresh)
+    except Exception as e:
+        print(f"⚠️ Không nạp được tour catalog lúc khởi động: {e}")
+    refresher = asyncio.create_task(catalog.run_refresher())
+    # Làm nóng snapshot thống kê dashboard ở nền
+    admin.dashboard_stats.warm()
+    # Task nền ghi sự kiện tracking theo lô
+    tracking_buffer.start()
+    yield
+    # Ghi nốt sự kiện tracking còn trong hàng đợi trước khi đóng pool
+    await tracking_buffer.stop()
+    refresher.cancel()
+    # Kết thúc các stream SSE đang mở để server tắt được ngay
+    await get_event_broker().close()
+    # Đóng connection pool dùng chung tới Supabase khi tắt server
+    await close_pools()
+
+# Khởi tạo ứng dụng (orjson: serialize list tour/booking lớn nhanh hơn nhiều so với json chuẩn)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# --- NÉN RESPONSE (brotli/gzip theo Accept-Encoding, bỏ qua body nhỏ) ---
+app.add_middleware(CompressionMiddleware)
 
 # --- CẤU HÌNH CORS ---
 origins = [
@@ -20,6 +52,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cho phép frontend đọc các header phân trang/version
+    expose_headers=["ETag", "X-Catalog-Version", "X-Next-Cursor"],
 )
 
 # --- KẾT NỐI CÁC ROUTER ---
@@ -34,5 +68,6 @@ app.include_router(admin.router)  # Admin dashboard
 app.include_router(tracking.router)  # Tracking
 
 @app.get("/")
+@no_compression
 def read_root():
     return {"message": "Hello! Backend Tour Guide (Modular Version) đang chạy ngon lành."}
\ No newline at end of file
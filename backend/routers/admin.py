@@ -1,7 +1,22 @@
-from fastapi import APIRouter, HTTPException, status, Header, Query
+import asyncio
+import orjson
+from fastapi import APIRouter, HTTPException, status, Header, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
-from core.config import supabase_admin, supabase
+from typing import Optional, List, NamedTuple, Tuple
+from core.db import async_supabase_admin
+from core.auth import get_user_id_async
+from core.security import get_user_role_async, role_cache_stats
+from core.favorites import favorite_ids
+from core.profiles import get_profiles, profile_cache_stats
+from core.cache import AsyncSnapshot
+from core.pagination import apply_cursor, split_page, encode_cursor, InvalidCursor
+from core.catalog import catalog
+from core.config import DASHBOARD_STATS_TTL, DASHBOARD_STATS_MAX_STALE, EXPORT_BATCH_SIZE, EVENT_HEARTBEAT_INTERVAL, STREAM_TICKET_TTL
+from core.events import get_event_broker, publish_event, add_listener, issue_stream_ticket, redeem_stream_ticket, Event
+from core.ingest import tracking_buffer
+from core.export import EXPORT_FORMATS, make_encoder, stream_export
+from core.analytics import resolve_range, fetch_timeseries
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
@@ -10,22 +25,15 @@ router = APIRouter(prefix="/api/admin", tags=["Admin"])
 # MIDDLEWARE: Kiểm tra quyền Admin
 # ==================================================================
 
-def verify_admin(authorization: str = Header(None)):
+async def verify_admin(authorization: str = Header(None)):
     """Middleware kiểm tra quyền Admin"""
     if not authorization:
         raise HTTPException(status_code=401, detail="Thiếu Token xác thực")
     try:
-        token = authorization.replace("Bearer ", "")
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
+        user_id = await get_user_id_async(authorization)
         
-        profile_response = supabase.table("profiles")\
-            .select("role")\
-            .eq("id", user_id)\
-            .single()\
-            .execute()
-        
-        if not profile_response.data or profile_response.data.get('role') != 'admin':
+        # Role được cache theo user_id (TTL ngắn, xóa ngay khi đổi role)
+        if await get_user_role_async(user_id) != 'admin':
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, 
                 detail="Bạn không có quyền Admin"
@@ -50,118 +58,192 @@ class StatusUpdate(BaseModel):
 # DASHBOARD STATS
 # ==================================================================
 
+def _count_query(table: str):
+    # head=True: chỉ lấy số đếm từ header Content-Range, không tải dòng nào về
+    return async_supabase_admin.table(table).select("id", count="exact", head=True)
+
+async def _exact_count(query, optional: bool = False) -> int:
+    try:
+        response = await query.execute()
+        return response.count or 0
+    except Exception:
+        # Bảng tracking (visitors, tour_views) có thể chưa được tạo -> 0
+        if optional:
+            return 0
+        raise
+
+async def _top_viewed_tours(limit: int = 5) -> list:
+    """Đếm lượt xem theo tour phía Postgres (dashboard_stats.sql), lấy thông tin tour một lần"""
+    try:
+        response = await async_supabase_admin.rpc("top_viewed_tours", {"p_limit": limit}).execute()
+        ranked = [(str(row["tour_id"]), row["views"]) for row in response.data or []]
+    except Exception as e:
+        print(f"⚠️ Không lấy được top tours (đã chạy dashboard_stats.sql chưa?): {e}")
+        return []
+    
+    # Thông tin tour lấy từ catalog trong bộ nhớ; tour thiếu thì gom một query in_
+    loaded = catalog.loaded_tours()
+    tours = {tid: loaded[tid] for tid, _ in ranked if tid in loaded}
+    missing = [tid for tid, _ in ranked if tid not in tours]
+    if missing:
+        tours_response = await async_supabase_admin.table("tours")\
+            .select("id, title, image")\
+            .in_("id", missing)\
+            .execute()
+        tours.update({str(t["id"]): t for t in tours_response.data or []})
+    
+    return [
+        {
+            "tour_id": tid,
+            "title": tours[tid].get("title"),
+            "image": tours[tid].get("image"),
+            "views": views
+        }
+        for tid, views in ranked
+        if tid in tours
+    ]
+
+async def compute_dashboard_stats() -> dict:
+    """Các truy vấn độc lập chạy song song thay vì lần lượt"""
+    today = datetime.now().date().isoformat()
+    (
+        total_consultations,
+        pending_consultations_count,
+        total_bookings,
+        pending_bookings_count,
+        total_visitors,
+        today_visitors_count,
+        total_tour_views,
+        top_5_tours,
+    ) = await asyncio.gather(
+        _exact_count(_count_query("consultations")),
+        _exact_count(_count_query("consultations").eq("status", "pending")),
+        _exact_count(_count_query("bookings")),
+        _exact_count(_count_query("bookings").eq("status", "pending")),
+        _exact_count(_count_query("visitors"), optional=True),
+        _exact_count(_count_query("visitors").gte("visited_at", today), optional=True),
+        _exact_count(_count_query("tour_views"), optional=True),
+        _top_viewed_tours(5),
+    )
+    
+    return {
+        "consultations": {
+            "total": total_consultations,
+            "pending": pending_consultations_count,
+            "completed": total_consultations - pending_consultations_count
+        },
+        "bookings": {
+            "total": total_bookings,
+            "pending": pending_bookings_count,
+            "confirmed": total_bookings - pending_bookings_count
+        },
+        "visitors": {
+            "total": total_visitors,
+            "today": today_visitors_count
+        },
+        "tour_views": {
+            "total": total_tour_views,
+            "top_tours": top_5_tours
+        },
+        "generated_at": datetime.now().isoformat()
+    }
+
+# Snapshot dùng chung: dashboard không bao giờ phải chờ tính lại (trừ lần đầu)
+dashboard_stats = AsyncSnapshot(compute_dashboard_stats, DASHBOARD_STATS_TTL, DASHBOARD_STATS_MAX_STALE)
+
+# Booking/consultation mới hoặc đổi trạng thái (create_booking, create_consultation,
+# update_*_status đều publish sự kiện) -> số pending/confirmed phải tính lại ngay
+DASHBOARD_EVENTS = ("booking.", "consultation.")
+add_listener(lambda type, data: dashboard_stats.invalidate() if type.startswith(DASHBOARD_EVENTS) else None)
+
 @router.get("/dashboard/stats")
 async def get_dashboard_stats(authorization: str = Header(None)):
     """Lấy thống kê tổng quan cho dashboard"""
-    verify_admin(authorization)
+    await verify_admin(authorization)
     
     try:
-        # 1. Tổng số consultations
-        consultations_response = supabase_admin.table("consultations").select("id", count="exact").execute()
-        total_consultations = consultations_response.count if consultations_response.count else 0
-        
-        # 2. Consultations chưa xử lý
-        pending_consultations = supabase_admin.table("consultations")\
-            .select("id", count="exact")\
-            .eq("status", "pending")\
-            .execute()
-        pending_consultations_count = pending_consultations.count if pending_consultations.count else 0
-        
-        # 3. Tổng số bookings
-        bookings_response = supabase_admin.table("bookings").select("id", count="exact").execute()
-        total_bookings = bookings_response.count if bookings_response.count else 0
-        
-        # 4. Bookings chưa xử lý
-        pending_bookings = supabase_admin.table("bookings")\
-            .select("id", count="exact")\
-            .eq("status", "pending")\
-            .execute()
-        pending_bookings_count = pending_bookings.count if pending_bookings.count else 0
-        
-        # 5. Tổng số visitors (từ bảng visitors nếu có, nếu không thì 0)
-        try:
-            visitors_response = supabase_admin.table("visitors").select("id", count="exact").execute()
-            total_visitors = visitors_response.count if visitors_response.count else 0
-        except:
-            total_visitors = 0
-        
-        # 6. Visitors hôm nay
-        try:
-            today = datetime.now().date()
-            today_visitors = supabase_admin.table("visitors")\
-                .select("id", count="exact")\
-                .gte("visited_at", today.isoformat())\
-                .execute()
-            today_visitors_count = today_visitors.count if today_visitors.count else 0
-        except:
-            today_visitors_count = 0
-        
-        # 7. Tổng lượt xem tours
-        try:
-            tour_views_response = supabase_admin.table("tour_views").select("id", count="exact").execute()
-            total_tour_views = tour_views_response.count if tour_views_response.count else 0
-        except:
-            total_tour_views = 0
-        
-        # 8. Top tours được xem nhiều nhất
-        try:
-            top_tours = supabase_admin.table("tour_views")\
-                .select("tour_id")\
-                .execute()
-            # Đếm số lượt xem cho mỗi tour
-            tour_counts = {}
-            if top_tours.data:
-                for view in top_tours.data:
-                    tour_id = view.get("tour_id")
-                    if tour_id:
-                        tour_counts[tour_id] = tour_counts.get(tour_id, 0) + 1
-            
-            # Lấy top 5 tours
-            sorted_tours = sorted(tour_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-            top_5_tours = []
-            for tour_id, count in sorted_tours:
-                try:
-                    tour_info = supabase_admin.table("tours")\
-                        .select("id, title, image")\
-                        .eq("id", tour_id)\
-                        .single()\
-                        .execute()
-                    if tour_info.data:
-                        top_5_tours.append({
-                            "tour_id": tour_id,
-                            "title": tour_info.data.get("title"),
-                            "image": tour_info.data.get("image"),
-                            "views": count
-                        })
-                except:
-                    pass
-        except:
-            top_5_tours = []
-        
-        return {
-            "consultations": {
-                "total": total_consultations,
-                "pending": pending_consultations_count,
-                "completed": total_consultations - pending_consultations_count
-            },
-            "bookings": {
-                "total": total_bookings,
-                "pending": pending_bookings_count,
-                "confirmed": total_bookings - pending_bookings_count
-            },
-            "visitors": {
-                "total": total_visitors,
-                "today": today_visitors_count
-            },
-            "tour_views": {
-                "total": total_tour_views,
-                "top_tours": top_5_tours
-            }
-        }
+        return await dashboard_stats.get()
     except Exception as e:
         print(f"Error getting dashboard stats: {e}")
         raise HTTPException(status_code=500, detail=f"Lỗi khi lấy thống kê: {str(e)}")
 
+@router.get("/cache/stats")
+async def get_cache_stats(authorization: str = Header(None)):
+    """Số liệu hit/miss của các cache để tinh chỉnh TTL"""
+    await verify_admin(authorization)
+    return {
+        "role_cache": role_cache_stats(),
+        "favorite_ids_cache": favorite_ids.stats(),
+        "profile_cache": profile_cache_stats(),
+        "dashboard_stats": dashboard_stats.stats(),
+        "event_stream": get_event_broker().stats(),
+        "tracking_buffer": tracking_buffer.stats()
+    }
+
+# ==================================================================
+# PHÂN TRANG KEYSET DÙNG CHUNG CHO CÁC DANH SÁCH ADMIN
+# ==================================================================
+# Trang đầu không có cursor; mỗi response trả về next_cursor (chuỗi mờ, cùng
+# định dạng core/pagination cho mọi danh sách) để lấy trang sau. Sắp xếp theo
+# (order_column, id) giảm dần nên trang sâu vẫn dùng index, không phải bỏ qua
+# offset dòng. Bảng tracking lớn dùng count=estimated: PostgREST đếm chính xác
+# tới ngưỡng db-max-rows, vượt ngưỡng thì lấy ước lượng của planner.
+
+class AdminList(NamedTuple):
+    table: str
+    select: str
+    order_column: str
+    filters: Tuple[str, ...]  # Các cột được lọc bằng eq
+    count: str                # "exact" | "estimated"
+
+ADMIN_LISTS = {
+    "consultations": AdminList("consultations", "*", "created_at", ("status",), "exact"),
+    "bookings": AdminList(
+        "bookings",
+        "*, tours(title, title_en, image, price, price_vnd, departure, destination)",
+        "booking_date", ("status",), "exact"
+    ),
+    "visitors": AdminList("visitors", "*", "visited_at", (), "estimated"),
+    "tour_views": AdminList("tour_views", "*, tours(title, title_en, image)", "viewed_at", ("tour_id",), "estimated"),
+}
+
+def filtered_query(spec: AdminList, filters: dict, select: Optional[str] = None, **select_kwargs):
+    query = async_supabase_admin.table(spec.table).select(select or spec.select, **select_kwargs)
+    for column in spec.filters:
+        if filters.get(column):
+            query = query.eq(column, filters[column])
+    return query
+
+def page_query(spec: AdminList, filters: dict, cursor: Optional[str], limit: int, count: Optional[str] = None):
+    # Lấy dư 1 dòng để biết còn trang sau hay không (split_page)
+    query = filtered_query(spec, filters, count=count)
+    return apply_cursor(query, cursor, spec.order_column).limit(limit + 1)
+
+async def fetch_admin_page(spec: AdminList, filters: dict, cursor: Optional[str], limit: int) -> dict:
+    """Một trang + tổng số dòng khớp bộ lọc (InvalidCursor nếu cursor hỏng)"""
+    # Trang đầu: tổng số đi kèm ngay trong header Content-Range của chính query.
+    # Trang sau có điều kiện keyset nên cần query đếm riêng (HEAD), chạy song song.
+    query = page_query(spec, filters, cursor, limit, count=None if cursor else spec.count)
+    if cursor:
+        response, total = await asyncio.gather(
+            query.execute(),
+            _exact_count(filtered_query(spec, filters, "id", count=spec.count, head=True))
+        )
+    else:
+        response = await query.execute()
+        total = response.count or 0
+    
+    rows, next_cursor = split_page(response.data or [], limit, spec.order_column)
+    return {
+        "data": rows,
+        "total": total,
+        "total_estimated": spec.count != "exact",
+        "next_cursor": next_cursor
+    }
+
+def _empty_page(spec: AdminList) -> dict:
+    return {"data": [], "total": 0, "total_estimated": spec.count != "exact", "next_cursor": None}
+
 # ==================================================================
 # CONSULTATIONS MANAGEMENT
 # ==================================================================
@@ -170,25 +252,16 @@ async def get_dashboard_stats(authorization: str = Header(None)):
 async def get_all_consultations(
     authorization: str = Header(None),
     status_filter: Optional[str] = Query(None, description="Lọc theo status"),
-    limit: int = Query(50, description="Số lượng records"),
-    offset: int = Query(0, description="Offset")
+    limit: int = Query(50, ge=1, le=500, description="Số lượng records"),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước")
 ):
     """Lấy danh sách tất cả consultations"""
-    verify_admin(authorization)
+    await verify_admin(authorization)
     
     try:
-        query = supabase_admin.table("consultations").select("*")
-        
-        if status_filter:
-            query = query.eq("status", status_filter)
-        
-        query = query.order("created_at", desc=True).limit(limit).offset(offset)
-        response = query.execute()
-        
-        return {
-            "data": response.data if response.data else [],
-            "total": len(response.data) if response.data else 0
-        }
+        return await fetch_admin_page(ADMIN_LISTS["consultations"], {"status": status_filter}, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error getting consultations: {e}")
         raise HTTPException(status_code=500, detail=f"Lỗi khi lấy consultations: {str(e)}")
@@ -200,20 +273,21 @@ async def update_consultation_status(
     authorization: str = Header(None)
 ):
     """Cập nhật trạng thái consultation"""
-    verify_admin(authorization)
+    await verify_admin(authorization)
     
     try:
         valid_statuses = ["pending", "processing", "completed", "cancelled"]
         if status_update.status not in valid_statuses:
             raise HTTPException(status_code=400, detail=f"Status phải là một trong: {valid_statuses}")
         
-        response = supabase_admin.table("consultations")\
+        response = await async_supabase_admin.table("consultations")\
             .update({"status": status_update.status})\
             .eq("id", consultation_id)\
             .execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Không tìm thấy consultation")
+        await publish_event("consultation.status_changed", response.data[0])
         
         return {
             "message": "Đã cập nhật trạng thái thành công",
@@ -229,61 +303,44 @@ async def update_consultation_status(
 # BOOKINGS MANAGEMENT
 # ==================================================================
 
+async def attach_profiles(bookings: list) -> None:
+    """Gắn profile (không có FK trực tiếp) cho cả trang: tối đa một query in_"""
+    try:
+        profiles = await get_profiles(booking.get("user_id") for booking in bookings)
+    except Exception as profile_err:
+        print(f"Error fetching profiles: {profile_err}")
+        profiles = {}
+    for booking in bookings:
+        user_id = booking.get("user_id")
+        booking["profiles"] = profiles.get(str(user_id)) if user_id else None
+
+async def shape_bookings(bookings: list) -> None:
+    """Xử lý dữ liệu để map location và lấy profile info"""
+    await attach_profiles(bookings)
+    for booking in bookings:
+        # Map location từ departure/destination
+        if booking.get("tours") and isinstance(booking.get("tours"), dict):
+            tour_data = booking["tours"]
+            tour_data["location"] = tour_data.get("departure") or tour_data.get("destination") or "N/A"
+
 @router.get("/bookings")
 async def get_all_bookings(
     authorization: str = Header(None),
     status_filter: Optional[str] = Query(None, description="Lọc theo status"),
-    limit: int = Query(50, description="Số lượng records"),
-    offset: int = Query(0, description="Offset")
+    limit: int = Query(50, ge=1, le=500, description="Số lượng records"),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước")
 ):
     """Lấy danh sách tất cả bookings"""
-    verify_admin(authorization)
+    await verify_admin(authorization)
     
     try:
         # Lấy bookings với tours (không JOIN profiles vì không có FK trực tiếp)
-        query = supabase_admin.table("bookings")\
-            .select("*, tours(title, title_en, image, price, price_vnd, departure, destination)")
+        page = await fetch_admin_page(ADMIN_LISTS["bookings"], {"status": status_filter}, cursor, limit)
         
-        if status_filter:
-            query = query.eq("status", status_filter)
-        
-        query = query.order("booking_date", desc=True).limit(limit).offset(offset)
-        response = query.execute()
-        
-        # Xử lý dữ liệu để map location và lấy profile info
-        bookings = response.data if response.data else []
-        for booking in bookings:
-            # Map location từ departure/destination
-            if booking.get("tours") and isinstance(booking.get("tours"), dict):
-                tour_data = booking["tours"]
-                tour_data["location"] = tour_data.get("departure") or tour_data.get("destination") or "N/A"
-            
-            # Lấy profile info riêng (vì không có FK trực tiếp)
-            user_id = booking.get("user_id")
-            if user_id:
-                try:
-                    profile_response = supabase_admin.table("profiles")\
-                        .select("email, full_name")\
-                        .eq("id", user_id)\
-                        .single()\
-                        .execute()
-                    if profile_response.data:
-                        booking["profiles"] = {
-                            "email": profile_response.data.get("email"),
-                            "name": profile_response.data.get("full_name")
-                        }
-                    else:
-                        booking["profiles"] = None
-                except Exception as profile_err:
-                    print(f"Error fetching profile for user {user_id}: {profile_err}")
-                    booking["profiles"] = None
-            else:
-                booking["profiles"] = None
-        
-        return {
-            "data": bookings,
-            "total": len(bookings)
-        }
+        await shape_bookings(page["data"])
+        return page
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error getting bookings: {e}")
         raise HTTPException(status_code=500, detail=f"Lỗi khi lấy bookings: {str(e)}")
@@ -295,20 +352,21 @@ async def update_booking_status(
     authorization: str = Header(None)
 ):
     """Cập nhật trạng thái booking"""
-    verify_admin(authorization)
+    await verify_admin(authorization)
     
     try:
         valid_statuses = ["pending", "confirmed", "cancelled", "completed"]
         if status_update.status not in valid_statuses:
             raise HTTPException(status_code=400, detail=f"Status phải là một trong: {valid_statuses}")
         
-        response = supabase_admin.table("bookings")\
+        response = await async_supabase_admin.table("bookings")\
             .update({"status": status_update.status})\
             .eq("id", booking_id)\
             .execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Không tìm thấy booking")
+        await publish_event("booking.status_changed", response.data[0])
         
         return {
             "message": "Đã cập nhật trạng thái thành công",
@@ -327,59 +385,210 @@ async def update_booking_status(
 @router.get("/visitors")
 async def get_visitors(
     authorization: str = Header(None),
-    limit: int = Query(100, description="Số lượng records"),
-    offset: int = Query(0, description="Offset")
+    limit: int = Query(100, ge=1, le=500, description="Số lượng records"),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước")
 ):
     """Lấy danh sách visitors"""
-    verify_admin(authorization)
+    await verify_admin(authorization)
     
     try:
-        response = supabase_admin.table("visitors")\
-            .select("*")\
-            .order("visited_at", desc=True)\
-            .limit(limit)\
-            .offset(offset)\
-            .execute()
-        
-        return {
-            "data": response.data if response.data else [],
-            "total": len(response.data) if response.data else 0
-        }
+        return await fetch_admin_page(ADMIN_LISTS["visitors"], {}, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # Nếu bảng không tồn tại, trả về empty
         print(f"Error getting visitors (table might not exist): {e}")
-        return {
-            "data": [],
-            "total": 0
-        }
+        return _empty_page(ADMIN_LISTS["visitors"])
 
 @router.get("/tour-views")
 async def get_tour_views(
     authorization: str = Header(None),
     tour_id: Optional[str] = Query(None, description="Lọc theo tour_id"),
-    limit: int = Query(100, description="Số lượng records"),
-    offset: int = Query(0, description="Offset")
+    limit: int = Query(100, ge=1, le=500, description="Số lượng records"),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước")
 ):
     """Lấy danh sách tour views"""
-    verify_admin(authorization)
+    await verify_admin(authorization)
     
     try:
-        query = supabase_admin.table("tour_views").select("*, tours(title, title_en, image)")
-        
-        if tour_id:
-            query = query.eq("tour_id", tour_id)
-        
-        query = query.order("viewed_at", desc=True).limit(limit).offset(offset)
-        response = query.execute()
-        
-        return {
-            "data": response.data if response.data else [],
-            "total": len(response.data) if response.data else 0
-        }
+        return await fetch_admin_page(ADMIN_LISTS["tour_views"], {"tour_id": tour_id}, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # Nếu bảng không tồn tại, trả về empty
         print(f"Error getting tour views (table might not exist): {e}")
-        return {
-            "data": [],
-            "total": 0
+        return _empty_page(ADMIN_LISTS["tour_views"])
+
+# ==================================================================
+# LUỒNG SỰ KIỆN REALTIME (SSE) THAY CHO POLL DANH SÁCH
+# ==================================================================
+
+def _sse(event: Event) -> bytes:
+    data = orjson.dumps(event.data).decode("utf-8")
+    return f"id: {event.id}\nevent: {event.type}\ndata: {data}\n\n".encode("utf-8")
+
+@router.post("/stream/ticket")
+async def create_stream_ticket(authorization: str = Header(None)):
+    """Ticket dùng một lần để mở /stream bằng EventSource (không đưa JWT lên URL)"""
+    user_id = await verify_admin(authorization)
+    return {"ticket": issue_stream_ticket(user_id), "expires_in": STREAM_TICKET_TTL}
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    authorization: str = Header(None),
+    ticket: Optional[str] = Query(None, description="Ticket từ POST /stream/ticket (EventSource không gửi được header)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    last_event_id_query: Optional[str] = Query(None, alias="last_event_id", description="Như header Last-Event-ID, khi mở lại bằng ticket mới")
+):
+    """
+    Server-sent events: booking.created, booking.status_changed,
+    consultation.created, consultation.status_changed. Nối lại với Last-Event-ID
+    để nhận bù các sự kiện bị lỡ; "reset" nghĩa là không bù được, cần tải lại danh sách.
+    Ticket chỉ dùng được một lần nên EventSource không tự nối lại được: khi lỗi,
+    client lấy ticket mới và mở lại với ?ticket=...&last_event_id=<id cuối đã nhận>.
+    """
+    if authorization:
+        await verify_admin(authorization)
+    else:
+        user_id = redeem_stream_ticket(ticket) if ticket else None
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Ticket không hợp lệ, đã dùng hoặc đã hết hạn")
+        # Role có thể vừa bị đổi sau khi cấp ticket
+        if await get_user_role_async(user_id) != 'admin':
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Bạn không có quyền Admin")
+    last_event_id = last_event_id or last_event_id_query
+    
+    broker = get_event_broker()
+    subscription = await broker.subscribe(last_event_id)
+    
+    async def event_stream():
+        try:
+            # Client mất kết nối thì đợi 3 giây rồi tự nối lại
+            yield b"retry: 3000\n\n"
+            for event in subscription.backlog:
+                yield _sse(event)
+            while True:
+                event = await subscription.get(EVENT_HEARTBEAT_INTERVAL)
+                if event is None:
+                    if await request.is_disconnected():
+                        break
+                    yield b": ping\n\n"
+                elif isinstance(event, Event):
+                    yield _sse(event)
+                else:
+                    # Bị ngắt vì quá chậm hoặc server đang tắt
+                    break
+        finally:
+            await broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Nginx không gom buffer, gửi sự kiện ngay
+        }
+    )
+
+# ==================================================================
+# ANALYTICS (chuỗi thời gian từ bảng rollup)
+# ==================================================================
+
+@router.get("/analytics/timeseries")
+async def get_analytics_timeseries(
+    authorization: str = Header(None),
+    metric: str = Query(..., pattern="^(visitors|tour_views)$"),
+    bucket: str = Query("day", pattern="^(hour|day)$"),
+    start: Optional[datetime] = Query(None, alias="from", description="Mặc định: 48 giờ / 30 ngày trước"),
+    end: Optional[datetime] = Query(None, alias="to", description="Mặc định: hiện tại"),
+    tour_id: Optional[str] = Query(None, description="Chỉ với metric=tour_views")
+):
+    """Số lượt theo từng giờ/ngày trong [from, to), bucket trống trả về 0"""
+    await verify_admin(authorization)
+    
+    if tour_id and metric != "tour_views":
+        raise HTTPException(status_code=400, detail="tour_id chỉ dùng với metric=tour_views")
+    try:
+        start, end = resolve_range(bucket, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return await fetch_timeseries(metric, bucket, start, end, tour_id)
+    except Exception as e:
+        print(f"Error getting analytics timeseries (đã chạy analytics_rollups.sql chưa?): {e}")
+        raise HTTPException(status_code=500, detail=f"Lỗi khi lấy analytics: {str(e)}")
+
+# ==================================================================
+# EXPORT (CSV / NDJSON)
+# ==================================================================
+
+async def _cursor_after(spec: AdminList, row_id: str) -> str:
+    """Cursor ngay sau một dòng đã tải (tải tiếp export bị ngắt)"""
+    response = await async_supabase_admin.table(spec.table)\
+        .select(f"id, {spec.order_column}")\
+        .eq("id", row_id)\
+        .limit(1)\
+        .execute()
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Không tìm thấy dòng after_id")
+    row = response.data[0]
+    return encode_cursor({spec.order_column: row[spec.order_column], "id": row["id"]})
+
+@router.get("/export/{table}")
+async def export_table(
+    table: str,
+    authorization: str = Header(None),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    status_filter: Optional[str] = Query(None, description="Lọc theo status (consultations, bookings)"),
+    tour_id: Optional[str] = Query(None, description="Lọc theo tour_id (tour-views)"),
+    cursor: Optional[str] = Query(None, description="Bắt đầu sau cursor (cùng định dạng next_cursor)"),
+    after_id: Optional[str] = Query(None, description="Tải tiếp sau dòng có id này"),
+    gzip: bool = Query(False, description="Trả về file .gz"),
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=5000)
+):
+    """
+    Export toàn bộ bảng (theo bộ lọc như các API danh sách) dạng luồng, đi theo
+    thứ tự keyset từng lô. Tải tiếp với cursor/after_id thì CSV không lặp lại header.
+    """
+    await verify_admin(authorization)
+    
+    spec = ADMIN_LISTS.get(table.replace("-", "_"))
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Chỉ export được: {', '.join(ADMIN_LISTS)}")
+    filters = {"status": status_filter, "tour_id": tour_id}
+    
+    async def fetch(batch_cursor: Optional[str]):
+        response = await page_query(spec, filters, batch_cursor, batch_size).execute()
+        rows, next_cursor = split_page(response.data or [], batch_size, spec.order_column)
+        if spec.table == "bookings":
+            await shape_bookings(rows)
+        return rows, next_cursor
+    
+    try:
+        if after_id and not cursor:
+            cursor = await _cursor_after(spec, after_id)
+        first_batch = await fetch(cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error exporting {spec.table}: {e}")
+        raise HTTPException(status_code=500, detail=f"Lỗi khi export {spec.table}: {str(e)}")
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"{spec.table}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    if gzip:
+        # application/gzip không bị CompressionMiddleware nén lại
+        media_type, filename = "application/gzip", filename + ".gz"
+    
+    return StreamingResponse(
+        stream_export(first_batch, fetch, make_encoder(format, header=not cursor), compress=gzip),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store"
         }
+    )
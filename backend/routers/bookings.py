@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, status, Query, Response
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-from core.config import supabase_admin  # Dùng admin client để bypass RLS
+from core.db import async_supabase_admin  # Dùng admin client để bypass RLS (async, không block event loop)
+from core.catalog import catalog
+from core.pagination import apply_cursor, split_page, InvalidCursor
+from core.events import publish_event
 
 router = APIRouter(prefix="/api/bookings", tags=["Bookings"])
 
@@ -25,7 +28,8 @@ async def create_booking(booking_data: BookingCreate):
         # Gửi sang Supabase với admin client (bypass RLS)
         # Lưu ý: Vì bảng này có RLS chặt chẽ (chỉ cho chính chủ insert), 
         # backend dùng SERVICE_ROLE_KEY (trong core/config) sẽ bypass được để ghi dữ liệu.
-        response = supabase_admin.table("bookings").insert(data).execute()
+        response = await async_supabase_admin.table("bookings").insert(data).execute()
+        await publish_event("booking.created", response.data[0])
         
         return {
             "message": "Đặt tour thành công!",
@@ -36,105 +40,75 @@ async def create_booking(booking_data: BookingCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- 3. API: Lấy danh sách Booking của User (Cho trang My Booking) ---
+# Các cột tour gắn kèm mỗi booking (thẻ tour trong trang lịch sử)
+BOOKING_TOUR_FIELDS = ("title", "title_en", "image", "price", "price_vnd", "departure", "destination")
+
+def shape_tour(tour: Optional[dict]) -> Optional[dict]:
+    """Map departure/destination thành location để tương thích với frontend"""
+    if not isinstance(tour, dict):
+        return None
+    data = {field: tour.get(field) for field in BOOKING_TOUR_FIELDS}
+    data["location"] = tour.get("departure") or tour.get("destination") or "N/A"
+    data["duration"] = None  # Không có field duration trong bảng tours
+    return data
+
 @router.get("/my-bookings")
-async def get_my_bookings(user_id: str = Query(..., description="ID của user muốn xem lịch sử")):
+async def get_my_bookings(
+    response: Response,
+    user_id: str = Query(..., description="ID của user muốn xem lịch sử"),
+    limit: int = Query(50, ge=1, le=200, description="Số booking mỗi trang"),
+    cursor: Optional[str] = Query(None, description="Cursor trang tiếp theo (header X-Next-Cursor)")
+):
     """
-    Lấy danh sách tất cả bookings của user, bao gồm thông tin tour chi tiết
+    Lấy danh sách bookings của user (mới nhất trước), kèm thông tin tour.
+    Tối đa 2 query: bookings, rồi một query in_ cho các tour không có trong catalog.
     """
     try:
-        print(f"🔍 Fetching bookings for user_id: {user_id}")
-        
-        # Thử query với join trước
+        query = async_supabase_admin.table("bookings")\
+            .select("*")\
+            .eq("user_id", user_id)
         try:
-            # Kỹ thuật quan trọng: JOIN bảng để lấy thông tin chi tiết của Tour
-            # select="*, tours(*)" nghĩa là: Lấy hết cột bảng bookings VÀ lấy hết cột bảng tours tương ứng
-            # Dùng admin client để bypass RLS và có thể đọc dữ liệu của user
-            # Lưu ý: Bảng tours có departure và destination, không có duration và location
-            response = supabase_admin.table("bookings")\
-                .select("*, tours(title, title_en, image, price, price_vnd, departure, destination)")\
-                .eq("user_id", user_id)\
-                .order("booking_date", desc=True)\
-                .execute()
-            
-            bookings = response.data if response.data else []
-            print(f"✅ Found {len(bookings)} bookings for user {user_id}")
-            
-            # Nếu không có dữ liệu, trả về mảng rỗng
-            if not bookings:
-                return []
-            
-            # Xử lý dữ liệu để đảm bảo format đúng
-            processed_bookings = []
-            for booking in bookings:
-                # Đảm bảo tours là object hoặc null
-                tour_data = booking.get("tours")
-                if tour_data is None:
-                    booking["tours"] = None
-                    print(f"⚠️ Booking {booking.get('id')} has no tour data (tour_id: {booking.get('tour_id')})")
-                else:
-                    # Map departure/destination thành location để tương thích với frontend
-                    if isinstance(tour_data, dict):
-                        # Tạo location từ departure hoặc destination
-                        location = tour_data.get("departure") or tour_data.get("destination") or "N/A"
-                        tour_data["location"] = location
-                        # Thêm duration = None vì không có field này trong bảng
-                        tour_data["duration"] = None
-                        print(f"✅ Processed tour data for booking {booking.get('id')}: {tour_data.get('title')}")
-                    else:
-                        # Nếu tour_data không phải dict, set thành None
-                        booking["tours"] = None
-                        print(f"⚠️ Tour data is not a dict for booking {booking.get('id')}")
-                processed_bookings.append(booking)
-            
-            return processed_bookings
-            
-        except Exception as join_error:
-            # Nếu join thất bại, thử lấy bookings không có join
-            print(f"⚠️ Join failed, trying without join: {str(join_error)}")
-            response = supabase_admin.table("bookings")\
-                .select("*")\
-                .eq("user_id", user_id)\
-                .order("booking_date", desc=True)\
+            query = apply_cursor(query, cursor, "booking_date")
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Lấy dư 1 dòng để biết còn trang sau hay không
+        bookings_response = await query.limit(limit + 1).execute()
+        bookings, next_cursor = split_page(bookings_response.data or [], limit, "booking_date")
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        
+        # Thông tin tour lấy từ catalog trong bộ nhớ; tour nào không có (VD: catalog
+        # chưa nạp được) thì gom lại thành đúng một query in_
+        loaded = catalog.loaded_tours()
+        tours = {}
+        missing = set()
+        for booking in bookings:
+            tour_id = booking.get("tour_id")
+            if tour_id is None:
+                continue
+            tour = loaded.get(str(tour_id))
+            if tour is None:
+                missing.add(str(tour_id))
+            else:
+                tours[str(tour_id)] = tour
+        if missing:
+            tours_response = await async_supabase_admin.table("tours")\
+                .select("id, " + ", ".join(BOOKING_TOUR_FIELDS))\
+                .in_("id", sorted(missing))\
                 .execute()
-            
-            bookings = response.data if response.data else []
-            
-            # Nếu có bookings, thử lấy thông tin tour riêng
-            if bookings:
-                for booking in bookings:
-                    tour_id = booking.get("tour_id")
-                    if tour_id:
-                        try:
-                            tour_response = supabase_admin.table("tours")\
-                                .select("title, title_en, image, price, departure, destination")\
-                                .eq("id", tour_id)\
-                                .single()\
-                                .execute()
-                            if tour_response.data:
-                                tour_data = tour_response.data
-                                # Map departure/destination thành location để tương thích với frontend
-                                tour_data["location"] = tour_data.get("departure") or tour_data.get("destination") or "N/A"
-                                tour_data["duration"] = None  # Không có field duration trong bảng
-                                booking["tours"] = tour_data
-                            else:
-                                booking["tours"] = None
-                        except Exception as tour_err:
-                            print(f"⚠️ Error fetching tour {tour_id}: {str(tour_err)}")
-                            booking["tours"] = None
-                    else:
-                        booking["tours"] = None
-            
-            return bookings
+            for tour in tours_response.data or []:
+                tours[str(tour["id"])] = tour
         
-    except Exception as e:
-        error_msg = str(e)
-        print(f"❌ Error fetching bookings for user {user_id}: {error_msg}")
-        print(f"Error type: {type(e).__name__}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        for booking in bookings:
+            booking["tours"] = shape_tour(tours.get(str(booking.get("tour_id"))))
         
-        # Trả về lỗi chi tiết hơn để debug
+        return bookings
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error fetching bookings for user {user_id}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Không thể tải lịch sử đặt tour: {error_msg}"
-        )
\ No newline at end of file
+            detail=f"Không thể tải lịch sử đặt tour: {e}"
+        )
@@ -1,12 +1,13 @@
 import os
 import uuid
-from openai import OpenAI
+from openai import AsyncOpenAI
 from fastapi import APIRouter, HTTPException, Header
 from pydantic import BaseModel
 from typing import Optional, List
 from pathlib import Path
 import json
-from core.config import supabase, supabase_admin
+from core.db import async_supabase_admin
+from core.auth import get_user_id_async
 
 # --- Cấu hình Yescale API ---
 AI_URL = "https://api.yescale.io/v1/chat/completions"
@@ -21,7 +22,8 @@ else:
     # Nếu không có /chat/completions, giả sử đã là base URL
     base_url = AI_URL.rstrip("/")
 
-client = OpenAI(
+# Dùng client async để lời gọi model (vài giây) không chặn event loop
+client = AsyncOpenAI(
     api_key=AI_TOKEN,
     base_url=base_url
 )
@@ -94,25 +96,23 @@ load_tour_data()
 load_how_to_book_data()
 
 # --- Hàm helper để lấy user_id từ token (optional) ---
-def get_user_id_from_token(authorization: Optional[str] = None) -> Optional[str]:
+async def get_user_id_from_token(authorization: Optional[str] = None) -> Optional[str]:
     """Lấy user_id từ token, trả về None nếu không có token hoặc token không hợp lệ"""
     if not authorization:
         return None
     try:
-        token = authorization.replace("Bearer ", "")
-        user_response = supabase.auth.get_user(token)
-        return user_response.user.id if user_response.user else None
+        return await get_user_id_async(authorization)
     except Exception as e:
         print(f"⚠️ Không thể lấy user_id từ token: {e}")
         return None
 
 # --- Hàm helper để lấy hoặc tạo chat session ---
-def get_or_create_session(session_id: Optional[str], user_id: Optional[str], language: str) -> str:
+async def get_or_create_session(session_id: Optional[str], user_id: Optional[str], language: str) -> str:
     """Lấy session_id hiện tại hoặc tạo mới, tự động load chat gần nhất nếu không có session_id và có user_id"""
     # Nếu có session_id, kiểm tra session có tồn tại không
     if session_id:
         try:
-            response = supabase_admin.table("chat_sessions").select("id").eq("id", session_id).execute()
+            response = await async_supabase_admin.table("chat_sessions").select("id").eq("id", session_id).execute()
             if response.data:
                 return session_id
         except Exception as e:
@@ -121,7 +121,7 @@ def get_or_create_session(session_id: Optional[str], user_id: Optional[str], lan
     # Nếu không có session_id nhưng có user_id, tìm chat gần nhất
     if not session_id and user_id:
         try:
-            response = supabase_admin.table("chat_sessions")\
+            response = await async_supabase_admin.table("chat_sessions")\
                 .select("id")\
                 .eq("user_id", user_id)\
                 .order("updated_at", desc=True)\
@@ -138,7 +138,7 @@ def get_or_create_session(session_id: Optional[str], user_id: Optional[str], lan
             "user_id": user_id,
             "language": language
         }
-        response = supabase_admin.table("chat_sessions").insert(new_session).execute()
+        response = await async_supabase_admin.table("chat_sessions").insert(new_session).execute()
         return response.data[0]["id"]
     except Exception as e:
         print(f"❌ Lỗi tạo session mới: {e}")
@@ -146,10 +146,10 @@ def get_or_create_session(session_id: Optional[str], user_id: Optional[str], lan
         return str(uuid.uuid4())
 
 # --- Hàm để lấy lịch sử chat từ database ---
-def get_chat_history_from_db(session_id: str, limit: int = 20) -> List[dict]:
+async def get_chat_history_from_db(session_id: str, limit: int = 20) -> List[dict]:
     """Lấy lịch sử chat từ database, trả về dạng list các dict với role và content"""
     try:
-        response = supabase_admin.table("chat_messages")\
+        response = await async_supabase_admin.table("chat_messages")\
             .select("role, content")\
             .eq("session_id", session_id)\
             .order("created_at", desc=False)\
@@ -164,7 +164,7 @@ def get_chat_history_from_db(session_id: str, limit: int = 20) -> List[dict]:
         return []
 
 # --- Hàm để lưu tin nhắn vào database ---
-def save_message_to_db(session_id: str, role: str, content: str):
+async def save_message_to_db(session_id: str, role: str, content: str):
     """Lưu tin nhắn vào database"""
     try:
         message_data = {
@@ -172,18 +172,18 @@ def save_message_to_db(session_id: str, role: str, content: str):
             "role": role,
             "content": content
         }
-        supabase_admin.table("chat_messages").insert(message_data).execute()
+        await async_supabase_admin.table("chat_messages").insert(message_data).execute()
         
         # Tự động tạo title từ tin nhắn đầu tiên nếu chưa có
         if role == "user":
-            session_response = supabase_admin.table("chat_sessions")\
+            session_response = await async_supabase_admin.table("chat_sessions")\
                 .select("title")\
                 .eq("id", session_id)\
                 .execute()
             if session_response.data and not session_response.data[0].get("title"):
                 # Lấy 50 ký tự đầu làm title
                 title = content[:50] + "..." if len(content) > 50 else content
-                supabase_admin.table("chat_sessions")\
+                await async_supabase_admin.table("chat_sessions")\
                     .update({"title": title})\
                     .eq("id", session_id)\
                     .execute()
@@ -215,7 +215,7 @@ async def create_chat_session(
     authorization: Optional[str] = Header(None)
 ):
     """Tạo chat session mới"""
-    user_id = get_user_id_from_token(authorization)
+    user_id = await get_user_id_from_token(authorization)
     
     try:
         session_data = {
@@ -223,7 +223,7 @@ async def create_chat_session(
             "title": request.title,
             "language": request.language or "VI"
         }
-        response = supabase_admin.table("chat_sessions").insert(session_data).execute()
+        response = await async_supabase_admin.table("chat_sessions").insert(session_data).execute()
         return {
             "session_id": response.data[0]["id"],
             "title": response.data[0].get("title"),
@@ -235,13 +235,13 @@ async def create_chat_session(
 @router.get("/sessions")
 async def get_chat_sessions(authorization: Optional[str] = Header(None)):
     """Lấy danh sách chat sessions của user"""
-    user_id = get_user_id_from_token(authorization)
+    user_id = await get_user_id_from_token(authorization)
     
     if not user_id:
         raise HTTPException(status_code=401, detail="Cần đăng nhập để xem lịch sử chat")
     
     try:
-        response = supabase_admin.table("chat_sessions")\
+        response = await async_supabase_admin.table("chat_sessions")\
             .select("id, title, language, created_at, updated_at")\
             .eq("user_id", user_id)\
             .order("updated_at", desc=True)\
@@ -256,11 +256,11 @@ async def get_chat_sessions(authorization: Optional[str] = Header(None)):
 @router.get("/sessions/{session_id}/messages")
 async def get_session_messages(session_id: str, authorization: Optional[str] = Header(None)):
     """Lấy tất cả tin nhắn trong một session"""
-    user_id = get_user_id_from_token(authorization)
+    user_id = await get_user_id_from_token(authorization)
     
     try:
         # Kiểm tra quyền truy cập session
-        session_response = supabase_admin.table("chat_sessions")\
+        session_response = await async_supabase_admin.table("chat_sessions")\
             .select("user_id")\
             .eq("id", session_id)\
             .execute()
@@ -273,7 +273,7 @@ async def get_session_messages(session_id: str, authorization: Optional[str] = H
             raise HTTPException(status_code=403, detail="Không có quyền truy cập session này")
         
         # Lấy messages
-        messages_response = supabase_admin.table("chat_messages")\
+        messages_response = await async_supabase_admin.table("chat_messages")\
             .select("id, role, content, created_at")\
             .eq("session_id", session_id)\
             .order("created_at", desc=False)\
@@ -291,11 +291,11 @@ async def get_session_messages(session_id: str, authorization: Optional[str] = H
 @router.delete("/sessions/{session_id}")
 async def delete_chat_session(session_id: str, authorization: Optional[str] = Header(None)):
     """Xóa chat session"""
-    user_id = get_user_id_from_token(authorization)
+    user_id = await get_user_id_from_token(authorization)
     
     try:
         # Kiểm tra quyền
-        session_response = supabase_admin.table("chat_sessions")\
+        session_response = await async_supabase_admin.table("chat_sessions")\
             .select("user_id")\
             .eq("id", session_id)\
             .execute()
@@ -308,7 +308,7 @@ async def delete_chat_session(session_id: str, authorization: Optional[str] = He
             raise HTTPException(status_code=403, detail="Không có quyền xóa session này")
         
         # Xóa session (messages sẽ tự động xóa do cascade)
-        supabase_admin.table("chat_sessions").delete().eq("id", session_id).execute()
+        await async_supabase_admin.table("chat_sessions").delete().eq("id", session_id).execute()
         
         return {"message": "Đã xóa session thành công"}
     except HTTPException:
@@ -325,13 +325,13 @@ async def chat_with_openai(
     language = request.language or "VI"
     
     # Lấy user_id từ token (nếu có)
-    user_id = get_user_id_from_token(authorization)
+    user_id = await get_user_id_from_token(authorization)
     
     # Lấy hoặc tạo session (tự động load chat gần nhất nếu không có session_id)
-    session_id = get_or_create_session(request.session_id, user_id, language)
+    session_id = await get_or_create_session(request.session_id, user_id, language)
     
     # 1. Lấy lịch sử chat từ database
-    history = get_chat_history_from_db(session_id)
+    history = await get_chat_history_from_db(session_id)
     
     # 2. Tạo Prompt (Kết hợp: Chỉ thị + Dữ liệu file text + Lịch sử chat + Câu hỏi mới)
     
@@ -408,7 +408,7 @@ async def chat_with_openai(
 
     try:
         # 4. Gọi Yescale API (tương thích với OpenAI API)
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=MODEL_NAME,
             messages=messages,
             temperature=0.7,
@@ -430,8 +430,8 @@ async def chat_with_openai(
             ai_reply = remove_markdown(ai_reply)
 
         # 5. Lưu lịch sử vào database
-        save_message_to_db(session_id, "user", user_query)
-        save_message_to_db(session_id, "assistant", ai_reply)
+        await save_message_to_db(session_id, "user", user_query)
+        await save_message_to_db(session_id, "assistant", ai_reply)
 
         return {
             "response": ai_reply,
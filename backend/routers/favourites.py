@@ -1,50 +1,56 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from pydantic import BaseModel
-from core.security import get_user_supabase_client
-from core.config import supabase
+from typing import List
+from core.security import get_user_scoped_client
+from core.catalog import catalog, LEAN_TOUR_FIELDS
+from core.compression import no_compression
+from core.favorites import favorite_ids
+from core.images import image_manifest
 
 router = APIRouter(prefix="/api/favorites", tags=["Favorites"])
 
 class FavoriteRequest(BaseModel):
     tour_id: str
 
+class FavoriteCheckRequest(BaseModel):
+    tour_ids: List[str]
+
 # Thêm tour vào wishlist
 @router.post("")
 async def add_favorite(
     request: FavoriteRequest,
     # Sử dụng Depends để gọi hàm verify token gọn gàng hơn
-    auth_data = Depends(get_user_supabase_client)
+    auth_data = Depends(get_user_scoped_client)
 ):
     user_id, user_supabase = auth_data # Giải nén dữ liệu từ auth_data
     
     try:
-        # Kiểm tra tour tồn tại (dùng admin client từ config)
-        tour_response = supabase.table("tours").select("*").eq("id", request.tour_id).execute()
-        if not tour_response.data:
+        # Kiểm tra tour tồn tại (tra trong catalog trong bộ nhớ, không query DB)
+        if not catalog.exists(request.tour_id):
             raise HTTPException(status_code=404, detail="Tour không tồn tại")
         
-        # Kiểm tra đã thích chưa (dùng user client)
-        existing = user_supabase.table("favorites")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .eq("tour_id", request.tour_id)\
+        # Một lần upsert duy nhất: ON CONFLICT (user_id, tour_id) DO NOTHING.
+        # Bấm tim 2 lần liên tiếp cũng không tạo bản ghi trùng (cần unique index
+        # trong favorites_unique.sql). Bản ghi mới được trả về, bản ghi trùng thì không.
+        favorite_data = {"user_id": user_id, "tour_id": request.tour_id}
+        response = await user_supabase.table("favorites")\
+            .upsert(favorite_data, on_conflict="user_id,tour_id", ignore_duplicates=True)\
             .execute()
         
-        if existing.data:
+        favorite_ids.add(user_id, request.tour_id)
+        if response.data:
             return {
-                "success": True, 
-                "message": "Tour đã có trong danh sách yêu thích",
-                "favorite": existing.data[0]
+                "success": True,
+                "created": True,
+                "message": "Đã thêm vào danh sách yêu thích",
+                "favorite": response.data[0]
             }
         
-        # Thêm vào favorites
-        favorite_data = {"user_id": user_id, "tour_id": request.tour_id}
-        response = user_supabase.table("favorites").insert(favorite_data).execute()
-        
         return {
-            "success": True, 
-            "message": "Đã thêm vào danh sách yêu thích",
-            "favorite": response.data[0]
+            "success": True,
+            "created": False,
+            "message": "Tour đã có trong danh sách yêu thích",
+            "favorite": favorite_data
         }
     except HTTPException:
         raise
@@ -56,35 +62,61 @@ async def add_favorite(
 @router.delete("/{tour_id}")
 async def remove_favorite(
     tour_id: str,
-    auth_data = Depends(get_user_supabase_client)
+    auth_data = Depends(get_user_scoped_client)
 ):
     user_id, user_supabase = auth_data
     try:
-        user_supabase.table("favorites")\
+        await user_supabase.table("favorites")\
             .delete()\
             .eq("user_id", user_id)\
             .eq("tour_id", tour_id)\
             .execute()
+        favorite_ids.remove(user_id, tour_id)
         
         return {"success": True, "message": "Đã xóa khỏi danh sách yêu thích"}
     except Exception as e:
         print(f"Lỗi remove favorite: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def resolve_tours(user_supabase, tour_ids: List[str]) -> dict:
+    """
+    id -> tour (bộ cột gọn) lấy từ catalog, giống /api/tours; tour không có trong
+    catalog (VD: catalog chưa nạp được) thì gom thành đúng một query in_.
+    """
+    loaded = catalog.loaded_tours()
+    tours, missing = {}, set()
+    for tour_id in tour_ids:
+        tour = loaded.get(tour_id)
+        if tour is None:
+            missing.add(tour_id)
+        else:
+            tours[tour_id] = {f: tour[f] for f in LEAN_TOUR_FIELDS if f in tour}
+    if missing:
+        response = await user_supabase.table("tours")\
+            .select(",".join(LEAN_TOUR_FIELDS))\
+            .in_("id", sorted(missing))\
+            .execute()
+        for tour in response.data or []:
+            # Điền URL ảnh theo manifest như các tour trong catalog
+            tours[str(tour["id"])] = image_manifest.fill_tour(tour)
+    return tours
+
 # Lấy danh sách wishlist
 @router.get("")
-async def get_favorites(auth_data = Depends(get_user_supabase_client)):
+async def get_favorites(auth_data = Depends(get_user_scoped_client)):
     user_id, user_supabase = auth_data
     try:
-        response = user_supabase.table("favorites")\
-            .select("*, tours(*)")\
+        write_count = favorite_ids.write_count(user_id)
+        response = await user_supabase.table("favorites")\
+            .select("tour_id")\
             .eq("user_id", user_id)\
             .execute()
+        tour_ids = [str(item["tour_id"]) for item in response.data or []]
+        # Đã có đủ tour_id trong tay -> nạp luôn cache tập id, không tốn thêm query
+        favorite_ids.store(user_id, tour_ids, write_count)
         
-        favorites = []
-        for item in response.data:
-            if item.get("tours"):
-                favorites.append(item["tours"])
+        tours = await resolve_tours(user_supabase, tour_ids)
+        favorites = [tours[tour_id] for tour_id in tour_ids if tour_id in tours]
         
         return {"success": True, "count": len(favorites), "favorites": favorites}
     except Exception as e:
@@ -93,19 +125,50 @@ async def get_favorites(auth_data = Depends(get_user_supabase_client)):
 
 # Kiểm tra trạng thái thích
 @router.get("/check/{tour_id}")
+@no_compression
 async def check_favorite(
     tour_id: str,
-    auth_data = Depends(get_user_supabase_client)
+    auth_data = Depends(get_user_scoped_client)
 ):
     user_id, user_supabase = auth_data
     try:
-        response = user_supabase.table("favorites")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .eq("tour_id", tour_id)\
-            .execute()
-        
-        return {"is_favorite": len(response.data) > 0}
+        entry = await favorite_ids.load(user_id, user_supabase)
+        return {"is_favorite": tour_id in entry.ids}
     except Exception as e:
         print(f"Lỗi check favorite: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Toàn bộ id tour đã thích (trang danh sách tô màu tim một lần cho mọi thẻ)
+@router.get("/ids")
+async def get_favorite_ids(
+    request: Request,
+    response: Response,
+    auth_data = Depends(get_user_scoped_client)
+):
+    user_id, user_supabase = auth_data
+    try:
+        entry = await favorite_ids.load(user_id, user_supabase)
+    except Exception as e:
+        print(f"Lỗi get favorite ids: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Dữ liệu riêng từng user: trình duyệt được giữ nhưng phải hỏi lại bằng ETag
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("If-None-Match") == entry.etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return {"ids": sorted(entry.ids)}
+
+# Kiểm tra trạng thái thích của nhiều tour một lần
+@router.post("/check")
+async def check_favorites(
+    body: FavoriteCheckRequest,
+    auth_data = Depends(get_user_scoped_client)
+):
+    user_id, user_supabase = auth_data
+    try:
+        entry = await favorite_ids.load(user_id, user_supabase)
+        return {"favorites": {tour_id: tour_id in entry.ids for tour_id in body.tour_ids}}
+    except Exception as e:
+        print(f"Lỗi check favorites: {e}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,5 +1,8 @@
 from fastapi import APIRouter, HTTPException, Header
 from core.config import supabase
+from core.auth import get_user_id
+from core.security import get_user_role, invalidate_role
+from core.profiles import invalidate_profile
 from pydantic import BaseModel
 from typing import Optional
 
@@ -21,9 +24,7 @@ def get_user_from_token(authorization: str = Header(None)):
     if not authorization:
         raise HTTPException(status_code=401, detail="Thiếu Token xác thực")
     try:
-        token = authorization.replace("Bearer ", "")
-        user_response = supabase.auth.get_user(token)
-        return user_response.user.id
+        return get_user_id(authorization)
     except Exception as e:
         print(f"Auth Error: {e}")
         raise HTTPException(status_code=401, detail="Token không hợp lệ hoặc đã hết hạn")
@@ -56,6 +57,7 @@ def update_profile(profile: ProfileUpdate, authorization: str = Header(None)):
         response = supabase.table("profiles").update(data).eq("id", user_id).execute()
         if not response.data:
             raise HTTPException(status_code=404, detail="Không tìm thấy profile để cập nhật")
+        invalidate_profile(user_id)
         
         return response.data[0]
     except Exception as e:
@@ -69,8 +71,7 @@ def update_user_role(user_id: str, role_update: RoleUpdate, authorization: str =
     
     try:
         # Kiểm tra người gọi có phải admin không
-        admin_check = supabase.table("profiles").select("role").eq("id", admin_id).single().execute()
-        if not admin_check.data or admin_check.data.get('role') != 'admin':
+        if get_user_role(admin_id) != 'admin':
             raise HTTPException(status_code=403, detail="Bạn không có quyền thay đổi role")
         
         # Cập nhật role
@@ -81,6 +82,9 @@ def update_user_role(user_id: str, role_update: RoleUpdate, authorization: str =
         if not response.data:
             raise HTTPException(status_code=404, detail="Không tìm thấy user")
         
+        # Xóa role cũ khỏi cache để quyền mới có hiệu lực ngay
+        invalidate_role(user_id)
+        
         return {"message": f"Đã cập nhật role thành {role_update.role}", "user_id": user_id}
     except HTTPException:
         raise
@@ -1,11 +1,31 @@
-from fastapi import APIRouter, HTTPException, Depends, Header, status
-from core.config import supabase, supabase_admin
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response, status
+from core.config import supabase_admin
+from core.auth import get_user_id
+from core.security import get_user_role
+from core.catalog import catalog, sort_key, LEAN_TOUR_FIELDS, VECTOR_COLUMNS
+from core.pagination import encode_cursor, decode_cursor, InvalidCursor
+from core.search import search_index
+from core.vectors import vector_indexes, get_embedder
+from core.similar import similar_tours, SIMILAR_TOURS_N
+from core.facets import facet_index
+from core.db import service_client
+from core.tour_import import import_tours, DEFAULT_BATCH_SIZE
+import asyncio
+import io
+import tempfile
 import uuid
 from pydantic import BaseModel
 from typing import Optional, List
 # Tạo router với prefix chung
 router = APIRouter(prefix="/api/tours", tags=["Tours"])
 
+# Các index tự cập nhật mỗi khi catalog tour thay đổi
+catalog.subscribe(search_index.on_catalog_change)
+for _index in vector_indexes.values():
+    catalog.subscribe(_index.on_catalog_change)
+catalog.subscribe(similar_tours.on_catalog_change)
+catalog.subscribe(facet_index.on_catalog_change)
+
 class TourBase(BaseModel):
     title: str
     title_en: Optional[str] = None
@@ -32,6 +52,10 @@ class TourCreate(TourBase):
     # ID là text, optional vì nếu user không gửi thì backend sẽ tự tạo
     id: Optional[str] = None
 
+class TourBatchRequest(BaseModel):
+    ids: List[str]
+    fields: Optional[str] = None
+
 class TourUpdate(TourBase):
     # Khi update, tiêu đề cũng có thể để trống (không sửa)
     title: Optional[str] = None
@@ -45,21 +69,11 @@ def verify_admin(authorization: str = Header(None)):
     if not authorization:
         raise HTTPException(status_code=401, detail="Thiếu Token xác thực")
     try:
-        # 1. Lấy token
-        token = authorization.replace("Bearer ", "")
-        
-        # 2. Lấy User ID từ Auth
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
+        # 1. Lấy User ID từ token (verify JWT tại chỗ)
+        user_id = get_user_id(authorization)
         
-        # 3. Check Role trong bảng profiles
-        profile_response = supabase.table("profiles")\
-            .select("role")\
-            .eq("id", user_id)\
-            .single()\
-            .execute()
-        
-        if not profile_response.data or profile_response.data.get('role') != 'admin':
+        # 2. Check Role trong bảng profiles (có cache theo user_id)
+        if get_user_role(user_id) != 'admin':
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, 
                 detail="Bạn không có quyền Admin để thực hiện thao tác này"
@@ -74,41 +88,263 @@ def verify_admin(authorization: str = Header(None)):
 # 3. API ENDPOINTS
 # ==================================================================
 
-# --- PUBLIC: Lấy danh sách Tour ---
+def set_catalog_headers(response: Response, snapshot) -> None:
+    """Gắn version của catalog để client dùng cho conditional request"""
+    response.headers["ETag"] = snapshot.etag
+    response.headers["X-Catalog-Version"] = str(snapshot.version)
+
+def not_modified(request: Request, snapshot) -> Optional[Response]:
+    """Trả về 304 nếu client đã có đúng version catalog hiện tại"""
+    if request.headers.get("If-None-Match") == snapshot.etag:
+        response = Response(status_code=304)
+        set_catalog_headers(response, snapshot)
+        return response
+    return None
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    """Sparse fieldset: mặc định bộ cột gọn, 'full' = mọi cột (trừ vector)"""
+    if not fields:
+        return LEAN_TOUR_FIELDS
+    if fields == "full":
+        return None
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    vectors = [f for f in requested if f in VECTOR_COLUMNS]
+    if vectors:
+        raise HTTPException(status_code=400, detail=f"Không hỗ trợ trả về cột vector: {vectors}")
+    # Luôn kèm id để client còn định danh được tour
+    return requested if "id" in requested else ("id",) + requested
+
+def matches_filters(tour: dict, destination: Optional[str], min_price: Optional[float]) -> bool:
+    """Bộ lọc cơ bản dùng chung cho danh sách và tìm kiếm ngữ nghĩa"""
+    if destination and tour.get("destination") != destination:
+        return False
+    if min_price and (tour.get("price") or 0) < min_price:
+        return False
+    return True
+
+def project(tour: dict, fields: Optional[tuple]) -> dict:
+    if fields is None:
+        return tour
+    return {f: tour[f] for f in fields if f in tour}
+
+MAX_BATCH_IDS = 200
+
+def resolve_batch(snapshot, ids: List[str], fields: Optional[str]) -> dict:
+    """Lấy nhiều tour từ catalog theo đúng thứ tự yêu cầu, kèm danh sách id không tồn tại"""
+    selected_fields = parse_fields(fields)
+    ids = list(dict.fromkeys(i.strip() for i in ids if i and i.strip()))
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"Tối đa {MAX_BATCH_IDS} id mỗi lần")
+    data, missing = [], []
+    for tour_id in ids:
+        tour = snapshot.tours.get(tour_id)
+        if tour is None:
+            missing.append(tour_id)
+        else:
+            data.append(project(tour, selected_fields))
+    return {"data": data, "missing": missing}
+
+# --- PUBLIC: Lấy danh sách Tour (phục vụ từ catalog trong bộ nhớ) ---
 @router.get("")
 def get_tours(
+    request: Request,
+    response: Response,
     search: Optional[str] = None, 
-    destination: Optional[str] = None,
-    min_price: Optional[float] = None
+    # Bộ lọc nhiều giá trị: ?type=a&type=b (OR trong cùng nhóm, AND giữa các nhóm)
+    tour_type: Optional[List[str]] = Query(None, alias="type"),
+    transportation: Optional[List[str]] = Query(None),
+    departure: Optional[List[str]] = Query(None),
+    destination: Optional[List[str]] = Query(None),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_price_vnd: Optional[float] = None,
+    max_price_vnd: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    facets: bool = Query(False, description="Trả về kèm số đếm facet (body dạng {data, facets, total})"),
+    mode: str = Query("simple", pattern="^(simple|ranked)$", description="ranked: tìm không dấu, xếp theo độ liên quan"),
+    fields: Optional[str] = Query(None, description="Danh sách cột, cách nhau bởi dấu phẩy, hoặc 'full'"),
+    limit: int = Query(50, ge=1, le=200, description="Số tour mỗi trang"),
+    cursor: Optional[str] = Query(None, description="Cursor trang tiếp theo (header X-Next-Cursor)")
 ):
     try:
-        query = supabase.table("tours").select("*")
+        selected_fields = parse_fields(fields)
+        snapshot = catalog.snapshot
+        cached = not_modified(request, snapshot)
+        if cached:
+            return cached
+        
+        ranked = mode == "ranked" and bool(search)
+        scores = {}
+        if ranked:
+            # Tìm qua inverted index: không dấu, khớp tiền tố, nhiều cột, xếp theo điểm
+            results = search_index.search(search)
+            scores = dict(results)
+            tours = [snapshot.tours[tid] for tid, _ in results if tid in snapshot.tours]
+        else:
+            # Snapshot đã sắp xếp mới nhất lên đầu
+            tours = [snapshot.tours[tid] for tid in snapshot.ordered_ids]
         
         # Các bộ lọc cơ bản (Optional)
-        if search:
-            query = query.ilike("title", f"%{search}%")
-        if destination:
-            query = query.eq("destination", destination)
-        if min_price:
-            query = query.gte("price", min_price)
-            
-        # Sắp xếp mới nhất lên đầu
-        response = query.order("created_at", desc=True).execute()
-        return response.data
+        if search and not ranked:
+            keyword = search.lower()
+            tours = [t for t in tours if keyword in (t.get("title") or "").lower()]
+        
+        # Lọc và đếm facet bằng bitmap index (không quét lại từng tour)
+        selections = {
+            "type": tour_type,
+            "transportation": transportation,
+            "departure": departure,
+            "destination": destination,
+        }
+        ranges = {
+            "price": (min_price or None, max_price),
+            "price_vnd": (min_price_vnd, max_price_vnd),
+            "rating": (min_rating, None),
+        }
+        # Số đếm facet cũng chỉ tính trên các tour khớp từ khóa tìm kiếm
+        search_ids = [str(t["id"]) for t in tours] if search else None
+        matched_ids, facet_counts = facet_index.query(selections, ranges, with_counts=facets, search_ids=search_ids)
+        tours = [t for t in tours if str(t["id"]) in matched_ids]
+        total = len(tours)
+        
+        # Phân trang keyset: theo (created_at, id) giảm dần, hoặc (điểm giảm dần, id) khi ranked
+        if cursor:
+            try:
+                if ranked:
+                    last = decode_cursor(cursor, "score", "id")
+                    boundary = (-float(last["score"]), str(last["id"]))
+                    tours = [t for t in tours if (-scores[str(t["id"])], str(t["id"])) > boundary]
+                else:
+                    last = decode_cursor(cursor, "created_at", "id")
+                    boundary = (last["created_at"], str(last["id"]))
+                    tours = [t for t in tours if sort_key(t) < boundary]
+            except (InvalidCursor, ValueError, TypeError):
+                raise HTTPException(status_code=400, detail="Cursor không hợp lệ")
+        
+        page = tours[:limit]
+        next_cursor = None
+        if len(tours) > limit:
+            last_tour = page[-1]
+            if ranked:
+                next_cursor = encode_cursor({"score": scores[str(last_tour["id"])], "id": last_tour.get("id")})
+            else:
+                next_cursor = encode_cursor({"created_at": last_tour.get("created_at"), "id": last_tour.get("id")})
+            response.headers["X-Next-Cursor"] = next_cursor
+        
+        set_catalog_headers(response, snapshot)
+        if ranked:
+            data = [{**project(t, selected_fields), "search_score": scores[str(t["id"])]} for t in page]
+        else:
+            data = [project(t, selected_fields) for t in page]
+        
+        if facets:
+            return {
+                "data": data,
+                "facets": facet_counts,
+                "total": total,
+                "next_cursor": next_cursor
+            }
+        return data
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- PUBLIC: Tìm tour theo ngữ nghĩa (embedding) ---
+# Khai báo trước /{tour_id} để "semantic" không bị hiểu là một tour_id
+@router.get("/semantic")
+def semantic_search(
+    q: str = Query(..., min_length=1, description="Câu truy vấn tự nhiên"),
+    k: int = Query(10, ge=1, le=50),
+    dim: int = Query(768, description="Số chiều embedding: 768 hoặc 1024"),
+    destination: Optional[str] = None,
+    min_price: Optional[float] = None,
+    fields: Optional[str] = Query(None, description="Danh sách cột, cách nhau bởi dấu phẩy, hoặc 'full'")
+):
+    index = vector_indexes.get(dim)
+    if index is None:
+        raise HTTPException(status_code=400, detail=f"dim phải là một trong: {sorted(vector_indexes)}")
+    selected_fields = parse_fields(fields)
+    try:
+        snapshot = catalog.snapshot
+        allowed = None
+        if destination or min_price:
+            allowed = {tid for tid, t in snapshot.tours.items() if matches_filters(t, destination, min_price)}
+        
+        query_vector = get_embedder().embed(q, dim)
+        results = index.search(query_vector, k, allowed)
+        return [
+            {**project(snapshot.tours[tid], selected_fields), "similarity": round(score, 4)}
+            for tid, score in results
+            if tid in snapshot.tours
+        ]
+    except HTTPException:
+        raise
     except Exception as e:
+        print(f"Semantic Search Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- PUBLIC: Lấy nhiều tour một lần (wishlist, lịch sử booking, thẻ tour trong chat) ---
+# Khai báo trước /{tour_id} để "batch" không bị hiểu là một tour_id
+@router.get("/batch")
+def get_tours_batch(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="Danh sách id, cách nhau bởi dấu phẩy"),
+    fields: Optional[str] = Query(None, description="Danh sách cột, cách nhau bởi dấu phẩy, hoặc 'full'")
+):
+    snapshot = catalog.snapshot
+    cached = not_modified(request, snapshot)
+    if cached:
+        return cached
+    result = resolve_batch(snapshot, ids.split(","), fields)
+    set_catalog_headers(response, snapshot)
+    return result
+
+# Bản POST cho danh sách id dài (vượt giới hạn độ dài URL)
+@router.post("/batch")
+def post_tours_batch(body: TourBatchRequest, response: Response):
+    snapshot = catalog.snapshot
+    result = resolve_batch(snapshot, body.ids, body.fields)
+    set_catalog_headers(response, snapshot)
+    return result
+
 # --- PUBLIC: Lấy chi tiết 1 Tour ---
 @router.get("/{tour_id}")
-def get_tour_detail(tour_id: str):
+def get_tour_detail(tour_id: str, request: Request, response: Response):
     try:
-        response = supabase.table("tours").select("*").eq("id", tour_id).execute()
-        if not response.data:
+        snapshot = catalog.snapshot
+        tour = snapshot.tours.get(tour_id)
+        if not tour:
             raise HTTPException(status_code=404, detail="Không tìm thấy tour này")
-        return response.data[0]
+        cached = not_modified(request, snapshot)
+        if cached:
+            return cached
+        set_catalog_headers(response, snapshot)
+        return tour
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- PUBLIC: Gợi ý tour tương tự (bảng hàng xóm tính sẵn) ---
+@router.get("/{tour_id}/similar")
+def get_similar_tours(
+    tour_id: str,
+    limit: int = Query(SIMILAR_TOURS_N, ge=1, le=SIMILAR_TOURS_N),
+    fields: Optional[str] = Query(None, description="Danh sách cột, cách nhau bởi dấu phẩy, hoặc 'full'")
+):
+    selected_fields = parse_fields(fields)
+    snapshot = catalog.snapshot
+    if tour_id not in snapshot.tours:
+        raise HTTPException(status_code=404, detail="Không tìm thấy tour này")
+    neighbours = similar_tours.get(tour_id) or []
+    return [
+        {**project(snapshot.tours[tid], selected_fields), "similarity": score}
+        for tid, score in neighbours[:limit]
+        if tid in snapshot.tours
+    ]
+
 # --- ADMIN ONLY: Tạo Tour mới ---
 @router.post("", status_code=201)
 def create_tour(tour: TourCreate, user_id: str = Depends(verify_admin)):
@@ -124,12 +360,47 @@ def create_tour(tour: TourCreate, user_id: str = Depends(verify_admin)):
         
         if not response.data:
              raise HTTPException(status_code=400, detail="Lỗi khi tạo tour")
+        
+        # Write-through: cập nhật catalog trong bộ nhớ ngay
+        catalog.apply_upsert(response.data[0])
              
         return response.data[0]
     except Exception as e:
         print(f"Create Tour Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- ADMIN ONLY: Import tour hàng loạt (CSV export của Supabase hoặc NDJSON) ---
+@router.post("/import")
+async def bulk_import_tours(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=1000),
+    dry_run: bool = Query(False, description="Chỉ validate, không ghi DB"),
+    user_id: str = Depends(verify_admin)
+):
+    # Body được chép dần ra file tạm (tràn xuống đĩa khi quá 1MB) rồi parse từng
+    # dòng trong thread riêng -> không giữ cả file trong bộ nhớ, không chặn event loop
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        stream = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        try:
+            report = await asyncio.to_thread(
+                import_tours, stream, service_client(), TourCreate, format, batch_size, dry_run
+            )
+        except Exception as e:
+            print(f"Import Tours Error: {e}")
+            raise HTTPException(status_code=400, detail=f"File import không hợp lệ: {e}")
+        finally:
+            stream.detach()
+
+    # Một lần import có thể chạm nhiều tour -> nạp lại catalog một lần thay vì từng dòng
+    if report["succeeded"] and not dry_run:
+        await asyncio.to_thread(catalog.refresh)
+    print(f"📦 Import tours: {report['succeeded']}/{report['total']} OK, {report['rows_per_second']} rows/s")
+    return report
+
 # --- ADMIN ONLY: Cập nhật Tour ---
 @router.put("/{tour_id}")
 def update_tour(tour_id: str, tour: TourUpdate, user_id: str = Depends(verify_admin)):
@@ -144,6 +415,8 @@ def update_tour(tour_id: str, tour: TourUpdate, user_id: str = Depends(verify_ad
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Không tìm thấy tour để sửa")
+        
+        catalog.apply_upsert(response.data[0])
             
         return response.data[0]
     except Exception as e:
@@ -160,6 +433,8 @@ def delete_tour(tour_id: str, user_id: str = Depends(verify_admin)):
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Không tìm thấy tour hoặc lỗi khi xóa")
+        
+        catalog.apply_delete(tour_id)
             
         return {"message": "Đã xóa tour thành công", "deleted_id": tour_id}
     except Exception as e:
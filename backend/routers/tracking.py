@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Request
 from pydantic import BaseModel
 from typing import Optional
-from core.config import supabase_admin
+from core.ingest import tracking_buffer
+from core.catalog import catalog
+from core.compression import no_compression
 from datetime import datetime
+import uuid
 
 router = APIRouter(prefix="/api/tracking", tags=["Tracking"])
 
@@ -16,7 +19,15 @@ class TourViewTrack(BaseModel):
     user_id: Optional[str] = None
     ip_address: Optional[str] = None
 
+def _valid_uuid(value: Optional[str]) -> Optional[str]:
+    # user_id sai định dạng sẽ làm hỏng cả lô khi ghi -> bỏ đi ngay từ đầu
+    try:
+        return str(uuid.UUID(value)) if value else None
+    except ValueError:
+        return None
+
 @router.post("/visitor")
+@no_compression
 async def track_visitor(track_data: VisitorTrack, request: Request):
     """Track visitor (public endpoint)"""
     try:
@@ -36,25 +47,33 @@ async def track_visitor(track_data: VisitorTrack, request: Request):
             user_agent = request.headers.get("User-Agent")
         
         insert_data = {
+            "id": str(uuid.uuid4()),  # Tạo sẵn id: trả về ngay, và ghi lại lô không bị trùng
             "ip_address": ip_address,
             "user_agent": user_agent,
             "page_path": track_data.page_path,
             "visited_at": datetime.now().isoformat()
         }
         
-        # Insert vào database (dùng admin client để bypass RLS)
-        response = supabase_admin.table("visitors").insert(insert_data).execute()
+        # Đưa vào hàng đợi, task nền ghi theo lô (kèm rollup) -> không chờ DB
+        if not tracking_buffer.submit("visitors", insert_data):
+            return {"success": False, "error": "Hàng đợi tracking đang đầy"}
         
-        return {"success": True, "id": response.data[0].get("id") if response.data else None}
+        return {"success": True, "id": insert_data["id"]}
     except Exception as e:
         # Không fail nếu tracking lỗi, chỉ log
         print(f"Error tracking visitor: {e}")
         return {"success": False, "error": str(e)}
 
 @router.post("/tour-view")
+@no_compression
 async def track_tour_view(track_data: TourViewTrack, request: Request):
     """Track tour view (public endpoint)"""
     try:
+        # tour_id không tồn tại sẽ làm lỗi cả lô khi ghi -> từ chối ngay từ đầu
+        # (catalog chưa nạp thì vẫn nhận, lúc ghi sẽ lọc)
+        if catalog.loaded and not catalog.exists(track_data.tour_id):
+            return {"success": False, "error": "Tour không tồn tại"}
+        
         # Lấy IP từ request nếu không có
         ip_address = track_data.ip_address
         if not ip_address:
@@ -65,16 +84,18 @@ async def track_tour_view(track_data: TourViewTrack, request: Request):
                 ip_address = request.client.host if request.client else None
         
         insert_data = {
+            "id": str(uuid.uuid4()),
             "tour_id": track_data.tour_id,
-            "user_id": track_data.user_id if track_data.user_id else None,
+            "user_id": _valid_uuid(track_data.user_id),
             "ip_address": ip_address,
             "viewed_at": datetime.now().isoformat()
         }
         
-        # Insert vào database
-        response = supabase_admin.table("tour_views").insert(insert_data).execute()
+        # Đưa vào hàng đợi, task nền ghi theo lô (kèm rollup) -> không chờ DB
+        if not tracking_buffer.submit("tour_views", insert_data):
+            return {"success": False, "error": "Hàng đợi tracking đang đầy"}
         
-        return {"success": True, "id": response.data[0].get("id") if response.data else None}
+        return {"success": True, "id": insert_data["id"]}
     except Exception as e:
         # Không fail nếu tracking lỗi, chỉ log
         print(f"Error tracking tour view: {e}")
@@ -0,0 +1,15 @@
+"""
+Test cho backend. Chạy từ thư mục backend:
+    python -m pytest -q tests
+
+Không cần Supabase thật: các module chỉ cần biến môi trường có giá trị, mọi lời
+gọi mạng trong test đều được thay bằng bản giả.
+"""
+import os
+import sys
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test-anon-key")
+os.environ.setdefault("AI_TOKEN", "test-ai-token")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from postgrest import APIError
+
+from core import analytics
+
+class FakeAdmin:
+    """async_supabase_admin giả: rpc lỗi theo mã cho trước, ghi lại các lần upsert thô"""
+
+    def __init__(self, rpc_error: Exception):
+        self.rpc_error = rpc_error
+        self.raw_writes = []
+
+    def rpc(self, fn, params):
+        return self._query(error=self.rpc_error)
+
+    def table(self, name):
+        admin = self
+
+        class Table:
+            def upsert(self, events, on_conflict=None, ignore_duplicates=False):
+                admin.raw_writes.append((name, events))
+                return admin._query(data=[{"id": event["id"]} for event in events])
+        return Table()
+
+    def _query(self, data=None, error=None):
+        class Query:
+            async def execute(self):
+                if error:
+                    raise error
+                return type("Response", (), {"data": data})()
+        return Query()
+
+EVENTS = [{"id": "a1", "page_path": "/"}]
+
+@pytest.mark.parametrize("code", ["PGRST202", "42883"])
+def test_missing_function_falls_back_to_raw_insert(monkeypatch, code):
+    admin = FakeAdmin(APIError({"message": "function not found", "code": code}))
+    monkeypatch.setattr(analytics, "async_supabase_admin", admin)
+    assert asyncio.run(analytics.record_events("visitors", EVENTS)) == ["a1"]
+    assert admin.raw_writes == [("visitors", EVENTS)]
+
+@pytest.mark.parametrize("error", [
+    APIError({"message": "canceling statement due to statement timeout", "code": "57014"}),
+    TimeoutError("read timeout"),
+])
+def test_other_errors_are_raised_without_raw_insert(monkeypatch, error):
+    # Ghi thô lúc này sẽ làm rollup thiếu các sự kiện đó; để hàng đợi thử lại qua RPC
+    admin = FakeAdmin(error)
+    monkeypatch.setattr(analytics, "async_supabase_admin", admin)
+    with pytest.raises(type(error)):
+        asyncio.run(analytics.record_events("visitors", EVENTS))
+    assert admin.raw_writes == []
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from core import auth
+
+SECRET = "test-secret-with-at-least-32-bytes!!"
+EC_KEY = ec.generate_private_key(ec.SECP256R1())
+
+def make_token(alg="ES256", kid="k1", key=None, **claims):
+    payload = {"sub": "user-1", "aud": "authenticated", "exp": int(time.time()) + 300, **claims}
+    if key is None:
+        key = {"ES256": EC_KEY, "HS256": SECRET}.get(alg)
+    return jwt.encode(payload, key, algorithm=alg, headers={"kid": kid} if kid else None)
+
+class FakeJWKS(auth._JWKSCache):
+    """JWKS không gọi mạng: _fetch trả về bộ khóa cho sẵn và ghi lại thread đã gọi"""
+
+    def __init__(self, keys):
+        super().__init__("http://jwks.invalid", refresh_interval=600)
+        self.jwks = keys
+        self.fetch_threads = []
+
+    def _fetch(self):
+        self.fetch_threads.append(threading.get_ident())
+        self._keys = dict(self.jwks)
+        self._fetched_at = time.monotonic()
+
+@pytest.fixture
+def jwks(monkeypatch):
+    public_jwk = jwt.PyJWK.from_json(jwt.algorithms.ECAlgorithm.to_jwk(EC_KEY.public_key()), algorithm="ES256")
+    fake = FakeJWKS({"k1": public_jwk})
+    monkeypatch.setattr(auth, "_jwks", fake)
+    monkeypatch.setattr(auth, "_claims_cache", auth.TTLCache(maxsize=100, ttl=60))
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", SECRET)
+    return fake
+
+@pytest.fixture
+def remote(monkeypatch):
+    """Ghi lại các lần fallback sang Supabase Auth"""
+    calls = []
+
+    def verify_remote(token):
+        calls.append(threading.get_ident())
+        return {"sub": "remote-user", "exp": time.time() + 300}
+    monkeypatch.setattr(auth, "_verify_remote", verify_remote)
+    return calls
+
+def test_es256_token_is_verified_locally_and_cached(jwks, remote):
+    token = make_token()
+    assert auth.verify_token(token)["sub"] == "user-1"
+    assert auth.verify_token(token)["sub"] == "user-1"
+    assert len(jwks.fetch_threads) == 1
+    assert remote == []
+    assert auth.claims_cache_stats()["hits"] == 1
+
+def test_hs256_token_is_verified_with_project_secret(jwks, remote):
+    assert auth.verify_token(make_token("HS256", kid=None))["sub"] == "user-1"
+    assert remote == []
+
+@pytest.mark.parametrize("token", [
+    make_token(exp=int(time.time()) - 10),                       # Hết hạn
+    make_token(aud="anon"),                                      # Sai audience
+    make_token(key=ec.generate_private_key(ec.SECP256R1())),     # Sai chữ ký
+    make_token("HS256", kid=None, key="other-secret-with-at-least-32-bytes"),
+    "not-a-jwt",
+])
+def test_invalid_tokens_are_rejected(jwks, remote, token):
+    with pytest.raises(auth.AuthError):
+        auth.verify_token(token)
+    assert remote == []
+
+def test_unsupported_algorithms_never_reach_supabase_auth(jwks, remote, monkeypatch):
+    with pytest.raises(auth.AuthError):
+        auth.verify_token(make_token("none", kid=None, key=None))
+    with pytest.raises(auth.AuthError):
+        auth.verify_token(make_token("HS384", kid=None, key=SECRET))
+    # Chưa cấu hình secret: token HS256 bị từ chối thay vì hỏi Supabase Auth
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", None)
+    with pytest.raises(auth.AuthError):
+        auth.verify_token(make_token("HS256", kid=None))
+    assert remote == []
+
+def test_unknown_kid_refreshes_jwks_then_falls_back_to_remote(jwks, remote):
+    auth.verify_token(make_token())  # Nạp JWKS lần đầu
+    assert auth.verify_token(make_token(kid="rotated"))["sub"] == "remote-user"
+    assert len(remote) == 1
+
+def test_async_verify_runs_network_work_off_the_event_loop(jwks, remote):
+    async def scenario():
+        loop_thread = threading.get_ident()
+        assert await auth.get_user_id_async("Bearer " + make_token()) == "user-1"
+        assert await auth.get_user_id_async("Bearer " + make_token(kid="rotated")) == "remote-user"
+        # JWKS đã có khóa k1: token mới ký bằng k1 được kiểm tra ngay trong event loop
+        assert await auth.get_user_id_async("Bearer " + make_token(sub="user-2")) == "user-2"
+        return loop_thread
+
+    loop_thread = asyncio.run(scenario())
+    assert jwks.fetch_threads and loop_thread not in jwks.fetch_threads
+    assert remote and loop_thread not in remote
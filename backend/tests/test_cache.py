@@ -0,0 +1,121 @@
+import asyncio
+
+from core.cache import AsyncSnapshot, TTLCache
+
+class Counter:
+    """compute giả: trả về số lần đã được gọi, có thể chậm hoặc lỗi"""
+
+    def __init__(self, delay: float = 0):
+        self.calls = 0
+        self.delay = delay
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        value = self.calls
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("db down")
+        return value
+
+def test_fresh_value_is_served_without_recompute():
+    async def scenario():
+        compute = Counter()
+        snapshot = AsyncSnapshot(compute, ttl=60, max_stale=600)
+        assert await snapshot.get() == 1
+        assert await snapshot.get() == 1
+        return compute, snapshot
+
+    compute, snapshot = asyncio.run(scenario())
+    assert compute.calls == 1
+    assert snapshot.stats()["hits"] == 1
+
+def test_stale_value_is_served_while_refreshing_in_background():
+    async def scenario():
+        compute = Counter(delay=0.05)
+        snapshot = AsyncSnapshot(compute, ttl=0.01, max_stale=600)
+        assert await snapshot.get() == 1
+        await asyncio.sleep(0.02)
+        assert await snapshot.get() == 1  # Bản cũ, không chờ
+        await asyncio.sleep(0.1)
+        assert await snapshot.get() == 2  # Lần tính nền đã xong
+        return snapshot
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot.stats()["stale_hits"] >= 1
+    assert snapshot.stats()["misses"] == 1
+
+def test_too_stale_value_waits_for_recompute():
+    async def scenario():
+        compute = Counter()
+        snapshot = AsyncSnapshot(compute, ttl=0.01, max_stale=0.02)
+        await snapshot.get()
+        await asyncio.sleep(0.03)
+        return await snapshot.get()
+
+    assert asyncio.run(scenario()) == 2
+
+def test_concurrent_misses_share_one_compute():
+    async def scenario():
+        compute = Counter(delay=0.05)
+        snapshot = AsyncSnapshot(compute, ttl=60, max_stale=600)
+        results = await asyncio.gather(*(snapshot.get() for _ in range(10)))
+        return compute, results
+
+    compute, results = asyncio.run(scenario())
+    assert compute.calls == 1
+    assert results == [1] * 10
+
+def test_invalidate_forces_fresh_value():
+    async def scenario():
+        compute = Counter()
+        snapshot = AsyncSnapshot(compute, ttl=60, max_stale=600)
+        await snapshot.get()
+        snapshot.invalidate()
+        return await snapshot.get()
+
+    assert asyncio.run(scenario()) == 2
+
+def test_compute_started_before_invalidate_is_not_reused():
+    async def scenario():
+        compute = Counter(delay=0.05)
+        snapshot = AsyncSnapshot(compute, ttl=0.01, max_stale=600)
+        await snapshot.get()
+        await asyncio.sleep(0.02)
+        await snapshot.get()  # Bắt đầu tính lại ở nền (lần 2)
+        snapshot.invalidate()  # Dữ liệu đổi trong lúc lần 2 đang chạy
+        value = await snapshot.get()
+        await asyncio.sleep(0.1)  # Lần 2 xong muộn cũng không ghi đè lần 3
+        return value, await snapshot.get()
+
+    assert asyncio.run(scenario()) == (3, 3)
+
+def test_invalidate_falls_back_to_old_value_when_recompute_fails():
+    async def scenario():
+        compute = Counter()
+        snapshot = AsyncSnapshot(compute, ttl=60, max_stale=600)
+        await snapshot.get()
+        compute.fail = True
+        snapshot.invalidate()
+        return await snapshot.get()
+
+    assert asyncio.run(scenario()) == 1
+
+def test_dashboard_stats_invalidated_by_write_events():
+    from core.events import publish_event
+    from routers.admin import dashboard_stats
+
+    generation = dashboard_stats._generation
+    asyncio.run(publish_event("booking.status_changed", {"id": "b1"}))
+    asyncio.run(publish_event("consultation.created", {"id": "c1"}))
+    asyncio.run(publish_event("reset", {}))
+    assert dashboard_stats._generation == generation + 2
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from core import catalog as catalog_module
+from core.catalog import CatalogUnavailable, TourCatalog
+
+def test_unloaded_catalog_answers_503_without_loading_inline(monkeypatch):
+    tours = TourCatalog()
+    monkeypatch.setattr(tours, "refresh", lambda: pytest.fail("không được nạp đồng bộ trong request"))
+    with pytest.raises(CatalogUnavailable) as excinfo:
+        tours.snapshot
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers["Retry-After"]
+    assert not tours.loaded
+    assert tours.loaded_tours() == {}
+
+def test_write_through_before_first_load_is_skipped():
+    tours = TourCatalog()
+    tours.apply_upsert({"id": 1, "title": "Hạ Long"})
+    tours.apply_delete("1")
+    assert not tours.loaded
+
+def test_refresher_retries_quickly_until_loaded(monkeypatch):
+    tours = TourCatalog()
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 3:
+            raise asyncio.CancelledError
+
+    def refresh():
+        if len(sleeps) == 2:
+            tours._snapshot = object()  # Lần thử thứ hai nạp được
+        else:
+            raise RuntimeError("supabase down")
+
+    monkeypatch.setattr(catalog_module.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(tours, "refresh", refresh)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(tours.run_refresher(interval=600))
+    assert sleeps == [catalog_module.CATALOG_RETRY_INTERVAL] * 2 + [600]
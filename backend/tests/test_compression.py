@@ -0,0 +1,125 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from core import compression
+from core.compression import CompressionMiddleware, choose_encoding, no_compression
+
+BIG = {"tours": [{"id": i, "title": "Vịnh Hạ Long"} for i in range(200)]}
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0.5, br;q=0.8", "br"),
+    ("gzip;q=0.9, br;q=0.3", "gzip"),
+    ("br;q=0, *", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=abc", None),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding(monkeypatch, header, expected):
+    if compression.brotli is None and expected == "br":
+        expected = "gzip"
+    assert choose_encoding(header) == expected
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip;q=0.1") == "gzip"
+
+class Recorder:
+    """ASGI wrapper ghi lại các message body mà middleware gửi ra"""
+
+    def __init__(self, app):
+        self.app = app
+        self.bodies = []
+
+    async def __call__(self, scope, receive, send):
+        async def record(message):
+            if message["type"] == "http.response.body":
+                self.bodies.append(message.get("body", b""))
+            await send(message)
+        await self.app(scope, receive, record)
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    def big():
+        return BIG
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/opt-out")
+    @no_compression
+    def opt_out():
+        return BIG
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + b"0" * 5000, media_type="image/png")
+
+    @app.get("/stream")
+    def stream():
+        def chunks():
+            for n in range(3):
+                # Chunk trước phải tới client trước khi generator chạy tiếp
+                assert len(recorder.bodies) == n
+                if n:
+                    assert decoder.decompress(recorder.bodies[-1]) == f"chunk-{n - 1};".encode()
+                yield f"chunk-{n};"
+        decoder = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        return StreamingResponse(chunks(), media_type="text/csv")
+
+    recorder = Recorder(app)
+    client = TestClient(recorder)
+    client.recorder = recorder
+    return client
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+def test_large_json_is_compressed_with_vary(client):
+    response = client.get("/big", headers=GZIP)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    raw = client.recorder.bodies[0]
+    assert int(response.headers["Content-Length"]) == len(raw)
+    assert json.loads(gzip.decompress(raw)) == BIG
+
+def test_small_body_and_no_accept_encoding_are_not_compressed(client):
+    assert "Content-Encoding" not in client.get("/small", headers=GZIP).headers
+    assert "Content-Encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+
+def test_opt_out_and_excluded_media_types(client):
+    opt_out = client.get("/opt-out", headers=GZIP)
+    assert "Content-Encoding" not in opt_out.headers and opt_out.json() == BIG
+    image = client.get("/image", headers=GZIP)
+    assert "Content-Encoding" not in image.headers
+    assert client.recorder.bodies[-1].startswith(b"\x89PNG")
+
+def test_streaming_body_is_not_buffered(client):
+    response = client.get("/stream", headers=GZIP)
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert response.text == "chunk-0;chunk-1;chunk-2;"
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli chưa cài")
+def test_brotli_stream_chunks_decode_immediately():
+    compressor = compression._StreamCompressor("br")
+    decoder = compression.brotli.Decompressor()
+    for n in range(3):
+        assert decoder.process(compressor.compress(f"chunk-{n};".encode())) == f"chunk-{n};".encode()
+    decoder.process(compressor.finish())
+    assert decoder.is_finished()
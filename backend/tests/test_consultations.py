@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core import events
+from core.leads import InMemoryLeadWriter, RpcLeadWriter, build_lead_params, set_lead_writer
+from routers import consultations
+
+FORM = {
+    "full_name": "Nguyễn Văn A",
+    "email": "khach@example.com",
+    "phone": "0912345678",
+    "message": "Tôi muốn đặt tour cuối tuần",
+    "user_id": "9b1deb4d-3b7d-4bad-9bdd-2b0d7b3dcb6d",
+    "tour_id": "1",
+}
+
+class RecordingBroker(events.InProcessBroker):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    async def publish(self, type, data):
+        self.published.append(type)
+        return await super().publish(type, data)
+
+@pytest.fixture
+def writer():
+    writer = InMemoryLeadWriter()
+    set_lead_writer(writer)
+    yield writer
+    set_lead_writer(None)
+
+@pytest.fixture
+def broker():
+    broker = RecordingBroker()
+    events.set_event_broker(broker)
+    yield broker
+    events.set_event_broker(None)
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(consultations.router)
+    return TestClient(app)
+
+def test_consultation_with_tour_creates_booking_once(writer, broker, client):
+    response = client.post("/api/consultations", json=FORM, headers={"Idempotency-Key": "form-1"})
+    assert response.status_code == 201
+    body = response.json()
+    assert body["booking"]["tour_id"] == "1"
+    assert body["data"]["idempotency_key"] == "form-1"
+    assert broker.published == ["consultation.created", "booking.created"]
+
+    # Client gửi lại (VD: mất mạng lúc chờ response): nhận kết quả cũ, không ghi thêm
+    replay = client.post("/api/consultations", json=FORM, headers={"Idempotency-Key": "form-1"})
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["data"]["id"] == body["data"]["id"]
+    assert replay.json()["booking"]["id"] == body["booking"]["id"]
+    assert len(writer.consultations) == 1 and len(writer.bookings) == 1
+    assert broker.published == ["consultation.created", "booking.created"]
+
+def test_without_key_or_tour(writer, broker, client):
+    form = {**FORM, "tour_id": None}
+    assert client.post("/api/consultations", json=form).status_code == 201
+    assert client.post("/api/consultations", json=form).status_code == 201
+    # Không có Idempotency-Key: mỗi lần gửi là một lead; không có tour thì không tạo booking
+    assert len(writer.consultations) == 2
+    assert writer.bookings == []
+    assert broker.published == ["consultation.created"] * 2
+
+def test_concurrent_submissions_with_same_key_write_once():
+    writer = InMemoryLeadWriter()
+    params = build_lead_params({"full_name": "A"}, {"tour_id": "1"}, "same-key")
+
+    async def scenario():
+        return await asyncio.gather(*(writer.submit(params) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert [r["replayed"] for r in results].count(False) == 1
+    assert len({r["consultation"]["id"] for r in results}) == 1
+    assert len(writer.consultations) == 1 and len(writer.bookings) == 1
+
+def test_writer_error_returns_500_without_events(broker, client):
+    class Broken:
+        async def submit(self, params):
+            raise RuntimeError("db down")
+
+    set_lead_writer(Broken())
+    try:
+        response = client.post("/api/consultations", json=FORM)
+    finally:
+        set_lead_writer(None)
+    assert response.status_code == 500
+    assert broker.published == []
+
+def test_rpc_writer_sends_all_params_in_one_call():
+    calls = []
+
+    class FakeClient:
+        def rpc(self, fn, params):
+            calls.append((fn, params))
+
+            class Query:
+                async def execute(self):
+                    return type("Response", (), {"data": {"consultation": {"id": "c1"}, "booking": None, "replayed": False}})()
+            return Query()
+
+    params = build_lead_params({"full_name": "A"}, None, "k")
+    result = asyncio.run(RpcLeadWriter(FakeClient()).submit(params))
+    assert calls == [("submit_consultation", {"p_consultation": {"full_name": "A"}, "p_booking": None, "p_idempotency_key": "k"})]
+    assert result["consultation"]["id"] == "c1"
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from core import events
+from routers import admin
+
+class ClosingBroker(events.InProcessBroker):
+    """Stream kết thúc ngay sau phần phát bù (test đọc được trọn response)"""
+
+    async def subscribe(self, last_event_id=None):
+        subscription = await super().subscribe(last_event_id)
+        subscription.close()
+        return subscription
+
+@pytest.fixture
+def client(monkeypatch):
+    async def verify_admin(authorization=None):
+        if authorization != "Bearer admin-token":
+            raise HTTPException(status_code=401, detail="Token không hợp lệ hoặc đã hết hạn")
+        return "admin-1"
+
+    roles = {"admin-1": "admin"}
+
+    async def get_user_role_async(user_id):
+        return roles.get(user_id)
+
+    monkeypatch.setattr(admin, "verify_admin", verify_admin)
+    monkeypatch.setattr(admin, "get_user_role_async", get_user_role_async)
+    events.set_event_broker(ClosingBroker())
+    app = FastAPI()
+    app.include_router(admin.router)
+    client = TestClient(app)
+    client.roles = roles
+    yield client
+    events.set_event_broker(None)
+
+def open_stream(client, url):
+    response = client.get(url)
+    return response.status_code, response.content if response.status_code == 200 else None
+
+def test_ticket_opens_stream_once(client):
+    response = client.post("/api/admin/stream/ticket", headers={"Authorization": "Bearer admin-token"})
+    assert response.status_code == 200
+    ticket = response.json()["ticket"]
+    assert response.json()["expires_in"] > 0
+
+    assert open_stream(client, f"/api/admin/stream?ticket={ticket}") == (200, b"retry: 3000\n\n")
+    # Dùng lại ticket (VD: URL lọt vào log) thì bị từ chối
+    assert open_stream(client, f"/api/admin/stream?ticket={ticket}")[0] == 401
+
+def test_ticket_requires_admin_token(client):
+    assert client.post("/api/admin/stream/ticket").status_code == 401
+    assert open_stream(client, "/api/admin/stream")[0] == 401
+    assert open_stream(client, "/api/admin/stream?ticket=made-up")[0] == 401
+    # Access token trên query string không còn được nhận
+    assert open_stream(client, "/api/admin/stream?token=admin-token")[0] == 401
+
+def test_ticket_rechecks_role(client):
+    ticket = client.post("/api/admin/stream/ticket", headers={"Authorization": "Bearer admin-token"}).json()["ticket"]
+    client.roles["admin-1"] = "user"
+    assert open_stream(client, f"/api/admin/stream?ticket={ticket}")[0] == 403
+
+def test_ticket_expires(monkeypatch):
+    monkeypatch.setattr(events, "_stream_tickets", events.TTLCache(maxsize=10, ttl=0.01))
+    ticket = events.issue_stream_ticket("admin-1")
+    time.sleep(0.02)
+    assert events.redeem_stream_ticket(ticket) is None
+
+def test_last_event_id_query_replays_missed_events(client):
+    broker = events.get_event_broker()
+    first = asyncio.run(broker.publish("booking.created", {"id": "b1"}))
+    asyncio.run(broker.publish("booking.created", {"id": "b2"}))
+    ticket = client.post("/api/admin/stream/ticket", headers={"Authorization": "Bearer admin-token"}).json()["ticket"]
+    status_code, body = open_stream(client, f"/api/admin/stream?ticket={ticket}&last_event_id={first.id}")
+    assert status_code == 200
+    assert b'"id":"b2"' in body and b'"id":"b1"' not in body
@@ -0,0 +1,131 @@
+import asyncio
+import csv
+import gzip
+import io
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.export import CsvEncoder, make_encoder, stream_export
+from core.pagination import decode_cursor, split_page
+from routers import admin
+
+# Nhiều dòng trùng created_at: cursor phải phân định bằng id
+ROWS = [
+    {"id": f"c{i:02d}", "created_at": f"2026-01-{i // 3 + 1:02d}", "full_name": f"Khách {i}", "tags": ["a", "b"] if i % 2 else None}
+    for i in range(10)
+]
+ORDERED = sorted(ROWS, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+
+def rows_after(cursor):
+    """Keyset (created_at, id) giảm dần như apply_cursor"""
+    if not cursor:
+        return ORDERED
+    last = decode_cursor(cursor, "created_at", "id")
+    return [r for r in ORDERED if (r["created_at"], r["id"]) < (last["created_at"], last["id"])]
+
+def page(cursor, limit):
+    """Nguồn trang giả: lấy dư 1 dòng như page_query"""
+    return split_page(rows_after(cursor)[:limit + 1], limit, "created_at")
+
+def collect(first_batch, fetch, encoder, compress=False):
+    async def scenario():
+        return [chunk async for chunk in stream_export(first_batch, fetch, encoder, compress)]
+    return asyncio.run(scenario())
+
+def run_export(cursor=None, header=True, compress=False, limit=3):
+    async def fetch(batch_cursor):
+        return page(batch_cursor, limit)
+    return collect(page(cursor, limit), fetch, make_encoder("csv", header), compress)
+
+def parse_csv(data: bytes, header: bool = True):
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+    return rows[1:] if header else rows
+
+def test_csv_export_covers_all_rows_in_order():
+    chunks = run_export()
+    assert len(chunks) == 4  # Mỗi lô keyset một chunk
+    data = b"".join(chunks)
+    assert data.decode("utf-8").splitlines()[0] == "id,created_at,full_name,tags"
+    assert [row[0] for row in parse_csv(data)] == [r["id"] for r in ORDERED]
+    assert parse_csv(data)[0][3] == '["a","b"]'
+
+def test_resume_skips_header_and_continues_after_cursor():
+    _, cursor = page(None, 4)
+    resumed = b"".join(run_export(cursor=cursor, header=False))
+    assert not resumed.startswith(b"id,")
+    assert [row[0] for row in parse_csv(resumed, header=False)] == [r["id"] for r in ORDERED[4:]]
+
+def test_gzip_chunks_decode_before_stream_ends():
+    chunks = run_export(compress=True)
+    # File bị cắt sau 2 lô: vẫn giải nén được trọn 6 dòng đã nhận
+    decoder = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    partial = decoder.decompress(b"".join(chunks[:2]))
+    assert [row[0] for row in parse_csv(partial)] == [r["id"] for r in ORDERED[:6]]
+    assert gzip.decompress(b"".join(chunks)) == b"".join(run_export())
+
+def test_csv_encoder_keeps_first_columns():
+    encoder = CsvEncoder(header=False)
+    assert encoder.encode([{"a": 1, "b": None}]) == b"1,\r\n"
+    assert encoder.encode([{"b": 2, "a": 3, "c": 4}]) == b"3,2\r\n"
+
+# --- Endpoint /api/admin/export/{table} ---
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def eq(self, column, value):
+        self.rows = [r for r in self.rows if r[column] == value]
+        return self
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def limit(self, size):
+        self.rows = self.rows[:size]
+        return self
+
+    async def execute(self):
+        return type("Response", (), {"data": self.rows})()
+
+class FakeAdmin:
+    def table(self, name):
+        return FakeQuery(ROWS)
+
+@pytest.fixture
+def client(monkeypatch):
+    async def verify_admin(authorization=None):
+        return "admin-1"
+
+    def page_query(spec, filters, cursor, limit, count=None):
+        return FakeQuery(rows_after(cursor)).limit(limit + 1)
+
+    monkeypatch.setattr(admin, "verify_admin", verify_admin)
+    monkeypatch.setattr(admin, "page_query", page_query)
+    monkeypatch.setattr(admin, "async_supabase_admin", FakeAdmin())
+    app = FastAPI()
+    app.include_router(admin.router)
+    return TestClient(app)
+
+def test_export_resume_with_after_id(client):
+    full = client.get("/api/admin/export/consultations", params={"batch_size": 3})
+    assert full.status_code == 200
+    assert full.headers["Content-Disposition"].endswith('.csv"')
+    lines = full.content.decode("utf-8").splitlines(keepends=True)
+    # Tải bị ngắt sau dòng thứ 5: tải tiếp sau id của dòng đó rồi nối vào file cũ
+    last_id = lines[5].split(",")[0]
+    resumed = client.get("/api/admin/export/consultations", params={"batch_size": 3, "after_id": last_id})
+    assert resumed.status_code == 200
+    assert "".join(lines[:6]).encode("utf-8") + resumed.content == full.content
+
+def test_export_gzip_and_errors(client):
+    response = client.get("/api/admin/export/consultations", params={"gzip": "true", "format": "ndjson"})
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["Content-Disposition"].endswith('.ndjson.gz"')
+    assert gzip.decompress(response.content).count(b"\n") == len(ROWS)
+    assert client.get("/api/admin/export/consultations", params={"cursor": "hỏng"}).status_code == 400
+    assert client.get("/api/admin/export/consultations", params={"after_id": "nope"}).status_code == 404
+    assert client.get("/api/admin/export/profiles").status_code == 404
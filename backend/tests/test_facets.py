@@ -0,0 +1,68 @@
+from core.catalog import TourSnapshot
+from core.facets import FacetIndex
+
+TOURS = {
+    str(i): {
+        "id": str(i),
+        "title": ("Đà Lạt " if i % 3 == 0 else "Hạ Long ") + str(i),
+        "type": ["domestic", "international"][i % 2],
+        "transportation": ["bus", "plane", "train"][i % 3],
+        "destination": ["Đà Lạt", "Hạ Long"][i % 3 != 0],
+        "price": 100 + 10 * i,
+        "created_at": f"2026-01-{i + 1:02d}",
+    }
+    for i in range(20)
+}
+
+def make_index():
+    index = FacetIndex()
+    index.on_catalog_change(TourSnapshot(1, TOURS, {}, "fp"), None)
+    return index
+
+def brute_force(selections, low=None, high=None, search_ids=None):
+    return {
+        tid for tid, tour in TOURS.items()
+        if all(not values or str(tour[field]) in values for field, values in selections.items())
+        and (low is None or tour["price"] >= low)
+        and (high is None or tour["price"] <= high)
+        and (search_ids is None or tid in search_ids)
+    }
+
+def test_ids_match_brute_force():
+    index = make_index()
+    for selections, low, high in [
+        ({}, None, None),
+        ({"type": ["domestic"]}, None, None),
+        ({"transportation": ["bus", "train"]}, 150, None),
+        ({"type": ["international"], "transportation": ["plane"]}, None, 250),
+        ({"type": ["khong-co"]}, None, None),
+    ]:
+        ids, counts = index.query(selections, {"price": (low, high)})
+        assert ids == brute_force(selections, low, high)
+        assert counts is None
+
+def test_counts_are_disjunctive():
+    index = make_index()
+    ids, counts = index.query({"transportation": ["bus"]}, {}, with_counts=True)
+    # Facet đang chọn không tự lọc chính nó; các facet khác thì có
+    assert counts["transportation"] == {"bus": 7, "plane": 7, "train": 6}
+    assert counts["type"] == {
+        value: len(brute_force({"transportation": ["bus"], "type": [value]}))
+        for value in ("domestic", "international")
+    }
+    assert sum(counts["type"].values()) == len(ids)
+
+def test_counts_follow_search():
+    index = make_index()
+    search_ids = [tid for tid, tour in TOURS.items() if "đà lạt" in tour["title"].lower()]
+    ids, counts = index.query({"type": ["domestic"]}, {}, with_counts=True, search_ids=search_ids)
+    assert ids == brute_force({"type": ["domestic"]}, search_ids=set(search_ids))
+    # Tour không khớp từ khóa không được tính vào số đếm
+    assert counts["destination"] == {"Hạ Long": 0, "Đà Lạt": len(ids)}
+    assert counts["type"] == {"domestic": 4, "international": 3}
+    assert counts["transportation"] == {"bus": len(ids), "plane": 0, "train": 0}
+
+def test_empty_search_matches_nothing():
+    ids, counts = make_index().query({}, {}, with_counts=True, search_ids=[])
+    assert ids == set()
+    assert all(n == 0 for values in counts.values() for n in values.values())
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.catalog import TourCatalog, TourSnapshot
+from core.favorites import FavoriteIdCache
+from core.security import get_user_scoped_client
+from routers import favourites
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client, self.table, self.filters = client, table, {}
+
+    def select(self, columns):
+        self.columns = columns
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def in_(self, column, values):
+        self.filters[column] = list(values)
+        return self
+
+    async def execute(self):
+        self.client.queries.append((self.table, self.columns, dict(self.filters)))
+        rows = self.client.rows[self.table]
+        if "id" in self.filters:
+            rows = [r for r in rows if str(r["id"]) in self.filters["id"]]
+        return type("Response", (), {"data": rows})()
+
+class FakeClient:
+    """Client postgrest giả của user: trả dữ liệu theo bảng, ghi lại mọi query"""
+
+    def __init__(self, favorites, tours):
+        self.rows = {"favorites": [{"tour_id": t} for t in favorites], "tours": tours}
+        self.queries = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+class FakeManifest:
+    def fill_tour(self, tour):
+        return {**tour, "image": f"https://cdn.example/{tour['image']}"}
+
+@pytest.fixture
+def app_client(monkeypatch):
+    tours = TourCatalog()
+    tours._publish(TourSnapshot(1, {
+        "1": {"id": 1, "title": "Hạ Long", "image": "https://cdn.example/ha-long.jpg", "description": "dài"},
+    }, {}, "fp"), None)
+    db = FakeClient(favorites=["1", "2"], tours=[{"id": 2, "title": "Sa Pa", "image": "sa-pa.jpg"}])
+    monkeypatch.setattr(favourites, "catalog", tours)
+    monkeypatch.setattr(favourites, "image_manifest", FakeManifest())
+    monkeypatch.setattr(favourites, "favorite_ids", FavoriteIdCache())
+    app = FastAPI()
+    app.include_router(favourites.router)
+    app.dependency_overrides[get_user_scoped_client] = lambda: ("user-1", db)
+    client = TestClient(app)
+    client.db = db
+    return client
+
+def test_favorites_resolve_tours_through_catalog(app_client):
+    body = app_client.get("/api/favorites").json()
+    assert body["count"] == 2
+    assert body["favorites"] == [
+        {"id": 1, "title": "Hạ Long", "image": "https://cdn.example/ha-long.jpg"},
+        # Tour không có trong catalog: một query in_, URL ảnh vẫn điền theo manifest
+        {"id": 2, "title": "Sa Pa", "image": "https://cdn.example/sa-pa.jpg"},
+    ]
+    assert [(table, filters) for table, _, filters in app_client.db.queries] == [
+        ("favorites", {"user_id": "user-1"}),
+        ("tours", {"id": ["2"]}),
+    ]
+    assert app_client.db.queries[0][1] == "tour_id"
+
+def test_store_skips_cache_when_a_write_raced_the_query():
+    cache = FavoriteIdCache()
+    db = FakeClient(favorites=["1"], tours=[])
+    write_count = cache.write_count("user-1")
+    cache.add("user-1", "2")  # Ghi xen vào trong lúc đang query
+    entry = cache.store("user-1", ["1"], write_count)
+    assert entry.ids == {"1"}
+    # Kết quả cũ không được cache: lần sau đọc lại DB
+    asyncio.run(cache.load("user-1", db))
+    assert len(db.queries) == 1
+    cache.add("user-1", "2")
+    assert asyncio.run(cache.load("user-1", db)).ids == {"1", "2"}
+    assert len(db.queries) == 1
+
+def test_ids_etag_and_304(app_client):
+    response = app_client.get("/api/favorites/ids")
+    assert response.json() == {"ids": ["1", "2"]}
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    cached = app_client.get("/api/favorites/ids", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.headers["ETag"] == etag
+    # Tập id nằm trong cache: không query lại
+    assert len(app_client.db.queries) == 1
+
+    favourites.favorite_ids.remove("user-1", "2")
+    changed = app_client.get("/api/favorites/ids", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json() == {"ids": ["1"]}
+    assert changed.headers["ETag"] != etag
+
+def test_post_check_many(app_client):
+    body = app_client.post("/api/favorites/check", json={"tour_ids": ["2", "3", "1"]}).json()
+    assert body == {"favorites": {"2": True, "3": False, "1": True}}
+    assert app_client.get("/api/favorites/check/3").json() == {"is_favorite": False}
+    assert len(app_client.db.queries) == 1
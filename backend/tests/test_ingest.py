@@ -0,0 +1,137 @@
+import asyncio
+
+from core.ingest import IngestBuffer
+
+class SlowWriter:
+    """flush_fn giả: mỗi lô mất một khoảng thời gian, ghi lại những gì đã nhận"""
+
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.written = []
+
+    async def __call__(self, metric, events):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("db down")
+        self.written.extend(event["n"] for event in events)
+        return [event["n"] for event in events]
+
+def test_stop_waits_for_in_flight_batch_and_drains_queue():
+    async def scenario():
+        writer = SlowWriter()
+        buffer = IngestBuffer(writer, max_size=100, batch_size=5, flush_interval=60)
+        buffer.start()
+        for n in range(12):
+            assert buffer.submit("visitors", {"n": n})
+        await asyncio.sleep(0.01)  # Lô đầu đang ghi dở
+        await buffer.stop()
+        return writer, buffer
+
+    writer, buffer = asyncio.run(scenario())
+    assert sorted(writer.written) == list(range(12))
+    assert buffer.stats()["depth"] == 0
+    assert buffer.stats()["flushed"] == 12
+
+def test_cancelled_write_puts_batch_back():
+    async def scenario():
+        writer = SlowWriter(delay=1)
+        buffer = IngestBuffer(writer, max_size=100, batch_size=5, flush_interval=60)
+        for n in range(3):
+            buffer.submit("visitors", {"n": n})
+        task = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert buffer.stats()["depth"] == 3
+
+def test_stop_timeout_keeps_unwritten_events_in_queue():
+    async def scenario():
+        writer = SlowWriter(delay=5)
+        buffer = IngestBuffer(writer, max_size=100, batch_size=5, flush_interval=60)
+        buffer.start()
+        for n in range(5):
+            buffer.submit("visitors", {"n": n})
+        await asyncio.sleep(0.01)
+        await buffer.stop(timeout=0.05)
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert buffer.stats()["depth"] == 5
+
+def test_failed_flush_is_retried_without_duplicates():
+    async def scenario():
+        writer = SlowWriter(delay=0, fail=True)
+        buffer = IngestBuffer(writer, max_size=100, batch_size=2, flush_interval=60)
+        for n in range(4):
+            buffer.submit("tour_views" if n % 2 else "visitors", {"n": n})
+        await buffer.flush()
+        assert buffer.stats()["depth"] == 4
+        writer.fail = False
+        await buffer.flush()
+        return writer, buffer
+
+    writer, buffer = asyncio.run(scenario())
+    assert sorted(writer.written) == [0, 1, 2, 3]
+    assert buffer.stats()["flush_errors"] == 1
+
+def test_overflow_policies():
+    newest = IngestBuffer(SlowWriter(), max_size=2, overflow="drop_newest")
+    assert [newest.submit("visitors", {"n": n}) for n in range(3)] == [True, True, False]
+    assert [event["n"] for _, event in newest._queue] == [0, 1]
+
+    oldest = IngestBuffer(SlowWriter(), max_size=2, overflow="drop_oldest")
+    assert all(oldest.submit("visitors", {"n": n}) for n in range(3))
+    assert [event["n"] for _, event in oldest._queue] == [1, 2]
+    assert oldest.stats()["dropped"] == 1
+
+class PickyWriter:
+    """flush_fn giả: cả lô lỗi nếu có một sự kiện "bad" (như khóa ngoại sai)"""
+
+    def __init__(self):
+        self.written = []
+        self.calls = 0
+
+    async def __call__(self, metric, events):
+        self.calls += 1
+        if any(event.get("bad") for event in events):
+            raise RuntimeError("violates foreign key constraint")
+        self.written.extend(event["n"] for event in events)
+        return [event["n"] for event in events]
+
+def test_bad_row_does_not_block_following_batches():
+    async def scenario():
+        writer = PickyWriter()
+        buffer = IngestBuffer(writer, max_size=100, batch_size=3, flush_interval=60, max_attempts=2)
+        for n in range(3):
+            buffer.submit("tour_views", {"n": n, "bad": n == 1})
+        await buffer.flush()
+        for n in range(3, 6):
+            buffer.submit("tour_views", {"n": n})
+        await buffer.flush()  # Lần lỗi thứ hai
+        assert writer.written == []
+        await buffer.flush()  # Quá max_attempts: tách từng dòng, bỏ dòng hỏng, rồi ghi lô sau
+        return writer, buffer
+
+    writer, buffer = asyncio.run(scenario())
+    assert writer.written == [0, 2, 3, 4, 5]
+    stats = buffer.stats()
+    assert stats["depth"] == 0
+    assert stats["poisoned"] == 1 and stats["dropped"] == 1
+    assert stats["flushed"] == 5
+
+def test_retry_queue_counts_toward_max_size():
+    async def scenario():
+        writer = SlowWriter(delay=0, fail=True)
+        buffer = IngestBuffer(writer, max_size=3, batch_size=2, flush_interval=60)
+        for n in range(3):
+            buffer.submit("visitors", {"n": n})
+        await buffer.flush()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert buffer.stats()["depth"] == 3
+    assert not buffer.submit("visitors", {"n": 3})
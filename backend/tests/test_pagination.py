@@ -0,0 +1,78 @@
+import pytest
+
+from core import pagination
+from core.db import keyset, service_client
+from core.pagination import InvalidCursor, apply_cursor, decode_cursor, encode_cursor, split_page
+
+def list_keyset(query, column, value, tie_column, tie_value, desc=True):
+    """Cùng điều kiện với core.db.keyset, chạy trên ListQuery"""
+    if desc:
+        query.rows = [r for r in query.rows if (r[column], r[tie_column]) < (value, tie_value)]
+    else:
+        query.rows = [r for r in query.rows if (r[column], r[tie_column]) > (value, tie_value)]
+    return query
+
+class ListQuery:
+    """Query giả chạy order/limit trên list trong bộ nhớ (như PostgREST)"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.orders = []
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size):
+        for column, desc in reversed(self.orders):
+            self.rows.sort(key=lambda r: r[column], reverse=desc)
+        self.rows = self.rows[:size]
+        return self
+
+def test_cursor_round_trip():
+    values = {"booking_date": "2026-01-10T15:14:35+00:00", "id": "7", "title": "Đà Lạt"}
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "booking_date", "id") == values
+
+@pytest.mark.parametrize("cursor", ["không-phải-base64", encode_cursor({"id": "7"}), "WzEsMl0"])
+def test_invalid_cursor_is_rejected(cursor):
+    # Chuỗi hỏng, thiếu khóa, hoặc JSON không phải object ("WzEsMl0" = [1,2])
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "booking_date", "id")
+
+def test_split_page():
+    rows = [{"created_at": f"2026-01-0{i}", "id": str(i)} for i in range(1, 4)]
+    assert split_page(rows, 3, "created_at") == (rows, None)
+    page, next_cursor = split_page(rows, 2, "created_at")
+    assert page == rows[:2]
+    assert decode_cursor(next_cursor, "created_at", "id") == {"created_at": "2026-01-02", "id": "2"}
+
+@pytest.mark.parametrize("desc", [True, False])
+def test_keyset_pages_cover_all_rows_once(monkeypatch, desc):
+    monkeypatch.setattr(pagination, "keyset", list_keyset)
+    # Nhiều dòng trùng booking_date: thứ tự phụ theo id giữ cho không sót, không lặp
+    rows = [{"booking_date": f"2026-01-{i // 3:02d}", "id": f"{i:03d}"} for i in range(25)]
+    seen, cursor = [], None
+    while True:
+        query = apply_cursor(ListQuery(rows), cursor, "booking_date", desc=desc).limit(4 + 1)
+        page, cursor = split_page(query.rows, 4, "booking_date")
+        seen.extend(page)
+        if not cursor:
+            break
+    assert seen == sorted(rows, key=lambda r: (r["booking_date"], r["id"]), reverse=desc)
+
+def test_keyset_filter_in_postgrest_request():
+    cursor = encode_cursor({"booking_date": "2026-01-10 15:14:35+00", "id": "7"})
+    query = apply_cursor(service_client().table("bookings").select("*"), cursor, "booking_date")
+    params = query.request.params
+    # Giá trị có dấu cách/dấu phẩy phải được đặt trong ngoặc kép
+    assert params["or"] == (
+        '(booking_date.lt."2026-01-10 15:14:35+00",'
+        'and(booking_date.eq."2026-01-10 15:14:35+00",id.lt.7))'
+    )
+    assert params["order"] == "booking_date.desc,id.desc"
+
+def test_keyset_ascending():
+    query = keyset(service_client().table("tours").select("id"), "created_at", "2026-01-10", "id", "a,b", desc=False)
+    assert query.request.params["or"] == '(created_at.gt.2026-01-10,and(created_at.eq.2026-01-10,id.gt."a,b"))'
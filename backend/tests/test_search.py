@@ -0,0 +1,65 @@
+from core.catalog import TourCatalog, TourSnapshot
+from core.search import TourSearchIndex, fold, tokenize
+
+TOURS = {
+    "1": {"id": 1, "title": "Văn Miếu Quốc Tử Giám", "destination": "Hà Nội", "created_at": "2026-01-01"},
+    "2": {"id": 2, "title": "Phố cổ Hà Nội", "description": "Ghé Văn Miếu buổi chiều", "created_at": "2026-01-02"},
+    "3": {"id": 3, "title": "Đà Lạt mộng mơ", "destination": "Lâm Đồng", "created_at": "2026-01-03"},
+}
+
+def make_catalog():
+    tours = TourCatalog()
+    index = TourSearchIndex()
+    tours.subscribe(index.on_catalog_change)
+    tours._publish(TourSnapshot(1, dict(TOURS), {}, "fp"), None)
+    return tours, index
+
+def ids(results):
+    return [tour_id for tour_id, _ in results]
+
+def test_fold_and_tokenize():
+    assert fold("Văn Miếu") == "van mieu"
+    assert fold("ĐÀ LẠT") == "da lat"
+    assert tokenize("Hạ Long, 3 ngày/2 đêm!") == ["ha", "long", "3", "ngay", "2", "dem"]
+
+def test_query_without_diacritics_matches():
+    _, index = make_catalog()
+    assert ids(index.search("van mieu"))[0] == "1"
+    assert ids(index.search("da lat")) == ["3"]
+    assert index.search("!!!") == []
+
+def test_prefix_match_scores_below_full_word():
+    _, index = make_catalog()
+    assert ids(index.search("lam d")) == ["3"]
+    full = dict(index.search("mieu"))
+    prefix = dict(index.search("mie"))
+    assert set(prefix) == {"1", "2"}
+    assert prefix["1"] < full["1"]
+
+def test_title_phrase_ranks_above_description_match():
+    _, index = make_catalog()
+    results = index.search("văn miếu")
+    assert ids(results) == ["1", "2"]
+    # Tour 2 chỉ khớp ở mô tả, tour 1 khớp cả cụm trong tiêu đề
+    assert results[0][1] - results[1][1] > 2.0
+
+def test_partial_match_when_no_tour_has_every_token():
+    _, index = make_catalog()
+    assert set(ids(index.search("hà nội đà lạt"))) == {"1", "2", "3"}
+
+def test_incremental_update_follows_catalog():
+    tours, index = make_catalog()
+    tours.apply_upsert({"id": 4, "title": "Vịnh Hạ Long", "created_at": "2026-01-04"})
+    assert ids(index.search("ha long")) == ["4"]
+
+    tours.apply_upsert({"id": 3, "title": "Sa Pa", "destination": "Lào Cai"})
+    assert index.search("da lat") == []
+    assert ids(index.search("sa pa")) == ["3"]
+
+    tours.apply_delete("1")
+    assert ids(index.search("van mieu")) == ["2"]
+
+    rebuilt = TourSearchIndex()
+    rebuilt.rebuild(tours.snapshot.tours)
+    for query in ("ha noi", "sa", "vinh ha long", "van mieu"):
+        assert index.search(query) == rebuilt.search(query)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from core import similar
+from core.catalog import TourCatalog, TourSnapshot
+from core.similar import SimilarTours
+
+DIM = 8
+RNG = np.random.default_rng(7)
+TYPES = [["Văn hóa"], ["Biển"], ["Văn hóa", "Ẩm thực"], [], ["Mạo hiểm"]]
+DESTINATIONS = ["Hà Nội", "Đà Nẵng", "Hội An", None]
+
+def row(i: int) -> dict:
+    return {
+        "id": i,
+        "title": f"Tour {i}",
+        "type": TYPES[i % len(TYPES)],
+        "destination": DESTINATIONS[i % len(DESTINATIONS)],
+        "created_at": f"2026-01-{i + 1:02d}",
+        # Tour 5 chưa có embedding
+        "embedding_768": None if i == 5 else str(RNG.normal(size=DIM).round(4).tolist()),
+    }
+
+def make_catalog():
+    tours = TourCatalog()
+    index = SimilarTours(column="embedding_768", dim=DIM, top_n=3)
+    tours.subscribe(index.on_catalog_change)
+    rows = [row(i) for i in range(12)]
+    data = {str(r["id"]): {k: v for k, v in r.items() if k != "embedding_768"} for r in rows}
+    vectors = {str(r["id"]): {"embedding_768": r["embedding_768"]} for r in rows if r["embedding_768"]}
+    tours._publish(TourSnapshot(1, data, vectors, "fp"), None)
+    return tours, index
+
+def assert_matches_rebuild(tours, index):
+    rebuilt = SimilarTours(column="embedding_768", dim=DIM, top_n=3)
+    rebuilt.on_catalog_change(tours.snapshot, None)
+    assert index._neighbours == rebuilt._neighbours
+
+def test_incremental_updates_match_full_rebuild():
+    tours, index = make_catalog()
+    assert_matches_rebuild(tours, index)
+
+    tours.apply_upsert(row(12))                                   # Tour mới
+    assert_matches_rebuild(tours, index)
+    tours.apply_upsert({**row(3), "embedding_768": str(RNG.normal(size=DIM).tolist())})  # Đổi embedding
+    assert_matches_rebuild(tours, index)
+    tours.apply_upsert({"id": 7, "type": ["Biển"], "destination": "Hà Nội"})  # Đổi type/điểm đến
+    assert_matches_rebuild(tours, index)
+    neighbour = index.get("0")[0][0]
+    tours.apply_delete(neighbour)                                 # Xóa hàng xóm gần nhất của tour 0
+    assert_matches_rebuild(tours, index)
+    assert all(n != neighbour for n, _ in index.get("0"))
+
+def test_write_parses_only_changed_embeddings(monkeypatch):
+    tours, index = make_catalog()
+    calls = []
+    parse = similar.parse_vector
+    monkeypatch.setattr(similar, "parse_vector", lambda raw: calls.append(raw) or parse(raw))
+    tours.apply_upsert(row(12))
+    assert len(calls) == 1
+    assert index.get("12") and len(index.get("12")) == 3
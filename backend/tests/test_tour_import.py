@@ -0,0 +1,78 @@
+import io
+import json
+
+from core.tour_import import import_tours
+from routers.tours import TourCreate
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, payload, on_conflict=None):
+        self.payload = payload if isinstance(payload, list) else [payload]
+        return self
+
+    def execute(self):
+        self.client.calls.append(self.payload)
+        # PostgREST: cả lô lỗi nếu một dòng lỗi, hoặc các object khác bộ khóa
+        if len({tuple(sorted(row)) for row in self.payload}) > 1:
+            raise RuntimeError("All object keys must match")
+        if any(row.get("title") == "BAD" for row in self.payload):
+            raise RuntimeError("violates check constraint")
+        self.client.written.extend(row["id"] for row in self.payload)
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.written = []
+
+    def table(self, name):
+        return FakeTable(self)
+
+def ndjson(rows):
+    return io.StringIO("\n".join(json.dumps(row, ensure_ascii=False) for row in rows) + "\n")
+
+def test_failed_batch_retries_rows_and_reports_bad_one():
+    client = FakeClient()
+    rows = [
+        {"id": "t1", "title": "Hạ Long"},
+        {"id": "t2", "title": "BAD"},
+        {"id": "t3", "title": "Sa Pa"},
+        {"id": "t4", "title": "Huế"},
+    ]
+    report = import_tours(ndjson(rows), client, TourCreate, fmt="ndjson", batch_size=3)
+    assert client.written == ["t1", "t3", "t4"]
+    assert report["succeeded"] == 3 and report["failed"] == 1
+    assert report["errors"] == [{"row": 2, "id": "t2", "error": "violates check constraint"}]
+    # Lô 1 lỗi -> 3 lần thử từng dòng; lô 2 ghi một lần
+    assert [len(call) for call in client.calls] == [3, 1, 1, 1, 1]
+
+def test_batches_are_grouped_by_key_set():
+    client = FakeClient()
+    rows = [
+        {"id": "t1", "title": "Hạ Long"},
+        {"id": "t2", "title": "Sa Pa", "created_at": "2026-01-02"},
+        {"id": "t3", "title": "Huế", "embedding_768": "[0.1, 0.2]"},
+        {"id": "t4", "title": "Đà Lạt"},
+    ]
+    report = import_tours(ndjson(rows), client, TourCreate, fmt="ndjson", batch_size=10)
+    assert report["failed"] == 0 and sorted(client.written) == ["t1", "t2", "t3", "t4"]
+    assert report["batches"] == 3
+    assert sorted(sorted(row["id"] for row in call) for call in client.calls) == [["t1", "t4"], ["t2"], ["t3"]]
+    assert next(call for call in client.calls if call[0]["id"] == "t3")[0]["embedding_768"] == "[0.1,0.2]"
+
+def test_invalid_rows_are_reported_without_writing():
+    client = FakeClient()
+    data = io.StringIO('{"id": "t1", "title": "Hạ Long", "price": "rẻ"}\nkhông phải json\n{"id": "t2", "title": "Huế"}\n')
+    report = import_tours(data, client, TourCreate, fmt="ndjson")
+    assert client.written == ["t2"]
+    assert [error["row"] for error in report["errors"]] == [1, 2]
+    assert "price" in report["errors"][0]["error"]
+
+def test_csv_rows_and_dry_run():
+    csv_data = 'id,title,type,images,price\nt1,"Hạ Long","[""Biển""]",[],100\nt2,Huế,,,\n'
+    client = FakeClient()
+    report = import_tours(io.StringIO(csv_data), client, TourCreate, fmt="csv", dry_run=True)
+    assert report["succeeded"] == 2 and client.calls == []
+    report = import_tours(io.StringIO(csv_data), client, TourCreate, fmt="csv")
+    assert client.calls[0][0]["type"] == ["Biển"] and client.calls[0][1]["price"] is None
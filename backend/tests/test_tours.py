@@ -0,0 +1,82 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.catalog import TourSnapshot, catalog
+from core.vectors import HashingEmbedder, set_embedder
+from routers import tours as tours_router
+
+EMBEDDER = HashingEmbedder()
+
+TOURS = {
+    "1": {"id": 1, "title": "Vịnh Hạ Long", "description": "Du thuyền ngủ đêm trên vịnh", "destination": "Quảng Ninh", "price": 300, "created_at": "2026-01-03"},
+    "2": {"id": 2, "title": "Văn Miếu Quốc Tử Giám", "description": "Tham quan di tích Hà Nội", "destination": "Hà Nội", "price": 50, "created_at": "2026-01-02"},
+    "3": {"id": 3, "title": "Phố cổ Hội An", "description": "Đèn lồng và ẩm thực", "destination": "Quảng Nam", "price": 120, "created_at": "2026-01-01"},
+    "4": {"id": 4, "title": "Ruộng bậc thang Sa Pa", "description": "Trekking bản làng", "destination": "Lào Cai", "price": 200, "created_at": "2026-01-04"},
+}
+
+def embedding(tour: dict) -> list:
+    return EMBEDDER.embed(f"{tour['title']} {tour['description']}", 768).tolist()
+
+# Tour 3 chưa có embedding
+VECTORS = {tid: {"embedding_768": embedding(tour)} for tid, tour in TOURS.items() if tid != "3"}
+
+@pytest.fixture
+def client():
+    # Catalog dùng chung: các index của router đã subscribe vào nó lúc import
+    catalog._publish(TourSnapshot(1, dict(TOURS), dict(VECTORS), "fp"), None)
+    set_embedder(EMBEDDER)
+    app = FastAPI()
+    app.include_router(tours_router.router)
+    yield TestClient(app)
+    set_embedder(None)
+    catalog._snapshot = None
+
+def test_semantic_top_k_order(client):
+    results = client.get("/api/tours/semantic", params={"q": "Vịnh Hạ Long du thuyền", "k": 2}).json()
+    assert len(results) == 2
+    assert results[0]["id"] == 1
+    assert results[0]["similarity"] >= results[1]["similarity"]
+    assert "embedding_768" not in results[0]
+
+def test_semantic_skips_tours_without_embedding(client):
+    results = client.get("/api/tours/semantic", params={"q": "Phố cổ Hội An đèn lồng", "k": 50}).json()
+    assert sorted(r["id"] for r in results) == [1, 2, 4]
+    similarities = [r["similarity"] for r in results]
+    assert similarities == sorted(similarities, reverse=True)
+
+def test_semantic_filters_and_fields(client):
+    results = client.get("/api/tours/semantic", params={"q": "Hạ Long", "destination": "Hà Nội"}).json()
+    assert [r["id"] for r in results] == [2]
+    results = client.get("/api/tours/semantic", params={"q": "Hạ Long", "k": 1, "fields": "title"}).json()
+    assert results == [{"id": 1, "title": "Vịnh Hạ Long", "similarity": results[0]["similarity"]}]
+
+def test_semantic_rejects_vector_fields_and_unknown_dim(client):
+    response = client.get("/api/tours/semantic", params={"q": "Hạ Long", "fields": "title,embedding_768"})
+    assert response.status_code == 400
+    assert client.get("/api/tours/semantic", params={"q": "Hạ Long", "dim": 512}).status_code == 400
+
+def test_batch_keeps_requested_order_and_reports_missing(client):
+    response = client.get("/api/tours/batch", params={"ids": "4, 1,999,4,2"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [t["id"] for t in body["data"]] == [4, 1, 2]
+    assert body["missing"] == ["999"]
+    assert "description" not in body["data"][0]
+    assert response.headers["X-Catalog-Version"] == "1"
+    # Client đã có đúng version catalog -> 304
+    cached = client.get("/api/tours/batch", params={"ids": "4,1"}, headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
+
+def test_post_batch_with_fields(client):
+    body = client.post("/api/tours/batch", json={"ids": ["3", "nope", "1"], "fields": "title"}).json()
+    assert body == {"data": [{"id": 3, "title": "Phố cổ Hội An"}, {"id": 1, "title": "Vịnh Hạ Long"}], "missing": ["nope"]}
+
+def test_batch_id_limit(client):
+    ids = [str(i) for i in range(tours_router.MAX_BATCH_IDS)]
+    assert client.post("/api/tours/batch", json={"ids": ids}).status_code == 200
+    # Id trùng chỉ tính một lần
+    assert client.post("/api/tours/batch", json={"ids": ids + ["0"]}).status_code == 200
+    too_many = ids + [str(tours_router.MAX_BATCH_IDS)]
+    assert client.post("/api/tours/batch", json={"ids": too_many}).status_code == 400
+    assert client.get("/api/tours/batch", params={"ids": ",".join(too_many)}).status_code == 400
@@ -0,0 +1,37 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.catalog import TourCatalog, TourSnapshot
+from routers import tracking
+
+class RecordingBuffer:
+    def __init__(self):
+        self.events = []
+
+    def submit(self, metric, event):
+        self.events.append((metric, event))
+        return True
+
+@pytest.fixture
+def client(monkeypatch):
+    tours = TourCatalog()
+    buffer = RecordingBuffer()
+    monkeypatch.setattr(tracking, "catalog", tours)
+    monkeypatch.setattr(tracking, "tracking_buffer", buffer)
+    app = FastAPI()
+    app.include_router(tracking.router)
+    client = TestClient(app)
+    client.catalog, client.buffer = tours, buffer
+    return client
+
+def test_unknown_tour_is_rejected_before_queueing(client):
+    client.catalog._publish(TourSnapshot(1, {"1": {"id": 1}}, {}, "fp"), None)
+    assert client.post("/api/tracking/tour-view", json={"tour_id": "1"}).json()["success"]
+    rejected = client.post("/api/tracking/tour-view", json={"tour_id": "999"}).json()
+    assert rejected["success"] is False
+    assert [event["tour_id"] for _, event in client.buffer.events] == ["1"]
+
+def test_tour_view_accepted_while_catalog_loading(client):
+    assert client.post("/api/tracking/tour-view", json={"tour_id": "999"}).json()["success"]
+    assert len(client.buffer.events) == 1
@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import threading
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+# upload_images.py nằm ở thư mục gốc repo (cạnh src/assets)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import upload_images
+from core.images import ImageManifest
+
+class CountingUploader(upload_images.LocalUploader):
+    """LocalUploader đếm số lần upload; các file trong `broken` luôn lỗi"""
+    uploads = []
+    broken = set()
+    _lock = threading.Lock()
+
+    def upload(self, path, public_id):
+        with self._lock:
+            self.uploads.append(path.name)
+        if path.name in self.broken:
+            raise ConnectionError("Lỗi giả lập khi upload")
+        return super().upload(path, public_id)
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    CountingUploader.uploads, CountingUploader.broken = [], set()
+    monkeypatch.setattr(upload_images, "LocalUploader", CountingUploader)
+    folder = tmp_path / "assets"
+    folder.mkdir()
+    args = Namespace(
+        folder=str(folder), manifest=str(tmp_path / "manifest.json"), local=True,
+        local_dir=str(tmp_path / "uploads"), fail_rate=0.0, workers=2, retries=1,
+        backoff=0.0, checkpoint=1, force=False, cloud_name=None,
+    )
+
+    def run():
+        CountingUploader.uploads = []
+        code = upload_images.run(args)
+        return code, json.loads(Path(args.manifest).read_text(encoding="utf-8"))
+
+    run.folder, run.args = folder, args
+    return run
+
+def test_identical_files_are_uploaded_once(pipeline):
+    (pipeline.folder / "ha-long.jpg").write_bytes(b"anh-1")
+    (pipeline.folder / "ha-long-copy.jpg").write_bytes(b"anh-1")
+    (pipeline.folder / "sa-pa.png").write_bytes(b"anh-2")
+    code, manifest = pipeline()
+    assert code == 0
+    assert len(CountingUploader.uploads) == 2
+    images = manifest["images"]
+    assert set(images) == {"ha-long.jpg", "ha-long-copy.jpg", "sa-pa.png"}
+    assert images["ha-long.jpg"]["url"] == images["ha-long-copy.jpg"]["url"]
+    assert manifest["provider"] == "local"
+
+def test_rerun_skips_unchanged_files(pipeline):
+    (pipeline.folder / "ha-long.jpg").write_bytes(b"anh-1")
+    (pipeline.folder / "sa-pa.png").write_bytes(b"anh-2")
+    _, first = pipeline()
+    code, second = pipeline()
+    assert code == 0 and CountingUploader.uploads == []
+    assert second["images"] == first["images"]
+
+    # Sửa nội dung một file: chỉ file đó được upload lại
+    (pipeline.folder / "sa-pa.png").write_bytes(b"anh-2-moi")
+    _, third = pipeline()
+    assert CountingUploader.uploads == ["sa-pa.png"]
+    assert third["images"]["sa-pa.png"]["sha256"] != first["images"]["sa-pa.png"]["sha256"]
+    assert third["images"]["ha-long.jpg"] == first["images"]["ha-long.jpg"]
+
+def test_failed_upload_is_retried_on_next_run(pipeline):
+    (pipeline.folder / "ha-long.jpg").write_bytes(b"anh-1")
+    (pipeline.folder / "sa-pa.png").write_bytes(b"anh-2")
+    CountingUploader.broken = {"sa-pa.png"}
+    code, manifest = pipeline()
+    assert code == 1
+    # retries=1: thử 2 lần rồi bỏ; manifest chỉ có ảnh đã upload xong
+    assert CountingUploader.uploads.count("sa-pa.png") == 2
+    assert set(manifest["images"]) == {"ha-long.jpg"}
+
+    CountingUploader.broken = set()
+    code, manifest = pipeline()
+    assert code == 0
+    assert CountingUploader.uploads == ["sa-pa.png"]
+    assert set(manifest["images"]) == {"ha-long.jpg", "sa-pa.png"}
+    for name, entry in manifest["images"].items():
+        assert (Path(pipeline.args.local_dir) / f"{entry['public_id']}{Path(name).suffix}").exists()
+    # Backend đọc được manifest vừa ghi
+    assert ImageManifest(pipeline.args.manifest).resolve("sa-pa") == manifest["images"]["sa-pa.png"]["url"]
+
+def test_local_run_refuses_other_provider_manifest(pipeline):
+    Path(pipeline.args.manifest).write_text(json.dumps({"version": 1, "provider": "cloudinary", "images": {"a.jpg": {}}}))
+    (pipeline.folder / "ha-long.jpg").write_bytes(b"anh-1")
+    assert upload_images.run(pipeline.args) == 1
+    assert json.loads(Path(pipeline.args.manifest).read_text())["provider"] == "cloudinary"
@@ -0,0 +1,42 @@
+import numpy as np
+
+from core.catalog import TourSnapshot
+from core.vectors import HashingEmbedder, VectorIndex
+
+EMBEDDER = HashingEmbedder()
+TEXTS = {"1": "vịnh hạ long du thuyền", "2": "văn miếu hà nội", "3": "phố cổ hội an", "4": "sa pa ruộng bậc thang"}
+
+def snapshot(vectors):
+    tours = {tid: {"id": tid, "created_at": tid} for tid in TEXTS}
+    return TourSnapshot(1, tours, vectors, "fp")
+
+def make_index():
+    vectors = {tid: {"embedding_768": str(EMBEDDER.embed(text, 768).tolist())} for tid, text in TEXTS.items()}
+    vectors["3"] = {}                                  # Chưa có embedding
+    vectors["4"] = {"embedding_768": "[1.0, 2.0]"}     # Sai số chiều
+    index = VectorIndex("embedding_768", 768)
+    index.on_catalog_change(snapshot(vectors), None)
+    return index, vectors
+
+def test_hashing_embedder_is_deterministic():
+    assert np.array_equal(EMBEDDER.embed("Hạ Long", 768), EMBEDDER.embed("ha long", 768))
+    assert EMBEDDER.embed("Hạ Long", 1024).shape == (1024,)
+
+def test_search_respects_k_and_skips_missing_vectors():
+    index, _ = make_index()
+    assert index.ids == ["1", "2"]
+    query = EMBEDDER.embed("hạ long", 768)
+    assert [tid for tid, _ in index.search(query, 1)] == ["1"]
+    results = index.search(query, 10)
+    assert [tid for tid, _ in results] == ["1", "2"]
+    assert results[0][1] > results[1][1]
+    assert index.search(query, 10, allowed_ids={"2"}) == [("2", results[1][1])]
+
+def test_incremental_update_matches_rebuild():
+    index, vectors = make_index()
+    vectors["3"] = {"embedding_768": EMBEDDER.embed(TEXTS["3"], 768).tolist()}
+    index.on_catalog_change(snapshot(vectors), {"3"})
+    rebuilt = VectorIndex("embedding_768", 768)
+    rebuilt.on_catalog_change(snapshot(vectors), None)
+    assert index.ids == rebuilt.ids == ["1", "2", "3"]
+    assert np.array_equal(index.matrix, rebuilt.matrix)
@@ -44,6 +44,15 @@ interface TourContextType {
 
 const TourContext = createContext<TourContextType | undefined>(undefined);
 
+// Chỉ lấy các cột danh sách/thẻ tour cần (kèm mô tả để tìm kiếm phía client);
+// cột dài như additional_info được TourDetail tải riêng qua /api/tours/{id}
+const TOUR_LIST_FIELDS = [
+  "id", "title", "title_en", "image", "images", "price", "price_vnd",
+  "rating", "reviews", "departure", "destination", "transportation", "type",
+  "created_at", "description", "description_en",
+].join(",");
+const TOUR_PAGE_SIZE = 200;
+
 export const TourProvider = ({ children }: { children: ReactNode }) => {
   // --- 2. Thay dữ liệu cứng bằng State ---
   const [tours, setTours] = useState<Tour[]>([]); 
@@ -66,13 +75,21 @@ export const TourProvider = ({ children }: { children: ReactNode }) => {
       setLoading(true);
       // Gọi đến API bạn vừa viết
       const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000';
-      const response = await fetch(`${API_BASE_URL}/api/tours`);
-      
-      if (!response.ok) {
-        throw new Error("Không thể kết nối đến server");
-      }
+      // API trả về từng trang; còn trang sau thì có header X-Next-Cursor
+      const data: any[] = [];
+      let cursor: string | null = null;
+      do {
+        const url = `${API_BASE_URL}/api/tours?fields=${TOUR_LIST_FIELDS}&limit=${TOUR_PAGE_SIZE}`
+          + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : "");
+        const response = await fetch(url);
+        
+        if (!response.ok) {
+          throw new Error("Không thể kết nối đến server");
+        }
 
-      const data = await response.json();
+        data.push(...(await response.json()));
+        cursor = response.headers.get("X-Next-Cursor");
+      } while (cursor);
 
       // --- 4. Quan trọng: Chuyển đổi dữ liệu ---
       // Backend (Python) trả về: title_en, additional_info...
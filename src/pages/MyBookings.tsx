@@ -35,6 +35,27 @@ interface Booking {
   } | null;
 }
 
+// API trả về từng trang; còn trang sau thì có header X-Next-Cursor
+const BOOKINGS_PAGE_SIZE = 200;
+
+// Tải hết các trang lịch sử đặt tour; fetchPage tự xử lý lỗi và trả về response hợp lệ
+const fetchAllBookings = async (
+  url: string,
+  fetchPage: (pageUrl: string) => Promise<Response>
+): Promise<Booking[]> => {
+  const bookings: Booking[] = [];
+  let cursor: string | null = null;
+  do {
+    const pageUrl = `${url}&limit=${BOOKINGS_PAGE_SIZE}` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : "");
+    const response = await fetchPage(pageUrl);
+    const data = await response.json();
+    // Đảm bảo data là một mảng
+    if (Array.isArray(data)) bookings.push(...data);
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return bookings;
+};
+
 const MyBookings = () => {
   const { user } = useAuth();
   const { language, currency } = useTours();
@@ -63,44 +84,42 @@ const MyBookings = () => {
         console.log("🔍 Fetching bookings from:", url);
         console.log("👤 User ID:", user.id);
         
-        const response = await fetch(url, {
-          method: "GET",
-          headers: {
-            "Content-Type": "application/json",
-          },
-        }).catch((networkError) => {
-          // Xử lý lỗi network (backend không chạy, CORS, etc.)
-          console.error("❌ Network error:", networkError);
-          throw new Error(
-            language === "VI" 
-              ? "Không thể kết nối đến server. Vui lòng kiểm tra xem backend có đang chạy không."
-              : "Cannot connect to server. Please check if the backend is running."
-          );
-        });
+        const bookingsArray = await fetchAllBookings(url, async (pageUrl) => {
+          const response = await fetch(pageUrl, {
+            method: "GET",
+            headers: {
+              "Content-Type": "application/json",
+            },
+          }).catch((networkError) => {
+            // Xử lý lỗi network (backend không chạy, CORS, etc.)
+            console.error("❌ Network error:", networkError);
+            throw new Error(
+              language === "VI" 
+                ? "Không thể kết nối đến server. Vui lòng kiểm tra xem backend có đang chạy không."
+                : "Cannot connect to server. Please check if the backend is running."
+            );
+          });
         
-        console.log("📡 Response status:", response.status, response.statusText);
+          console.log("📡 Response status:", response.status, response.statusText);
         
-        if (!response.ok) {
-          let errorData;
-          try {
-            errorData = await response.json();
-          } catch {
-            errorData = { detail: `HTTP ${response.status}: ${response.statusText}` };
+          if (!response.ok) {
+            let errorData;
+            try {
+              errorData = await response.json();
+            } catch {
+              errorData = { detail: `HTTP ${response.status}: ${response.statusText}` };
+            }
+            console.error("❌ API Error:", errorData);
+            throw new Error(
+              errorData.detail || 
+              (language === "VI" 
+                ? `Lỗi từ server: ${response.status} ${response.statusText}`
+                : `Server error: ${response.status} ${response.statusText}`)
+            );
           }
-          console.error("❌ API Error:", errorData);
-          throw new Error(
-            errorData.detail || 
-            (language === "VI" 
-              ? `Lỗi từ server: ${response.status} ${response.statusText}`
-              : `Server error: ${response.status} ${response.statusText}`)
-          );
-        }
-        
-        const data = await response.json();
-        console.log("✅ Bookings data received:", data);
-        
-        // Đảm bảo data là một mảng
-        const bookingsArray = Array.isArray(data) ? data : [];
+          return response;
+        });
+        console.log("✅ Bookings data received:", bookingsArray);
         console.log(`📋 Found ${bookingsArray.length} bookings`);
         setBookings(bookingsArray);
       } catch (err) {
@@ -275,37 +294,37 @@ const MyBookings = () => {
                   
                   console.log("🔄 Retrying fetch from:", url);
                   
-                  const response = await fetch(url, {
-                    method: "GET",
-                    headers: {
-                      "Content-Type": "application/json",
-                    },
-                  }).catch((networkError) => {
-                    console.error("❌ Network error on retry:", networkError);
-                    throw new Error(
-                      language === "VI" 
-                        ? "Không thể kết nối đến server. Vui lòng kiểm tra xem backend có đang chạy không."
-                        : "Cannot connect to server. Please check if the backend is running."
-                    );
-                  });
+                  const bookingsArray = await fetchAllBookings(url, async (pageUrl) => {
+                    const response = await fetch(pageUrl, {
+                      method: "GET",
+                      headers: {
+                        "Content-Type": "application/json",
+                      },
+                    }).catch((networkError) => {
+                      console.error("❌ Network error on retry:", networkError);
+                      throw new Error(
+                        language === "VI" 
+                          ? "Không thể kết nối đến server. Vui lòng kiểm tra xem backend có đang chạy không."
+                          : "Cannot connect to server. Please check if the backend is running."
+                      );
+                    });
                   
-                  if (!response.ok) {
-                    let errorData;
-                    try {
-                      errorData = await response.json();
-                    } catch {
-                      errorData = { detail: `HTTP ${response.status}: ${response.statusText}` };
+                    if (!response.ok) {
+                      let errorData;
+                      try {
+                        errorData = await response.json();
+                      } catch {
+                        errorData = { detail: `HTTP ${response.status}: ${response.statusText}` };
+                      }
+                      throw new Error(
+                        errorData.detail || 
+                        (language === "VI" 
+                          ? `Lỗi từ server: ${response.status}`
+                          : `Server error: ${response.status}`)
+                      );
                     }
-                    throw new Error(
-                      errorData.detail || 
-                      (language === "VI" 
-                        ? `Lỗi từ server: ${response.status}`
-                        : `Server error: ${response.status}`)
-                    );
-                  }
-                  
-                  const data = await response.json();
-                  const bookingsArray = Array.isArray(data) ? data : [];
+                    return response;
+                  });
                   setBookings(bookingsArray);
                   setError(null);
                 } catch (err) {
@@ -16,7 +16,7 @@ import Navbar from "@/components/Navbar";
 import Footer from "@/components/Footer";
 import FloatingContact from "@/components/FloatingContact";
 import AdminTourManager from "@/components/AdminTourManager";
-import { useTours } from "@/contexts/TourContext";
+import { useTours, Tour } from "@/contexts/TourContext";
 import { useWishlist } from "@/contexts/WishlistContext";
 import { useAuth } from "@/contexts/AuthContext";
 import { useToast } from "@/hooks/use-toast";
@@ -77,7 +77,31 @@ const TourDetail = () => {
   });
   const [isSubmittingBooking, setIsSubmittingBooking] = useState(false);
 
-  const tour = tours.find((t) => t.id === id);
+  // Danh sách trong TourContext chỉ có các cột gọn -> tải thêm chi tiết đầy đủ
+  // (additional_info, ...); tải lại khi danh sách đổi (VD: admin vừa sửa tour)
+  const [tourDetail, setTourDetail] = useState<Partial<Tour> | null>(null);
+  useEffect(() => {
+    if (!id) return;
+    let cancelled = false;
+    const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000';
+    fetch(`${API_BASE_URL}/api/tours/${id}`)
+      .then((response) => (response.ok ? response.json() : null))
+      .then((data) => {
+        if (!cancelled) setTourDetail(data);
+      })
+      .catch((error) => console.error("Lỗi khi tải chi tiết tour:", error));
+    return () => {
+      cancelled = true;
+    };
+  }, [id, tours]);
+
+  const listTour = tours.find((t) => t.id === id);
+  // Chỉ cho sửa khi đã có chi tiết đầy đủ: form sửa khởi tạo một lần từ `tour`,
+  // nếu dùng bản gọn thì additional_info, ... sẽ rỗng và bị ghi đè trong DB
+  const detailLoaded = !!tourDetail && String(tourDetail.id) === id;
+  const tour = listTour && detailLoaded
+    ? { ...tourDetail, ...listTour }
+    : listTour;
   
   // Check if tour is in wishlist
   const inWishlist = tour ? isInWishlist(tour.id) : false;
@@ -328,6 +352,7 @@ const TourDetail = () => {
                       variant="outline"
                       size="sm"
                       onClick={() => setShowAdminManager(true)}
+                      disabled={!detailLoaded}
                     >
                       <Edit2 className="w-4 h-4 mr-2" />
                       {language === "VI" ? "Sửa" : "Edit"}
@@ -574,7 +599,7 @@ const TourDetail = () => {
       </Dialog>
 
       {/* Admin Tour Manager Dialog */}
-      {showAdminManager && (
+      {showAdminManager && detailLoaded && (
         <AdminTourManager
           tour={tour}
           mode="edit"
@@ -1,61 +1,253 @@
-import cloudinary
-import cloudinary.uploader
+"""
+Upload ảnh trong src/assets lên Cloudinary và ghi manifest JSON cho backend.
+
+- Mỗi file được băm SHA-256; file đã có trong manifest với cùng hash thì bỏ qua,
+  file trùng nội dung với file khác thì dùng lại kết quả (không upload lại).
+- Upload song song bằng một pool giới hạn số worker, lỗi thì retry với backoff.
+- Với mỗi ảnh tính sẵn các URL responsive (Cloudinary transformation) + srcset.
+- Manifest (mặc định backend/data/image_manifest.json) được backend đọc để điền
+  image/images của tour khi DB chỉ lưu tên file. Chế độ --local ghi vào manifest
+  riêng (backend/data/image_manifest.local.json) để không đụng tới manifest thật.
+- Manifest do provider khác ghi (local <-> cloudinary) không bị ghi đè, trừ khi
+  có --force.
+
+Chạy ở thư mục gốc:
+    python upload_images.py                       # upload thật lên Cloudinary
+    python upload_images.py --local               # uploader giả lập, chạy offline
+    python upload_images.py --local --fail-rate 0.3 --workers 8
+    python upload_images.py --local --manifest ./backend/data/image_manifest.json --force
+"""
+import argparse
+import hashlib
+import json
 import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
 from dotenv import load_dotenv
 load_dotenv()
 
-# --- 1. CẤU HÌNH (Điền thông tin của bạn vào đây) ---
-cloudinary.config(
-  cloud_name = "dczdnu2ba",        # Tên Cloud của bạn (đã điền sẵn theo ảnh)
-  api_key = os.getenv("API_KEY"),     # <--- PASTE API KEY VÀO ĐÂY (dãy số)
-  api_secret = os.getenv("API_SECRET"), # <--- PASTE API SECRET VÀO ĐÂY (dãy ký tự dài)
-  secure = True
-)
-
-# --- 2. Đường dẫn đến folder ảnh ---
-# Vì file này nằm ở root, nên đường dẫn vào assets là ./src/assets
-folder_path = "./src/assets" 
-
-print(f"--- Đang quét ảnh trong thư mục: {folder_path} ---")
-
-# Dict để lưu kết quả: tên file -> link online
-image_map = {}
-
-# Kiểm tra xem thư mục có tồn tại không
-if not os.path.exists(folder_path):
-    print(f"❌ Lỗi: Không tìm thấy thư mục {folder_path}")
-    exit()
-
-# --- 3. Duyệt file và Upload ---
-count = 0
-for filename in os.listdir(folder_path):
-    # Chỉ lấy các file ảnh
-    if filename.lower().endswith((".jpg", ".png", ".jpeg", ".webp")):
-        file_path = os.path.join(folder_path, filename)
-        
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg", ".webp")
+# Các bề rộng sinh sẵn cho srcset (thẻ tour, trang chi tiết, ảnh full màn hình)
+RESPONSIVE_WIDTHS = (320, 640, 960, 1280, 1920)
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST = "./backend/data/image_manifest.json"
+DEFAULT_LOCAL_MANIFEST = "./backend/data/image_manifest.local.json"
+
+# ==================================================================
+# 1. UPLOADER (Cloudinary thật hoặc bản giả lập cục bộ)
+# ==================================================================
+
+class CloudinaryUploader:
+    name = "cloudinary"
+
+    def __init__(self, cloud_name: str):
+        import cloudinary
+        import cloudinary.uploader
+        import cloudinary.utils
+        cloudinary.config(
+            cloud_name=cloud_name,
+            api_key=os.getenv("API_KEY"),
+            api_secret=os.getenv("API_SECRET"),
+            secure=True,
+        )
+        self._uploader = cloudinary.uploader
+        self._utils = cloudinary.utils
+
+    def upload(self, path: Path, public_id: str) -> dict:
+        # overwrite=False: public_id chứa hash nên cùng id = cùng nội dung
+        response = self._uploader.upload(str(path), public_id=public_id, overwrite=False, resource_type="image")
+        return {
+            "url": response["secure_url"],
+            "width": response.get("width"),
+            "height": response.get("height"),
+            "format": response.get("format"),
+        }
+
+    def variant_url(self, public_id: str, width: int) -> str:
+        url, _ = self._utils.cloudinary_url(
+            public_id, width=width, crop="limit", fetch_format="auto", quality="auto", secure=True
+        )
+        return url
+
+class LocalUploader:
+    """Chép file vào thư mục cục bộ thay vì upload (test offline, CI)"""
+    name = "local"
+
+    def __init__(self, out_dir: Path, fail_rate: float = 0.0):
+        self.out_dir = out_dir
+        self.fail_rate = fail_rate
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+    def upload(self, path: Path, public_id: str) -> dict:
+        # Giả lập lỗi mạng để thử cơ chế retry
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise ConnectionError("Lỗi giả lập khi upload")
+        target = self.out_dir / f"{public_id}{path.suffix.lower()}"
+        shutil.copyfile(path, target)
+        return {"url": target.resolve().as_uri(), "width": None, "height": None, "format": path.suffix.lstrip(".").lower()}
+
+    def variant_url(self, public_id: str, width: int) -> str:
+        # Không có dịch vụ resize -> mọi kích thước dùng chung file gốc
+        matches = list(self.out_dir.glob(f"{public_id}.*"))
+        return matches[0].resolve().as_uri() if matches else ""
+
+# ==================================================================
+# 2. HASH, MANIFEST, RETRY
+# ==================================================================
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(path: Path) -> dict:
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+        print(f"⚠️ Manifest {path} khác version, tạo mới")
+    return {"version": MANIFEST_VERSION, "images": {}}
+
+def save_manifest(path: Path, manifest: dict, provider: str) -> None:
+    manifest["provider"] = provider
+    manifest["widths"] = list(RESPONSIVE_WIDTHS)
+    manifest["generated_at"] = datetime.now(timezone.utc).isoformat()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Ghi file tạm rồi rename -> backend không bao giờ đọc phải file ghi dở
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def upload_with_retry(uploader, path: Path, public_id: str, retries: int, backoff: float) -> dict:
+    for attempt in range(retries + 1):
         try:
-            print(f"Đang upload: {filename}...")
-            
-            # Upload lên Cloudinary
-            # use_filename=True: giữ tên file gốc (ví dụ: van-mieu.jpg)
-            # unique_filename=False: không thêm ký tự ngẫu nhiên vào tên
-            response = cloudinary.uploader.upload(file_path, use_filename=True, unique_filename=False)
-            
-            url = response['secure_url']
-            image_map[filename] = url
-            count += 1
-            print(f"✅ Xong: {url}")
-            
+            return uploader.upload(path, public_id)
         except Exception as e:
-            print(f"❌ Lỗi file {filename}: {e}")
+            if attempt == retries:
+                raise
+            # Exponential backoff + jitter để các worker không retry cùng lúc
+            delay = backoff * (2 ** attempt) * (0.5 + random.random())
+            print(f"🔁 {path.name}: lỗi '{e}', thử lại sau {delay:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
+
+def build_entry(uploader, sha256: str, public_id: str, size: int, result: dict) -> dict:
+    variants = {str(w): uploader.variant_url(public_id, w) for w in RESPONSIVE_WIDTHS}
+    return {
+        "sha256": sha256,
+        "public_id": public_id,
+        "bytes": size,
+        **result,
+        "variants": variants,
+        "srcset": ", ".join(f"{url} {w}w" for w, url in variants.items()),
+    }
+
+# ==================================================================
+# 3. PIPELINE
+# ==================================================================
+
+def run(args) -> int:
+    folder = Path(args.folder)
+    manifest_path = Path(args.manifest or (DEFAULT_LOCAL_MANIFEST if args.local else DEFAULT_MANIFEST))
+    if not folder.exists():
+        print(f"❌ Lỗi: Không tìm thấy thư mục {folder}")
+        return 1
+
+    if args.local:
+        uploader = LocalUploader(Path(args.local_dir), args.fail_rate)
+    else:
+        uploader = CloudinaryUploader(args.cloud_name)
+
+    manifest = load_manifest(manifest_path)
+    entries = manifest["images"]
+    if manifest.get("provider") not in (None, uploader.name):
+        # Đổi provider (local <-> cloudinary) thì URL cũ không còn dùng được: chỉ
+        # xóa khi được yêu cầu rõ, tránh lỡ tay thay manifest thật bằng URL file://
+        if not args.force:
+            print(f"❌ Manifest {manifest_path} do provider '{manifest['provider']}' ghi, đang chạy '{uploader.name}'.")
+            print("   Dùng --manifest khác, hoặc thêm --force để tạo lại manifest này.")
+            return 1
+        print(f"⚠️ --force: bỏ {len(entries)} ảnh của provider '{manifest['provider']}' trong {manifest_path}")
+        entries.clear()
+
+    print(f"--- Đang quét ảnh trong thư mục: {folder} ---")
+    files = sorted(p for p in folder.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    by_hash = {entry["sha256"]: entry for entry in entries.values()}
+
+    pending = {}   # sha256 -> (path, [tên file có cùng nội dung])
+    skipped = 0
+    for path in files:
+        digest = sha256_file(path)
+        entry = entries.get(path.name)
+        if entry and entry["sha256"] == digest:
+            skipped += 1
+        elif digest in by_hash:
+            entries[path.name] = dict(by_hash[digest])
+            skipped += 1
+        elif digest in pending:
+            pending[digest][1].append(path.name)
+        else:
+            pending[digest] = (path, [path.name])
+
+    print(f"📦 {len(files)} ảnh: {skipped} không đổi, {len(pending)} cần upload ({args.workers} worker)")
+    started = time.perf_counter()
+    uploaded, failed = 0, []
+
+    def task(digest: str, path: Path) -> dict:
+        public_id = f"{path.stem}-{digest[:12]}"
+        result = upload_with_retry(uploader, path, public_id, args.retries, args.backoff)
+        return build_entry(uploader, digest, public_id, path.stat().st_size, result)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(task, digest, path): (digest, names) for digest, (path, names) in pending.items()}
+        for future in as_completed(futures):
+            digest, names = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                failed.append(names[0])
+                print(f"❌ Lỗi file {names[0]}: {e}")
+                continue
+            # as_completed chạy ở thread chính nên ghi manifest không cần lock
+            for name in names:
+                entries[name] = dict(entry)
+            uploaded += 1
+            # Checkpoint định kỳ: bị ngắt giữa chừng vẫn không phải upload lại
+            if uploaded % args.checkpoint == 0:
+                save_manifest(manifest_path, manifest, uploader.name)
+            print(f"✅ Xong: {names[0]} -> {entry['url']}")
+
+    save_manifest(manifest_path, manifest, uploader.name)
+    elapsed = time.perf_counter() - started
 
-# --- 4. In kết quả để copy vào SQL ---
-print("\n" + "="*50)
-print(f"ĐÃ UPLOAD THÀNH CÔNG {count} ẢNH")
-print("Copy đoạn dưới đây để thay vào file SQL Insert:")
-print("="*50 + "\n")
+    print("\n" + "=" * 50)
+    print(f"ĐÃ UPLOAD {uploaded} ẢNH, BỎ QUA {skipped}, LỖI {len(failed)} ({elapsed:.1f}s)")
+    print(f"Manifest: {manifest_path}")
+    print("=" * 50)
+    return 1 if failed else 0
 
-for name, url in image_map.items():
-    print(f"'{name}': '{url}',")
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folder", default="./src/assets")
+    parser.add_argument("--manifest", default=None, help=f"Mặc định {DEFAULT_MANIFEST} ({DEFAULT_LOCAL_MANIFEST} khi --local)")
+    parser.add_argument("--cloud-name", default=os.getenv("CLOUDINARY_CLOUD_NAME", "dczdnu2ba"))
+    parser.add_argument("--workers", type=int, default=4, help="Số upload chạy song song")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=0.5, help="Thời gian chờ retry đầu tiên (giây)")
+    parser.add_argument("--checkpoint", type=int, default=10, help="Ghi manifest sau mỗi N ảnh upload xong")
+    parser.add_argument("--local", action="store_true", help="Dùng uploader giả lập thay cho Cloudinary")
+    parser.add_argument("--local-dir", default="./.local_uploads")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Tỉ lệ lỗi giả lập của uploader local")
+    parser.add_argument("--force", action="store_true", help="Cho phép ghi đè manifest của provider khác")
+    raise SystemExit(run(parser.parse_args()))
 
-print("\n" + "="*50)
\ No newline at end of file
+if __name__ == "__main__":
+    main()